@@ -1,11 +1,17 @@
+import os
+import sys
 import roslibpy
 import numpy as np
 import matplotlib.pyplot as plt
 import time
+# Delta-encoded map decoder from the final project
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Final_Project'))
+from grid_codec import GridDeltaDecoder, delta_topic
 
 class MapSubscriber:
-    def __init__(self, id=86):
+    def __init__(self, id=86, delta=False):
         self.id = id
+        self.delta = delta
         self.running = True
         
         # ROS variables
@@ -22,11 +28,19 @@ class MapSubscriber:
         self.width = None
         self.height = None
 
-        # ROS Subscriber for Occupancy Grid
-        self.sub = roslibpy.Topic(self.client, f'/create_{self.id}/occupancy_grid', 'nav_msgs/OccupancyGrid')
+        # ROS Subscriber for Occupancy Grid (full messages, or delta packets decoded here)
+        self.decoder = GridDeltaDecoder()
+        if self.delta:
+            self.sub = roslibpy.Topic(self.client, delta_topic(f'/create_{self.id}/occupancy_grid'), 'std_msgs/UInt8MultiArray')
+        else:
+            self.sub = roslibpy.Topic(self.client, f'/create_{self.id}/occupancy_grid', 'nav_msgs/OccupancyGrid')
         self.sub.subscribe(self.map_callback)
 
     def map_callback(self, msg):
+        if self.delta:
+            msg = self.decoder.to_grid_msg(msg)
+            if msg is None:
+                return
         self.width = msg['info']['width']
         self.height = msg['info']['height']
         self.grid_size = msg['info']['resolution']
@@ -4,7 +4,14 @@ import pygame
 import threading
 import roslibpy
 import numpy as np
-from RRT import RRT
+from RRT import RRT, RRTConnect
+from grid_planner import GridPlanner, GRID_PLANNER_MODES, Wavefront
+from parallel_planner import ParallelPlanner
+from collision import ClearanceMap
+from kernels import make_collision_checker
+from grid_codec import GridDeltaDecoder, MAP_TRANSPORTS, delta_topic
+from scan_matcher import POSE_SOURCES, compose_pose, invert_pose
+from pose_history import PoseHistory
 import matplotlib.pyplot as plt
 from matplotlib.patches import Circle
 from matplotlib.path import Path
@@ -13,7 +20,7 @@ from scipy import ndimage
 from scipy.spatial.transform import Rotation as R
 
 class CreateClass():
-    def __init__(self, id=81):
+    def __init__(self, id=81, map_transport='full', pose_source='odom'):
         # Joystic variables
         self.joystick = None
         self.axes = []
@@ -60,6 +67,9 @@ class CreateClass():
         self.grid_size = None
         self.width = None; self.height = None
         self.map_x_min = None; self.map_x_max = None; self.map_y_min = None; self.map_y_max = None
+        self.clearance_map = None # distance-field collision layer rebuilt once per full map update
+        self.collision_checker = None # plain checker used when the clearance layer does not match the grid
+        self.wavefront = None # travel-cost wavefront graph over the current collision checker
         self.fov_occupancy_grid = None
         self.fov_grid_size = None
         self.fov_width = None; self.fov_height = None
@@ -75,6 +85,25 @@ class CreateClass():
         self.min_expand_dis = 0.10 # m 
         self.expand_dis_decay = 0.75 # multiplicative decay when replanning fails
         self.rrt_iter_scale_cap = 4.0 # max multiplier for adaptive RRT iterations
+        self.rrt_mode = 'rrt' # 'rrt' (first feasible path), 'rrt_connect' (bidirectional, faster in corridors), 'rrt_star' or 'informed_rrt_star' (shorter paths),
+                              # or a deterministic grid search: 'astar', 'theta_star' or 'lazy_theta_star' (any-angle)
+        self.grid_heuristic_cache = {} # distance-to-goal fields reused by the grid planners
+        self.rrt_refine_iter = 1000 # RRT* iterations spent shortening the path after the first solution
+        self.rrt_sampler = 'free' # 'free' samples only free cells, 'uniform' samples the whole map bounding box
+        self.rrt_goal_bias = 0.05 # fraction of samples replaced by the goal
+        self.rrt_deadline_s = 0.08 # wall-clock planning budget per replan (s), kept under the control period; None plans until max_iter
+        # The grid planners are not anytime (they return None at the deadline), so they get their own
+        # budget: on the saved map A* takes about 70-150 ms, Theta* and Lazy Theta* up to 2.3 s and 0.8 s
+        self.grid_deadline_s = 0.5 # wall-clock budget for 'theta_star' / 'lazy_theta_star' (s); on timeout plain A* runs without one
+        self.rrt_parallel_workers = 0 # >0 plans with that many worker processes, each with its own seed and expand_dis
+        self.rrt_parallel_strategy = 'first' # 'first' successful path or 'shortest' path found within the deadline
+        # Worker pool started with the class, so no replan pays for process start-up
+        self.parallel_planner = ParallelPlanner(n_workers=self.rrt_parallel_workers) if self.rrt_parallel_workers > 0 else None
+        self.parallel_map_update = -1 # map update count last copied into the parallel planner's shared grid
+        self.rrt_warm_start = True # keep the RRT tree(s) between replans (not used for the grid planners)
+        self.rrt_warm_start_max_nodes = 20000 # start a fresh tree once the reused one grows past this
+        self.rrt_planner = None # planner kept for warm-start replanning
+        self.rrt_planner_map_update = -1 # map update count the kept planner was last checked against
         self.map_update_count = 0 
         self.last_replan_map_update = -1 # map update count used by the last replan attempt
         self.escape_min_distance = 0.40 # m preferred minimum distance from occupied start when escaping
@@ -143,12 +172,36 @@ class CreateClass():
         self.hazard_sub = roslibpy.Topic(self.client, f'/create_{self.id}/hazard_detection', 'irobot_create_msgs/HazardDetectionVector')
         self.dock_sub = roslibpy.Topic(self.client, f'/create_{self.id}/dock_status', 'irobot_create_msgs/DockStatus')
         self.odom_sub = roslibpy.Topic(self.client, f'/create_{self.id}/odom', 'nav_msgs/Odometry')
-        self.map_og_sub = roslibpy.Topic(self.client, f'/create_{self.id}/occupancy_grid', 'nav_msgs/OccupancyGrid')
-        self.map_og_fov_sub = roslibpy.Topic(self.client, f'/create_{self.id}/occupancy_grid_fov', 'nav_msgs/OccupancyGrid')
+        # With pose_source='corrected', odometry is moved into the map frame by the
+        # latest scan-matching correction from mapping.py, so the robot stays
+        # consistent with the drift-corrected map. Set it together with
+        # MapClass(scan_matching=True); the defaults ('odom' and False) both stay on raw odometry
+        if pose_source not in POSE_SOURCES:
+            raise ValueError(f"Unknown pose source '{pose_source}'. Use one of {list(POSE_SOURCES)}.")
+        self.pose_source = pose_source
+        self.odom_history = PoseHistory() # raw odometry, to line up corrections with their lidar time
+        self.odom_correction = (0.0, 0.0, 0.0) # map <- odom
+        if pose_source == 'corrected':
+            self.pose_corrected_sub = roslibpy.Topic(self.client, f'/create_{self.id}/pose_corrected', 'geometry_msgs/PoseStamped')
+        # Maps arrive as full nav_msgs/OccupancyGrid messages or, with map_transport='delta',
+        # as delta packets that the decoders apply to their copy of each grid
+        if map_transport not in MAP_TRANSPORTS:
+            raise ValueError(f"Unknown map transport '{map_transport}'. Use one of {list(MAP_TRANSPORTS)}.")
+        self.map_transport = map_transport
+        self.map_decoder = GridDeltaDecoder()
+        self.fov_map_decoder = GridDeltaDecoder()
+        if map_transport == 'delta':
+            self.map_og_sub = roslibpy.Topic(self.client, delta_topic(f'/create_{self.id}/occupancy_grid'), 'std_msgs/UInt8MultiArray')
+            self.map_og_fov_sub = roslibpy.Topic(self.client, delta_topic(f'/create_{self.id}/occupancy_grid_fov'), 'std_msgs/UInt8MultiArray')
+        else:
+            self.map_og_sub = roslibpy.Topic(self.client, f'/create_{self.id}/occupancy_grid', 'nav_msgs/OccupancyGrid')
+            self.map_og_fov_sub = roslibpy.Topic(self.client, f'/create_{self.id}/occupancy_grid_fov', 'nav_msgs/OccupancyGrid')
         self.detect_sub = roslibpy.Topic(self.client, f'/create_{self.id}/detections', 'vision_msgs/Detection2DArray')
         self.dock_sub.subscribe(self.dock_callback)
         self.hazard_sub.subscribe(self.hazard_callback)
         self.odom_sub.subscribe(self.odom_callback)
+        if pose_source == 'corrected':
+            self.pose_corrected_sub.subscribe(self.pose_corrected_callback)
         self.map_og_sub.subscribe(self.map_occupancy_callback)
         self.map_og_fov_sub.subscribe(self.map_fov_occupancy_callback)
         self.detect_sub.subscribe(self.detect_callback)
@@ -207,9 +260,33 @@ class CreateClass():
             msg['pose']['pose']['orientation']['w']
         ])
         self.roll, self.pitch, self.yaw = r.as_euler('xyz', degrees=False)
+        if self.pose_source == 'corrected':
+            self.odom_history.append(self.pose_time, self.x, self.y, self.yaw)
+            self.x, self.y, self.yaw = compose_pose(self.odom_correction, (self.x, self.y, self.yaw))
         # print(f"Pose Update: x={self.x:.2f}, y={self.y:.2f}, yaw={self.yaw:.2f} rad", end="\r", flush=True)
 
+    # Corrected map-frame pose at a lidar time; the correction is the transform
+    # from the odometry pose at that same time to it
+    def pose_corrected_callback(self, msg):
+        stamp = msg['header']['stamp']['sec'] + msg['header']['stamp']['nanosec'] * 1e-9
+        odom_pose = self.odom_history.pose_at(stamp)
+        if odom_pose is None:
+            return
+        r = R.from_quat([
+            msg['pose']['orientation']['x'],
+            msg['pose']['orientation']['y'],
+            msg['pose']['orientation']['z'],
+            msg['pose']['orientation']['w']
+        ])
+        corrected = (msg['pose']['position']['x'], msg['pose']['position']['y'], r.as_euler('xyz', degrees=False)[2])
+        self.odom_correction = compose_pose(corrected, invert_pose(odom_pose))
+
     def map_occupancy_callback(self, msg):
+        # Every delta packet is decoded, even throttled ones, so the grid stays in sync
+        if self.map_transport == 'delta':
+            msg = self.map_decoder.to_grid_msg(msg)
+            if msg is None:
+                return
         now = time.time()
         if now - self.last_full_map_update_time < self.map_update_period:
             return
@@ -244,11 +321,20 @@ class CreateClass():
         # Fuse camera cone detections into the map as occupied disks.
         self.overlay_detected_cones_on_occupancy_grid(self.occupancy_grid)
 
-        # Inflate obstacles in occupancy grid by robot radius to account for robot size in planning
-        if self.robot_radius > 0:
-            inflation_radius = int(np.ceil(self.robot_radius / self.grid_size))
-            inflated_obstacles = ndimage.binary_dilation(self.occupancy_grid <= 0.0, iterations=inflation_radius)
-            self.occupancy_grid[inflated_obstacles] = 0.0
+        # Build the clearance layer once per map update, then inflate obstacles by the robot
+        # radius with a threshold on it so other consumers see the robot-sized free space
+        clearance_map = ClearanceMap(self.occupancy_grid, self.get_map_params(), robot_radius=self.robot_radius,
+                                     map_version=self.map_update_count)
+        self.occupancy_grid = clearance_map.inflated_grid(self.occupancy_grid)
+        self.clearance_map = clearance_map
+
+    def get_map_params(self):
+        return {
+            'res': self.grid_size,
+            'x_limit': [self.map_x_min, self.map_x_max],
+            'y_limit': [self.map_y_min, self.map_y_max],
+            'origin': [self.map_x_min, self.map_y_min]
+        }
 
     def overlay_detected_cones_on_occupancy_grid(self, grid):
         if grid is None or self.grid_size is None or self.map_x_min is None or self.map_y_min is None:
@@ -370,6 +456,10 @@ class CreateClass():
         return abs(angle_relative) <= self.camera_fov_half_rad
 
     def map_fov_occupancy_callback(self, msg):
+        if self.map_transport == 'delta':
+            msg = self.fov_map_decoder.to_grid_msg(msg)
+            if msg is None:
+                return
         now = time.time()
         if now - self.last_fov_map_update_time < self.map_update_period:
             return
@@ -547,32 +637,26 @@ class CreateClass():
             return False
         return self.occupancy_grid[y_idx, x_idx] > 0.5
 
+    # Collision checker for the current full map, built once per map update.
+    # The clearance layer already matches the inflated grid; a plain checker is
+    # built (and cached) only when the clearance layer is missing or stale.
+    def get_collision_checker(self):
+        if self.occupancy_grid is None:
+            return None
+        clearance_map = self.clearance_map
+        if clearance_map is not None and (clearance_map.height, clearance_map.width) == self.occupancy_grid.shape:
+            return clearance_map
+        checker = self.collision_checker
+        if checker is None or checker.map_version != self.map_update_count or (checker.height, checker.width) != self.occupancy_grid.shape:
+            checker = make_collision_checker(self.occupancy_grid, self.get_map_params(), map_version=self.map_update_count)
+            self.collision_checker = checker
+        return checker
+
     def path_collision_free_in_full_map(self, path):
         if path is None or len(path) < 2 or self.occupancy_grid is None:
             return False
-
-        # Reuse RRT segment checker with the full occupancy map to verify every segment.
-        map_params_config = {
-            'res': self.grid_size,
-            'x_limit': [self.map_x_min, self.map_x_max],
-            'y_limit': [self.map_y_min, self.map_y_max],
-            'origin': [self.map_x_min, self.map_y_min]
-        }
-        checker = RRT(
-            start=path[0],
-            goal=path[-1],
-            map_grid=self.occupancy_grid,
-            map_params=map_params_config,
-            expand_dis=self.expand_dis,
-            max_iter=1
-        )
-
-        for idx in range(len(path) - 1):
-            start_node = np.array(path[idx])
-            end_node = np.array(path[idx + 1])
-            if not checker.is_segment_collision_free(start_node, end_node):
-                return False
-        return True
+        # Check every segment against the full occupancy map in one batch
+        return self.get_collision_checker().first_blocked_segment(path) < 0
 
     def select_frontier_goal(self):
         if self.fov_occupancy_grid is None or self.fov_grid_size is None:
@@ -585,6 +669,7 @@ class CreateClass():
         # Snapshot map data to avoid shape races while ROS callbacks update grids.
         fov_grid = np.array(self.fov_occupancy_grid, copy=True)
         full_grid = np.array(self.occupancy_grid, copy=True)
+        checker = self.get_collision_checker()
         fov_x_min = self.fov_x_min
         fov_y_min = self.fov_y_min
         fov_grid_size = self.fov_grid_size
@@ -621,49 +706,42 @@ class CreateClass():
         if frontier_idx.size == 0:
             return None
 
-        robot_xy = np.array([self.x, self.y])
-        candidate_world = []
-        candidate_dist = []
-
-        # Convert frontier grid indices to world coordinates and filter candidates based on full map
-        for y_idx, x_idx in frontier_idx:
-            p_world = self.grid_idx_to_world(x_idx, y_idx, fov_x_min, fov_y_min, fov_grid_size)
-
-            # Validate candidate on full map: in bounds and free.
-            full_x_idx = int((p_world[0] - map_x_min) / grid_size)
-            full_y_idx = int((p_world[1] - map_y_min) / grid_size)
-            if full_x_idx < 0 or full_x_idx >= full_grid.shape[1]:
-                continue
-            if full_y_idx < 0 or full_y_idx >= full_grid.shape[0]:
-                continue
-            if full_grid[full_y_idx, full_x_idx] <= 0.5:
-                continue
-            component_idx = free_components[full_y_idx, full_x_idx]
-            if component_idx == 0:
-                continue
-            component_area = free_component_sizes[component_idx] * (grid_size ** 2)
-            if component_area < self.frontier_min_free_area:
-                continue
-            if near_wall_mask[full_y_idx, full_x_idx]:
-                continue
-
-            candidate_world.append(p_world)
-            candidate_dist.append(np.linalg.norm(p_world - robot_xy))
-
-        if not candidate_world:
+        # Travel cost from the robot to every cell in one wavefront; the graph is rebuilt once per map version
+        if self.wavefront is None or self.wavefront.collision_checker is not checker:
+            self.wavefront = Wavefront(checker)
+        travel_cost = self.wavefront.costs_from([self.x, self.y])
+
+        # Convert frontier grid indices to world coordinates and filter candidates on the full map:
+        # the shared collision checker rejects cells outside the map or not free
+        frontier_world = frontier_idx[:, ::-1] * fov_grid_size + np.array([fov_x_min, fov_y_min])
+        keep = checker.points_free(frontier_world)
+        full_x_idx = np.floor((frontier_world[:, 0] - map_x_min) / grid_size).astype(int)
+        full_y_idx = np.floor((frontier_world[:, 1] - map_y_min) / grid_size).astype(int)
+        full_x_idx = np.clip(full_x_idx, 0, full_grid.shape[1] - 1)
+        full_y_idx = np.clip(full_y_idx, 0, full_grid.shape[0] - 1)
+        component_idx = free_components[full_y_idx, full_x_idx]
+        component_area = free_component_sizes[component_idx] * (grid_size ** 2)
+        keep &= (component_idx != 0) & (component_area >= self.frontier_min_free_area)
+        keep &= ~near_wall_mask[full_y_idx, full_x_idx]
+        # Only frontiers the robot can actually reach on the inflated grid
+        if travel_cost.shape == full_grid.shape:
+            keep &= np.isfinite(travel_cost[full_y_idx, full_x_idx])
+        if not np.any(keep):
             return None
 
-        candidate_dist = np.array(candidate_dist)
+        candidate_world = frontier_world[keep]
+        candidate_cost = travel_cost[full_y_idx[keep], full_x_idx[keep]] if travel_cost.shape == full_grid.shape \
+            else np.linalg.norm(candidate_world - np.array([self.x, self.y]), axis=1)
 
-        # Prefer frontiers near camera range to push exploration outward from the robot.
-        near_range_mask = np.abs(candidate_dist - self.camera_range) <= self.frontier_range_tolerance
+        # Prefer frontiers about a camera range of travel away to push exploration outward,
+        # taking the cheapest to reach among them.
+        near_range_mask = np.abs(candidate_cost - self.camera_range) <= self.frontier_range_tolerance
         if np.any(near_range_mask):
             masked_indices = np.where(near_range_mask)[0]
-            best_local = int(np.argmin(np.abs(candidate_dist[masked_indices] - self.camera_range)))
-            best_idx = int(masked_indices[best_local])
+            best_idx = int(masked_indices[np.argmin(candidate_cost[masked_indices])])
         else:
-            # Fallback: choose the frontier closest to the target camera range.
-            best_idx = int(np.argmin(np.abs(candidate_dist - self.camera_range)))
+            # Fallback: choose the frontier whose travel cost is closest to the target camera range.
+            best_idx = int(np.argmin(np.abs(candidate_cost - self.camera_range)))
 
         return candidate_world[best_idx].tolist()
 
@@ -702,12 +780,7 @@ class CreateClass():
         self.escape_mode = False
         start_pos = safe_start_pos.tolist()
 
-        map_params_config = {
-            'res': self.grid_size,
-            'x_limit': [self.map_x_min, self.map_x_max],
-            'y_limit': [self.map_y_min, self.map_y_max],
-            'origin': [self.map_x_min, self.map_y_min]
-        }
+        map_params_config = self.get_map_params()
         # Record that this map update has consumed one replan attempt.
         self.last_replan_map_update = self.map_update_count
 
@@ -719,22 +792,85 @@ class CreateClass():
         iter_scale = min(max(iter_scale, 1.0), self.rrt_iter_scale_cap)
         iter_try = int(max_iter * iter_scale)
 
-        planner = RRT(start=start_pos,
-                      goal=goal,
-                      map_grid=self.occupancy_grid,
-                      map_params=map_params_config,
-                      expand_dis=expand_try,
-                  max_iter=iter_try)
+        # Share the per-map collision checker (the clearance layer when it matches the grid).
+        clearance_map = self.get_collision_checker()
 
-        path_result = planner.plan()
-        self.rrt_tree_nodes = np.array(planner.tree)
+        if self.rrt_parallel_workers > 0 and self.rrt_mode not in GRID_PLANNER_MODES:
+            path_result, stats, self.rrt_tree_nodes, expand_try = self.plan_parallel(start_pos, goal, map_params_config, expand_try, iter_try)
+        else:
+            # Reuse the previous tree when possible; replan() drops the edges the new map blocks
+            warm_planner = self.rrt_planner if self.rrt_warm_start and self.rrt_mode not in GRID_PLANNER_MODES else None
+            if warm_planner is not None and (warm_planner.mode != self.rrt_mode or warm_planner.node_count > self.rrt_warm_start_max_nodes):
+                warm_planner = None
+
+            if warm_planner is not None:
+                planner = warm_planner
+                map_changed = self.rrt_planner_map_update != self.map_update_count
+                path_result = planner.replan(start_pos,
+                                             goal=goal,
+                                             map_grid=self.occupancy_grid if map_changed else None,
+                                             map_params=map_params_config,
+                                             clearance_map=clearance_map,
+                                             expand_dis=expand_try,
+                                             max_iter=iter_try,
+                                             deadline_s=self.rrt_deadline_s)
+            elif self.rrt_mode in GRID_PLANNER_MODES:
+                planner = GridPlanner(start=start_pos,
+                                      goal=goal,
+                                      map_grid=self.occupancy_grid,
+                                      map_params=map_params_config,
+                                      mode=self.rrt_mode,
+                                      clearance_map=clearance_map,
+                                      heuristic_cache=self.grid_heuristic_cache)
+            elif self.rrt_mode == 'rrt_connect':
+                planner = RRTConnect(start=start_pos,
+                                     goal=goal,
+                                     map_grid=self.occupancy_grid,
+                                     map_params=map_params_config,
+                                     expand_dis=expand_try,
+                                     max_iter=iter_try,
+                                     clearance_map=clearance_map,
+                                     sampler=self.rrt_sampler)
+            else:
+                planner = RRT(start=start_pos,
+                              goal=goal,
+                              map_grid=self.occupancy_grid,
+                              map_params=map_params_config,
+                              expand_dis=expand_try,
+                              max_iter=iter_try,
+                              clearance_map=clearance_map,
+                              mode=self.rrt_mode,
+                              refine_iter=self.rrt_refine_iter,
+                              sampler=self.rrt_sampler,
+                              goal_bias=self.rrt_goal_bias)
+
+            if self.rrt_mode in GRID_PLANNER_MODES:
+                path_result = planner.plan(deadline_s=self.grid_deadline_s if self.rrt_mode != 'astar' else None)
+                if path_result is None and planner.stats['timed_out']:
+                    # Any-angle search ran out of time; A* on the same grid finishes well inside a second
+                    planner = GridPlanner(start=start_pos,
+                                          goal=goal,
+                                          map_grid=self.occupancy_grid,
+                                          map_params=map_params_config,
+                                          mode='astar',
+                                          clearance_map=clearance_map,
+                                          heuristic_cache=self.grid_heuristic_cache)
+                    path_result = planner.plan()
+            elif warm_planner is None:
+                path_result = planner.plan(deadline_s=self.rrt_deadline_s)
+            if self.rrt_warm_start and self.rrt_mode not in GRID_PLANNER_MODES:
+                self.rrt_planner = planner
+                self.rrt_planner_map_update = self.map_update_count
+            stats = planner.stats
+            self.rrt_tree_nodes = np.array(planner.tree)
+        stats_msg = f"{stats['iterations']} iterations, {stats['nodes']} nodes, {1000 * stats['time_s']:.0f} ms" + (" (deadline reached)" if stats['timed_out'] else "")
 
         if path_result is not None and self.path_collision_free_in_full_map(path_result):
             self.des_path = np.array(path_result)
             self.p_des = self.des_path # match the robot's actual coordinate frame for navigation
             self.numWypts = len(self.p_des)
             self.expand_dis = self.default_expand_dis
-            print(f"Path found with {self.numWypts} waypoints (expand_dis={expand_try:.2f}, max_iter={iter_try})")
+            print(f"Path found with {self.numWypts} waypoints (expand_dis={expand_try:.2f}, max_iter={iter_try}; {stats_msg})")
             return True
 
         # Planning failed for this map update; lower expand distance for the next attempt.
@@ -743,9 +879,35 @@ class CreateClass():
         self.numWypts = 0
         next_expand = max(self.min_expand_dis, expand_try * self.expand_dis_decay)
         self.expand_dis = next_expand
-        print(f"No valid path at expand_dis={expand_try:.2f}, max_iter={iter_try}. Next attempt will use expand_dis={self.expand_dis:.2f}.")
+        print(f"No valid path at expand_dis={expand_try:.2f}, max_iter={iter_try} ({stats_msg}). Next attempt will use expand_dis={self.expand_dis:.2f}.")
         return False
 
+    # Run one RRT per worker with a different seed and a decreasing expand_dis,
+    # so a single replan covers the attempts the decay schedule would otherwise
+    # spread over several map updates. Returns the path (or None), the stats and
+    # tree of the chosen planner, and the expand_dis it used (or the smallest tried).
+    def plan_parallel(self, start_pos, goal, map_params_config, expand_try, iter_try):
+        # Only if rrt_parallel_workers was raised after start-up
+        if self.parallel_planner is None:
+            self.parallel_planner = ParallelPlanner(n_workers=self.rrt_parallel_workers)
+        if self.parallel_map_update != self.map_update_count:
+            self.parallel_planner.set_map(self.occupancy_grid)
+            self.parallel_map_update = self.map_update_count
+
+        expand_dis_list = [max(self.min_expand_dis, expand_try * self.expand_dis_decay ** k) for k in range(self.rrt_parallel_workers)]
+        planner_type = 'rrt_connect' if self.rrt_mode == 'rrt_connect' else 'rrt'
+        planner_kwargs = dict(max_iter=iter_try, sampler=self.rrt_sampler)
+        if planner_type == 'rrt':
+            planner_kwargs.update(mode=self.rrt_mode, refine_iter=self.rrt_refine_iter, goal_bias=self.rrt_goal_bias)
+
+        result = self.parallel_planner.plan(start_pos, goal, map_params_config, expand_dis_list,
+                                            deadline_s=self.rrt_deadline_s, strategy=self.rrt_parallel_strategy,
+                                            planner_type=planner_type, **planner_kwargs)
+        if result is None:
+            # Totals over the workers; timed_out only if one of them ran out of time
+            return None, dict(self.parallel_planner.stats), None, expand_dis_list[-1]
+        return result['path'], result['stats'], result['tree'], result['expand_dis']
+
     def run_initial_exploration_scan(self):
         if self.yaw is None:
             self.control_movement(0.0, 0.0)
@@ -1217,6 +1379,8 @@ class CreateClass():
         self.running = False
         self.read_thread.join()
         self.robot_thread.join()
+        if self.parallel_planner is not None:
+            self.parallel_planner.close()
         # self.mowing_sound_thread.join()
         plt.close('all')
 
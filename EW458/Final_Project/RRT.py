@@ -1,8 +1,23 @@
 import math
-import random
 import numpy as np
+from kernels import make_collision_checker, backend_nn_index, resolve_backend
+from nearest_neighbor import make_nn_index
+from sampling import make_sampler
+from planner_common import PlannerMixin
 
-class RRT:
+# 'rrt' returns the first feasible path. 'rrt_star' keeps growing the tree for
+# refine_iter iterations after the first solution, choosing the cheapest parent
+# in a shrinking neighbourhood and rewiring neighbours through each new node.
+# 'informed_rrt_star' also restricts sampling to the ellipse with foci at start
+# and goal that contains every point able to improve the best path found so far.
+PLANNER_MODES = ('rrt', 'rrt_star', 'informed_rrt_star')
+
+# Results of RRT.extend()
+TRAPPED = 0  # steering segment blocked or tree full, nothing added
+ADVANCED = 1 # added a node expand_dis toward the target
+REACHED = 2  # added a node exactly at the target
+
+class RRT(PlannerMixin):
     def __init__(
         self,
         start,
@@ -12,7 +27,20 @@ class RRT:
         expand_dis=0.5,
         max_iter=500,
         enable_pruning=True,
+        nn_index='kdtree',
+        clearance_map=None,
+        robot_radius=None,
+        mode='rrt',
+        rewire_radius=None,
+        refine_iter=1000,
+        sampler='uniform',
+        goal_bias=0.0,
+        seed=None,
+        backend='auto',
     ):
+        if mode not in PLANNER_MODES:
+            raise ValueError(f"Unknown planner mode '{mode}'. Use one of {list(PLANNER_MODES)}.")
+
         self.start = np.array(start)
         self.goal = np.array(goal)
         self.map = map_grid
@@ -20,12 +48,321 @@ class RRT:
         self.x_limit = map_params['x_limit'] # [min, max]
         self.y_limit = map_params['y_limit'] # [min, max]
         self.origin = map_params['origin']   # [x, y] in meters corresponding to grid index (0,0)
+        self.map_params = map_params
+
+        # Collision checks use a prebuilt checker when given (a GridCollisionChecker
+        # shared per map version, or a ClearanceMap, which robot_radius re-thresholds
+        # in a view of its own so the shared map is left unchanged),
+        # otherwise a checker over the cells equal to 1.0. backend ('auto', 'numpy'
+        # or 'numba') picks the compiled kernels for the built checker and the
+        # nearest-node scans when Numba is installed.
+        self.backend = resolve_backend(backend)
+        if clearance_map is not None:
+            if robot_radius is not None:
+                clearance_map = clearance_map.with_robot_radius(robot_radius)
+            self.collision_checker = clearance_map
+        else:
+            self.collision_checker = make_collision_checker(map_grid, map_params, self.backend)
 
         self.expand_dis = expand_dis
         self.max_iter = max_iter
         self.enable_pruning = enable_pruning
-        self.tree = [self.start]
-        self.parent = {tuple(self.start): None}
+        self.mode = mode
+        self.refine_iter = refine_iter # RRT* iterations to keep refining after the first solution
+        self.rewire_radius = rewire_radius if rewire_radius is not None else 2.0 * expand_dis # max neighbourhood radius
+
+        # RRT* neighbourhood radius shrinks as gamma * sqrt(log(n) / n); for a 2D
+        # space gamma must exceed 2 * sqrt(1.5 * area / pi) to be asymptotically optimal
+        self.map_area = (self.x_limit[1] - self.x_limit[0]) * (self.y_limit[1] - self.y_limit[0])
+        self.rewire_gamma = 2.0 * math.sqrt(1.5 * self.map_area / math.pi)
+
+        # Tree storage: preallocated node coordinates and int32 parent indices.
+        # Node 0 is the start; parent -1 marks the root.
+        capacity = max_iter + 2 # start + one node per iteration + goal
+        self.nodes = np.empty((capacity, 2))
+        self.parents = np.full(capacity, -1, dtype=np.int32)
+        self.nodes[0] = self.start
+        self.node_count = 1
+        self.goal_idx = None
+
+        # Path cost from the start and child links (first child / next sibling)
+        # so RRT* rewiring can push cost changes down a subtree
+        self.costs = np.zeros(capacity)
+        self.first_child = np.full(capacity, -1, dtype=np.int32)
+        self.next_sibling = np.full(capacity, -1, dtype=np.int32)
+        self.goal_parents = [] # nodes with a collision-free segment to the goal
+        self.best_goal_parent = None
+        self.best_cost = math.inf
+
+        # Nearest-node lookup ('kdtree', 'linear', or a custom index object)
+        self.nn_index = make_nn_index(backend_nn_index(nn_index, self.backend), capacity=capacity, points=self.nodes)
+        self.nn_index.add(self.nodes[0])
+
+        # Batched sampling ('uniform' over the map bounds, 'free' over free cells,
+        # or a Sampler object) from a seeded generator, with optional goal bias
+        self.rng = np.random.default_rng(seed)
+        self.sampler_type = sampler
+        self.goal_bias = goal_bias
+        self.sampler = make_sampler(sampler, self.collision_checker, map_params, rng=self.rng,
+                                    goal=self.goal, goal_bias=goal_bias)
+
+    # View of the nodes added so far, shape (node_count, 2)
+    @property
+    def tree(self):
+        return self.nodes[:self.node_count]
+
+    # Commit the node already written to nodes[node_count] and return its index
+    def add_node(self, parent_idx, cost=0.0):
+        idx = self.node_count
+        self.parents[idx] = parent_idx
+        self.costs[idx] = cost
+        self.first_child[idx] = -1 # the slot may hold a link from before the tree shrank
+        self.next_sibling[idx] = self.first_child[parent_idx]
+        self.first_child[parent_idx] = idx
+        self.node_count += 1
+        self.nn_index.add(self.nodes[idx])
+        return idx
+
+    # Move node idx under new_parent and shift the cost of its whole subtree
+    def rewire(self, idx, new_parent, new_cost):
+        old_parent = self.parents[idx]
+        child = self.first_child[old_parent]
+        if child == idx:
+            self.first_child[old_parent] = self.next_sibling[idx]
+        else:
+            while self.next_sibling[child] != idx:
+                child = self.next_sibling[child]
+            self.next_sibling[child] = self.next_sibling[idx]
+        self.parents[idx] = new_parent
+        self.next_sibling[idx] = self.first_child[new_parent]
+        self.first_child[new_parent] = idx
+
+        delta = self.costs[idx] - new_cost
+        stack = [idx]
+        while stack:
+            node = stack.pop()
+            self.costs[node] -= delta
+            child = self.first_child[node]
+            while child != -1:
+                stack.append(child)
+                child = self.next_sibling[child]
+
+    # Rebuild the first child / next sibling lists from the parent array
+    def rebuild_children(self):
+        k = self.node_count
+        self.first_child[:k] = -1
+        self.next_sibling[:k] = -1
+        children = np.flatnonzero(self.parents[:k] >= 0)
+        if children.size == 0:
+            return
+        children = children[np.argsort(self.parents[children], kind='stable')]
+        child_parents = self.parents[children]
+        group_start = np.ones(children.size, dtype=bool)
+        group_start[1:] = child_parents[1:] != child_parents[:-1]
+        self.first_child[child_parents[group_start]] = children[group_start]
+        same_parent = ~group_start[1:]
+        self.next_sibling[children[:-1][same_parent]] = children[1:][same_parent]
+
+    # Recompute every path cost from the root (node 0) by pointer jumping:
+    # each pass adds the cost of the current ancestor and jumps to its ancestor,
+    # so the loop runs log2(tree depth) times
+    def recompute_costs(self):
+        k = self.node_count
+        parents = self.parents[:k].astype(np.intp)
+        has_parent = parents >= 0
+        ancestors = np.where(has_parent, parents, 0)
+        costs = np.hypot(self.nodes[:k, 0] - self.nodes[ancestors, 0], self.nodes[:k, 1] - self.nodes[ancestors, 1])
+        while np.any(ancestors != 0):
+            costs += costs[ancestors]
+            ancestors = ancestors[ancestors]
+        self.costs[:k] = costs
+
+    # Grow the tree storage so it can hold capacity nodes
+    def reserve(self, capacity):
+        if capacity <= len(self.nodes):
+            return
+        k = self.node_count
+        nodes = np.empty((capacity, 2))
+        nodes[:k] = self.nodes[:k]
+        self.nodes = nodes
+        for name, fill in (('parents', -1), ('first_child', -1), ('next_sibling', -1)):
+            grown = np.full(capacity, fill, dtype=np.int32)
+            grown[:k] = getattr(self, name)[:k]
+            setattr(self, name, grown)
+        costs = np.zeros(capacity)
+        costs[:k] = self.costs[:k]
+        self.costs = costs
+        self.nn_index.reset(self.nodes, k)
+
+    # Keep only the nodes listed in order (order[0] becomes the root) and
+    # remap parents, child lists and the nearest-neighbour index to match.
+    # Goal bookkeeping refers to old indices, so it is cleared.
+    def reorder(self, order):
+        order = np.asarray(order, dtype=np.intp)
+        k = len(order)
+        new_index = np.full(self.node_count, -1, dtype=np.int32)
+        new_index[order] = np.arange(k, dtype=np.int32)
+        old_parents = self.parents[order]
+        self.nodes[:k] = self.nodes[order]
+        self.costs[:k] = self.costs[order]
+        self.parents[:k] = np.where(old_parents >= 0, new_index[old_parents], -1)
+        self.parents[k:] = -1
+        self.node_count = k
+        self.rebuild_children()
+        self.nn_index.reset(self.nodes, k)
+        self.goal_idx = None
+        self.goal_parents = []
+        self.best_goal_parent = None
+        self.best_cost = math.inf
+
+    # Drop the given nodes together with everything below them
+    def remove_subtrees(self, roots):
+        removed = np.zeros(self.node_count, dtype=bool)
+        stack = [int(idx) for idx in roots]
+        while stack:
+            node = stack.pop()
+            if removed[node]:
+                continue
+            removed[node] = True
+            child = self.first_child[node]
+            while child != -1:
+                stack.append(child)
+                child = self.next_sibling[child]
+        self.reorder(np.flatnonzero(~removed))
+
+    # Child indices of tree edges whose bounding box contains a cell marked in
+    # mask (a padded (height + 2, width + 2) array like free_mask). A summed-area
+    # table makes each box test O(1); the boxes cover every cell an edge visits.
+    def edges_touching(self, mask):
+        children = np.flatnonzero(self.parents[:self.node_count] >= 0)
+        if children.size == 0:
+            return children
+        table = np.zeros((mask.shape[0] + 1, mask.shape[1] + 1), dtype=np.int32)
+        table[1:, 1:] = np.cumsum(np.cumsum(mask, axis=0), axis=1)
+        checker = self.collision_checker
+        ends = (self.nodes[children], self.nodes[self.parents[children]])
+        cx = [np.clip(np.floor((p[:, 0] - checker.x_min) / checker.res).astype(np.intp) + 1, 0, mask.shape[1] - 1) for p in ends]
+        cy = [np.clip(np.floor((p[:, 1] - checker.y_min) / checker.res).astype(np.intp) + 1, 0, mask.shape[0] - 1) for p in ends]
+        x0, x1 = np.minimum(cx[0], cx[1]), np.maximum(cx[0], cx[1]) + 1
+        y0, y1 = np.minimum(cy[0], cy[1]), np.maximum(cy[0], cy[1]) + 1
+        count = table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+        return children[count > 0]
+
+    # Switch to a new map and drop the edges it blocks. When the new map has
+    # the same frame only edges near cells that stopped being free are
+    # rechecked; after an origin, size or resolution change every edge is.
+    def update_map(self, map_grid, map_params, clearance_map=None):
+        old_checker = self.collision_checker
+        if clearance_map is not None:
+            new_checker = clearance_map
+        else:
+            new_checker = make_collision_checker(map_grid, map_params, self.backend)
+
+        same_frame = (new_checker.res == old_checker.res and new_checker.x_min == old_checker.x_min
+                      and new_checker.y_min == old_checker.y_min
+                      and new_checker.free_mask.shape == old_checker.free_mask.shape)
+        if same_frame:
+            suspect = self.edges_touching(old_checker.free_mask & ~new_checker.free_mask)
+        else:
+            suspect = np.flatnonzero(self.parents[:self.node_count] >= 0)
+
+        self.map = map_grid
+        self.res = map_params['res']
+        self.x_limit = map_params['x_limit']
+        self.y_limit = map_params['y_limit']
+        self.origin = map_params['origin']
+        self.map_params = map_params
+        self.map_area = (self.x_limit[1] - self.x_limit[0]) * (self.y_limit[1] - self.y_limit[0])
+        self.rewire_gamma = 2.0 * math.sqrt(1.5 * self.map_area / math.pi)
+        self.collision_checker = new_checker
+
+        if suspect.size > 0:
+            blocked = ~new_checker.segments_free(self.nodes[suspect], self.nodes[self.parents[suspect]])
+            if np.any(blocked):
+                self.remove_subtrees(suspect[blocked])
+
+    # Make the start pose the root: attach it to the nearest node it can see
+    # and reverse the parent links between that node and the old root, which
+    # keeps every existing edge. Starts a fresh tree if no node is visible.
+    def reroot(self, start, max_candidates=32):
+        self.start = np.array(start, dtype=float)
+        k = self.node_count
+        dist = np.hypot(self.nodes[:k, 0] - self.start[0], self.nodes[:k, 1] - self.start[1])
+        candidates = np.argsort(dist)[:max_candidates]
+        visible = self.collision_checker.segments_free(self.nodes[candidates], np.broadcast_to(self.start, (len(candidates), 2)))
+        if not np.any(visible):
+            self.reorder([0])
+            self.nodes[0] = self.start
+            self.costs[0] = 0.0
+            self.nn_index.reset(self.nodes, 1)
+            return
+
+        anchor = int(candidates[np.argmax(visible)])
+        if dist[anchor] < 1e-9:
+            new_root = anchor
+        else:
+            new_root = self.node_count
+            self.nodes[new_root] = self.start
+            self.parents[new_root] = anchor
+            self.node_count += 1
+
+        prev, node = -1, new_root
+        while node != -1:
+            next_node = self.parents[node]
+            self.parents[node] = prev
+            prev, node = node, next_node
+
+        order = np.arange(self.node_count)
+        order[[0, new_root]] = order[[new_root, 0]]
+        self.reorder(order)
+        self.recompute_costs()
+
+    # Point the tree at a new goal and record the existing nodes that can
+    # already reach it, so a reused tree may answer without growing
+    def reset_goal(self, goal):
+        self.goal = np.array(goal, dtype=float)
+        self.goal_idx = None
+        self.goal_parents = []
+        self.best_goal_parent = None
+        self.best_cost = math.inf
+        k = self.node_count
+        dist = np.hypot(self.nodes[:k, 0] - self.goal[0], self.nodes[:k, 1] - self.goal[1])
+        candidates = np.flatnonzero(dist <= self.expand_dis)
+        if candidates.size > 0:
+            reach = self.collision_checker.segments_free(self.nodes[candidates], np.broadcast_to(self.goal, (len(candidates), 2)))
+            self.goal_parents = candidates[reach].tolist()
+            self.update_best_cost()
+
+    # Warm-start replanning: keep the tree from the previous plan(), drop the
+    # parts a new map blocks, re-root it at the current start pose and keep
+    # growing it toward the (possibly new) goal. Same return value as plan().
+    def replan(self, start, goal=None, map_grid=None, map_params=None, clearance_map=None,
+               expand_dis=None, max_iter=None, deadline_s=None):
+        if self.goal_idx is not None:
+            self.remove_subtrees([self.goal_idx])
+        if map_grid is not None and clearance_map is not self.collision_checker:
+            self.update_map(map_grid, map_params if map_params is not None else self.map_params, clearance_map)
+        if expand_dis is not None:
+            self.expand_dis = expand_dis
+        if max_iter is not None:
+            self.max_iter = max_iter
+        self.reserve(self.node_count + self.max_iter + 3)
+        self.reroot(start)
+        self.reset_goal(self.goal if goal is None else goal)
+        self.sampler = make_sampler(self.sampler_type, self.collision_checker, self.map_params, rng=self.rng,
+                                    goal=self.goal, goal_bias=self.goal_bias)
+        return self.plan(deadline_s)
+
+    # Pick the goal connection with the lowest total path cost
+    def update_best_cost(self):
+        if not self.goal_parents:
+            return
+        candidates = np.array(self.goal_parents)
+        to_goal = np.hypot(self.nodes[candidates, 0] - self.goal[0], self.nodes[candidates, 1] - self.goal[1])
+        total = self.costs[candidates] + to_goal
+        best = int(np.argmin(total))
+        self.best_goal_parent = int(candidates[best])
+        self.best_cost = float(total[best])
 
     # Convert continuous point to grid index
     def convert_to_grid(self, point):
@@ -35,100 +372,322 @@ class RRT:
         y_idx = int((point[1] - self.y_limit[0]) / self.res)
         return (x_idx, y_idx)
     
-    def plan(self):
+    # Plan a path from start to goal. With deadline_s, planning stops once that
+    # much wall-clock time has passed and the best path found so far is
+    # returned (None if there is none yet). Iterations, nodes and time spent
+    # are reported in self.stats.
+    def plan(self, deadline_s=None):
+        self.start_clock(deadline_s)
+        if self.mode == 'rrt':
+            path = self._plan_rrt()
+        else:
+            path = self._plan_rrt_star()
+        return self.record_stats(path)
+
+    def _plan_rrt(self):
+        # A reused tree may already reach the goal
+        if self.best_goal_parent is not None:
+            self.nodes[self.node_count] = self.goal
+            self.goal_idx = self.add_node(self.best_goal_parent, self.best_cost)
+            return self.finish_path()
+
         for _ in range(self.max_iter):
+            if self.out_of_time():
+                break
+
             # 1. Sample a random point
-            rnd_point = np.array([random.uniform(self.x_limit[0], self.x_limit[1]), 
-                                    random.uniform(self.y_limit[0], self.y_limit[1])])            
-            
+            rnd_x, rnd_y = self.sampler.sample()
+
             # 2. Find the nearest node in the tree
-            nearest_node = self.tree[np.argmin([np.linalg.norm(n - rnd_point) for n in self.tree])]
-            
-            # 3. Step toward the random point
-            direction = (rnd_point - nearest_node) / np.linalg.norm(rnd_point - nearest_node)
-            new_node = nearest_node + direction * self.expand_dis
-            
+            nearest_idx = self.nn_index.nearest((rnd_x, rnd_y))
+            nearest_node = self.nodes[nearest_idx]
+
+            # 3. Step toward the random point, writing the candidate into the next free slot
+            dx = rnd_x - nearest_node[0]
+            dy = rnd_y - nearest_node[1]
+            dist = math.hypot(dx, dy)
+            if dist == 0:
+                continue
+            new_idx = self.node_count
+            new_node = self.nodes[new_idx]
+            new_node[0] = nearest_node[0] + dx / dist * self.expand_dis
+            new_node[1] = nearest_node[1] + dy / dist * self.expand_dis
+
             # 4. Collision Check (Segment Check) & Add to Tree
             if self.is_segment_collision_free(nearest_node, new_node):
-                self.tree.append(new_node)
-                self.parent[tuple(new_node)] = nearest_node
-                
+                self.add_node(nearest_idx, self.costs[nearest_idx] + self.expand_dis)
+
                 # Check if goal is reached
-                if np.linalg.norm(new_node - self.goal) <= self.expand_dis:
+                if math.hypot(new_node[0] - self.goal[0], new_node[1] - self.goal[1]) <= self.expand_dis:
                     # Try to connect directly to goal
                     if self.is_segment_collision_free(new_node, self.goal):
-                        self.tree.append(self.goal)
-                        self.parent[tuple(self.goal)] = new_node
-                        path = self.extract_path()
-                        if self.enable_pruning:
-                            return self.prune_path(path)
-                        return path
+                        goal_cost = self.costs[new_idx] + math.hypot(new_node[0] - self.goal[0], new_node[1] - self.goal[1])
+                        self.nodes[self.node_count] = self.goal
+                        self.goal_idx = self.add_node(new_idx, goal_cost)
+                        return self.finish_path()
         return None
 
+    def _plan_rrt_star(self):
+        informed = self.mode == 'informed_rrt_star'
+        solution_iter = 0 if self.best_goal_parent is not None else None
+        for i in range(self.max_iter):
+            if solution_iter is not None and i - solution_iter >= self.refine_iter:
+                break
+            if self.out_of_time():
+                break
+
+            # 1. Sample a random point (inside the informed ellipse once a path exists)
+            if informed and self.best_cost < math.inf:
+                rnd_x, rnd_y = self.sample_informed()
+            else:
+                rnd_x, rnd_y = self.sampler.sample()
+
+            # 2. Find the nearest node and steer at most expand_dis toward the sample
+            nearest_idx = self.nn_index.nearest((rnd_x, rnd_y))
+            nearest_node = self.nodes[nearest_idx]
+            dx = rnd_x - nearest_node[0]
+            dy = rnd_y - nearest_node[1]
+            dist = math.hypot(dx, dy)
+            if dist == 0:
+                continue
+            step = min(dist, self.expand_dis)
+            new_node = self.nodes[self.node_count]
+            new_node[0] = nearest_node[0] + dx / dist * step
+            new_node[1] = nearest_node[1] + dy / dist * step
+            if not self.is_segment_collision_free(nearest_node, new_node):
+                continue
+
+            # 3. Check every neighbour within the rewiring radius in one batched query
+            n = self.node_count
+            radius = min(self.rewire_radius, self.rewire_gamma * math.sqrt(math.log(n + 1) / (n + 1)))
+            near = self.nn_index.within(new_node, radius)
+            if near.size > 0:
+                near_nodes = self.nodes[near]
+                near_dist = np.hypot(near_nodes[:, 0] - new_node[0], near_nodes[:, 1] - new_node[1])
+                near_free = self.collision_checker.segments_free(near_nodes, np.broadcast_to(new_node, near_nodes.shape))
+
+            # 4. Connect through the neighbour giving the cheapest path
+            parent_idx = nearest_idx
+            new_cost = self.costs[nearest_idx] + step
+            if near.size > 0 and np.any(near_free):
+                through = np.where(near_free, self.costs[near] + near_dist, math.inf)
+                best = int(np.argmin(through))
+                if through[best] < new_cost:
+                    parent_idx = int(near[best])
+                    new_cost = float(through[best])
+            new_idx = self.add_node(parent_idx, new_cost)
+
+            # 5. Rewire neighbours that are cheaper to reach through the new node
+            rewired = False
+            if near.size > 0:
+                improve = near_free & (new_cost + near_dist < self.costs[near] - 1e-9)
+                for idx, d in zip(near[improve], near_dist[improve]):
+                    self.rewire(int(idx), new_idx, new_cost + d)
+                    rewired = True
+
+            # 6. Record a goal connection and keep the best solution up to date
+            if math.hypot(new_node[0] - self.goal[0], new_node[1] - self.goal[1]) <= self.expand_dis:
+                if self.is_segment_collision_free(new_node, self.goal):
+                    self.goal_parents.append(new_idx)
+                    rewired = True
+                    if solution_iter is None:
+                        solution_iter = i
+            if rewired:
+                self.update_best_cost()
+
+        if self.best_goal_parent is None:
+            return None
+        self.nodes[self.node_count] = self.goal
+        self.goal_idx = self.add_node(self.best_goal_parent, self.best_cost)
+        return self.finish_path()
+
+    # Sample uniformly inside the ellipse with foci at start and goal whose
+    # major axis is the best path cost, falling back to the map bounds when
+    # the ellipse is larger than the map or a sample lands outside it
+    def sample_informed(self):
+        c_min = math.hypot(self.goal[0] - self.start[0], self.goal[1] - self.start[1])
+        c_best = self.best_cost
+        r_major = c_best / 2.0
+        r_minor = math.sqrt(max(c_best * c_best - c_min * c_min, 0.0)) / 2.0
+        if math.pi * r_major * r_minor < self.map_area:
+            center_x = (self.start[0] + self.goal[0]) / 2.0
+            center_y = (self.start[1] + self.goal[1]) / 2.0
+            heading = math.atan2(self.goal[1] - self.start[1], self.goal[0] - self.start[0])
+            cos_h, sin_h = math.cos(heading), math.sin(heading)
+            for _ in range(10):
+                r = math.sqrt(self.rng.random())
+                theta = self.rng.uniform(-math.pi, math.pi)
+                ex = r_major * r * math.cos(theta)
+                ey = r_minor * r * math.sin(theta)
+                x = center_x + cos_h * ex - sin_h * ey
+                y = center_y + sin_h * ex + cos_h * ey
+                if self.x_limit[0] <= x <= self.x_limit[1] and self.y_limit[0] <= y <= self.y_limit[1]:
+                    return x, y
+        return self.sampler.sample()
+
+    def finish_path(self):
+        path = self.extract_path()
+        if self.enable_pruning:
+            return self.prune_path(path)
+        return path
+
+    # Grow the tree one step (at most expand_dis) toward a target point
+    def extend(self, target_x, target_y):
+        if self.node_count >= len(self.nodes):
+            return TRAPPED, -1
+        nearest_idx = self.nn_index.nearest((target_x, target_y))
+        nearest_node = self.nodes[nearest_idx]
+        dx = target_x - nearest_node[0]
+        dy = target_y - nearest_node[1]
+        dist = math.hypot(dx, dy)
+        if dist == 0:
+            return REACHED, nearest_idx
+
+        new_node = self.nodes[self.node_count]
+        if dist <= self.expand_dis:
+            new_node[0] = target_x
+            new_node[1] = target_y
+            status = REACHED
+        else:
+            new_node[0] = nearest_node[0] + dx / dist * self.expand_dis
+            new_node[1] = nearest_node[1] + dy / dist * self.expand_dis
+            status = ADVANCED
+        if not self.is_segment_collision_free(nearest_node, new_node):
+            return TRAPPED, -1
+        step = min(dist, self.expand_dis)
+        return status, self.add_node(nearest_idx, self.costs[nearest_idx] + step)
+
+    # Keep extending toward a target point until it is reached or blocked
+    def connect(self, target_x, target_y):
+        status, idx = ADVANCED, -1
+        while status == ADVANCED:
+            status, new_idx = self.extend(target_x, target_y)
+            if status != TRAPPED:
+                idx = new_idx
+        return status, idx
+
     # Check if a single node is collision-free
     def is_collision_free(self, node):
-        x_idx, y_idx = self.convert_to_grid(node)
-        
-        # Check bounds
-        if x_idx < 0 or x_idx >= self.map.shape[1] or y_idx < 0 or y_idx >= self.map.shape[0]:
-            return False
-        
-        # Check if the cell is occupied (1.0 means free, 0.5 mean unknown, 0.0 means occupied)
-        if self.map[y_idx, x_idx] != 1.0:
-            return False
-        
-        return True
+        # Only cells equal to 1.0 are free (0.5 means unknown, 0.0 means occupied)
+        return self.collision_checker.is_point_free(node)
 
     # Check if the line segment between start_node and end_node is collision-free
+    # by visiting every grid cell the segment passes through
     def is_segment_collision_free(self, start_node, end_node):
-        dist = np.linalg.norm(end_node - start_node)
-        if dist == 0: return True
-        
-        # Calculate number of steps to check based on grid resolution
-        steps = int(math.ceil(dist / (self.res * 0.5)))
-        
-        direction = (end_node - start_node) / dist
-        
-        for i in range(steps + 1):
-             check_point = start_node + direction * (i * (dist / steps))
-             if not self.is_collision_free(check_point):
-                 return False
-                 
-        return True
-
-    def extract_path(self):
-        path = [self.goal]
-        curr = tuple(self.goal)
-        while curr is not None:
-            if curr not in self.parent:
-               break 
-            
-            val = self.parent[curr]
-            if val is not None:
-                path.append(val) 
-            curr = tuple(val) if val is not None else None
-        return path[::-1] # Return reversed path (start -> goal)
-
-    # Shortcut-based path pruning: remove intermediate waypoints when a direct
-    # segment between two farther points is collision-free.
-    def prune_path(self, path):
-        if path is None or len(path) <= 2:
-            return path
-
-        path_np = [np.array(p) for p in path]
-        pruned = [path_np[0]]
-        i = 0
-
-        while i < len(path_np) - 1:
-            next_i = i + 1
-
-            # Greedily connect to the farthest reachable waypoint.
-            for j in range(len(path_np) - 1, i, -1):
-                if self.is_segment_collision_free(path_np[i], path_np[j]):
-                    next_i = j
-                    break
-
-            pruned.append(path_np[next_i])
-            i = next_i
-
-        return pruned
\ No newline at end of file
+        return self.collision_checker.is_segment_free(start_node, end_node)
+
+    # Walk parent indices from the goal back to the root
+    def extract_path(self, idx=None):
+        if idx is None:
+            idx = self.goal_idx
+        if idx is None:
+            return None
+        chain = []
+        while idx >= 0:
+            chain.append(idx)
+            idx = self.parents[idx]
+        return self.nodes[chain[::-1]] # Return reversed path (start -> goal)
+
+# Bidirectional RRT-Connect: one tree grows from the start and one from the
+# goal. Each iteration extends one tree a single step toward a random sample,
+# then greedily connects the other tree to the new node, and the trees swap
+# roles. Same plan() -> path-or-None contract as RRT.
+class RRTConnect(RRT):
+    def __init__(
+        self,
+        start,
+        goal,
+        map_grid,
+        map_params,
+        expand_dis=0.5,
+        max_iter=500,
+        enable_pruning=True,
+        nn_index='kdtree',
+        clearance_map=None,
+        robot_radius=None,
+        sampler='uniform',
+        seed=None,
+        backend='auto',
+    ):
+        super().__init__(start, goal, map_grid, map_params, expand_dis=expand_dis, max_iter=max_iter,
+                         enable_pruning=enable_pruning, nn_index=nn_index,
+                         clearance_map=clearance_map, robot_radius=robot_radius,
+                         sampler=sampler, seed=seed, backend=backend)
+
+        self.mode = 'rrt_connect'
+        self.meet_point = None # where the trees joined in the last plan
+
+        # Tree rooted at the goal, sharing this planner's collision checker
+        self.goal_tree = RRT(goal, start, map_grid, map_params, expand_dis=expand_dis, max_iter=max_iter,
+                             enable_pruning=False, nn_index=nn_index, clearance_map=self.collision_checker,
+                             backend=self.backend)
+
+    # Nodes of both trees, shape (n_start + n_goal, 2), for plotting
+    @property
+    def tree(self):
+        return np.vstack((self.nodes[:self.node_count], self.goal_tree.nodes[:self.goal_tree.node_count]))
+
+    def plan(self, deadline_s=None):
+        self.start_clock(deadline_s)
+        return self.record_stats(self._plan_connect())
+
+    # Warm-start replanning for both trees: each drops the edges a new map
+    # blocks, the start tree is re-rooted at the new start and the goal tree at
+    # the (possibly new) goal. The goal tree first tries to connect to the
+    # start-tree node nearest the last meeting point, which answers at once
+    # when both halves of the old path survived; otherwise the trees keep
+    # growing toward each other. Same return value as plan().
+    def replan(self, start, goal=None, map_grid=None, map_params=None, clearance_map=None,
+               expand_dis=None, max_iter=None, deadline_s=None):
+        goal = self.goal if goal is None else np.array(goal, dtype=float)
+        if map_grid is not None and clearance_map is not self.collision_checker:
+            self.update_map(map_grid, map_params if map_params is not None else self.map_params, clearance_map)
+            self.goal_tree.update_map(map_grid, self.map_params, self.collision_checker)
+        for tree, root, target in ((self, start, goal), (self.goal_tree, goal, start)):
+            if expand_dis is not None:
+                tree.expand_dis = expand_dis
+            if max_iter is not None:
+                tree.max_iter = max_iter
+            tree.reserve(tree.node_count + tree.max_iter + 3)
+            tree.reroot(root)
+            tree.goal = np.array(target, dtype=float)
+        self.sampler = make_sampler(self.sampler_type, self.collision_checker, self.map_params, rng=self.rng,
+                                    goal=self.goal, goal_bias=self.goal_bias)
+
+        self.start_clock(deadline_s)
+        path = None
+        if self.meet_point is not None:
+            idx_a = self.nn_index.nearest(self.meet_point)
+            status, idx_b = self.goal_tree.connect(self.nodes[idx_a, 0], self.nodes[idx_a, 1])
+            if status == REACHED:
+                path = self.join_paths(idx_a, idx_b)
+        if path is None:
+            path = self._plan_connect()
+        return self.record_stats(path)
+
+    def _plan_connect(self):
+        tree_a, tree_b = self, self.goal_tree
+        for _ in range(self.max_iter):
+            if self.out_of_time():
+                break
+            rnd_x, rnd_y = self.sampler.sample()
+
+            status, idx_a = tree_a.extend(rnd_x, rnd_y)
+            if status != TRAPPED:
+                new_node = tree_a.nodes[idx_a]
+                status, idx_b = tree_b.connect(new_node[0], new_node[1])
+                if status == REACHED:
+                    if tree_a is self:
+                        return self.join_paths(idx_a, idx_b)
+                    return self.join_paths(idx_b, idx_a)
+            tree_a, tree_b = tree_b, tree_a
+        return None
+
+    # Join the start-tree branch ending at start_idx with the goal-tree branch
+    # ending at goal_tree_idx; both end at the same point
+    def join_paths(self, start_idx, goal_tree_idx):
+        self.meet_point = self.nodes[start_idx].copy()
+        path = np.vstack((self.extract_path(start_idx), self.goal_tree.extract_path(goal_tree_idx)[::-1][1:]))
+        if self.enable_pruning:
+            return self.prune_path(path)
+        return path
@@ -0,0 +1,245 @@
+import math
+import time
+import numpy as np
+from raytrace import traverse_rays, traverse_rays_layered
+from occupancy_models import make_occupancy_model
+from tiled_map import TiledGrid
+
+# Benchmarks for the lidar grid update in mapping.py. MapClass itself needs a
+# ROS connection, so the ray-clearing step is exercised here on synthetic scans.
+
+GRID_SIZE = 0.1
+
+# Synthetic scan around a pose: n beams over 360 deg, ranges between 0.3 m and
+# max_range with a few dropouts (inf), in global coordinates
+def synthetic_scan(n_beams=1080, max_range=8.0, seed=0):
+    rng = np.random.default_rng(seed)
+    pose_x, pose_y = rng.uniform(-5.0, 5.0, 2)
+    yaw = rng.uniform(-np.pi, np.pi)
+    angles = np.linspace(-np.pi, np.pi, n_beams, endpoint=False)
+    ranges = rng.uniform(0.3, max_range, n_beams)
+    ranges[rng.random(n_beams) < 0.05] = np.inf
+    valid = np.isfinite(ranges)
+    x = pose_x + ranges[valid] * np.cos(angles[valid] + yaw)
+    y = pose_y + ranges[valid] * np.sin(angles[valid] + yaw)
+    return pose_x, pose_y, x, y
+
+# The step-sampling loop mapping.update_occupancy_grid used before the exact traversal
+def legacy_clear_rays(grid, x_min, y_min, x_scan_global, y_scan_global, pose_x, pose_y, range_max):
+    dx = x_scan_global - pose_x
+    dy = y_scan_global - pose_y
+    distances = np.sqrt(dx**2 + dy**2)
+    trace_distances = np.minimum(distances, range_max)
+    N_list = trace_distances / GRID_SIZE
+    max_steps = int(np.ceil(np.max(N_list))) if N_list.size > 0 else 0
+    for step in range(max_steps):
+        mask = step < (N_list - 1.0)
+        if not np.any(mask):
+            break
+        t = step / N_list[mask]
+        x = pose_x + dx[mask] * t
+        y = pose_y + dy[mask] * t
+        i = ((x - x_min) / GRID_SIZE).astype(int)
+        j = ((y - y_min) / GRID_SIZE).astype(int)
+        valid_idx = (i >= 0) & (i < grid.shape[1]) & (j >= 0) & (j < grid.shape[0])
+        grid[j[valid_idx], i[valid_idx]] = 0.0
+
+# Scalar Amanatides-Woo walk of one ray, for checking traverse_rays cell by cell
+def walk_ray(x0, y0, x1, y1, x_min, y_min, res):
+    gx0, gy0 = (x0 - x_min) / res, (y0 - y_min) / res
+    gx1, gy1 = (x1 - x_min) / res, (y1 - y_min) / res
+    cx, cy = math.floor(gx0), math.floor(gy0)
+    end = (math.floor(gx1), math.floor(gy1))
+    dx, dy = gx1 - gx0, gy1 - gy0
+    step_x = 1 if dx > 0 else -1
+    step_y = 1 if dy > 0 else -1
+    t_max_x = ((cx + (step_x > 0)) - gx0) / dx if dx != 0 else math.inf
+    t_max_y = ((cy + (step_y > 0)) - gy0) / dy if dy != 0 else math.inf
+    n_left = abs(end[0] - cx) + abs(end[1] - cy)
+    cells = []
+    while n_left > 0:
+        cells.append((cx, cy))
+        if t_max_x < t_max_y:
+            cx += step_x
+            t_max_x += abs(1.0 / dx)
+            n_left -= 1
+        elif t_max_y < t_max_x:
+            cy += step_y
+            t_max_y += abs(1.0 / dy)
+            n_left -= 1
+        else:
+            # Through a grid corner straight into the diagonal cell
+            cx += step_x
+            cy += step_y
+            t_max_x += abs(1.0 / dx)
+            t_max_y += abs(1.0 / dy)
+            n_left -= 2
+    return cells
+
+def benchmark_clear_rays(n_scans=20, n_beams=1080, range_max=12.0, extent=20.0):
+    x_min = y_min = -extent
+    shape = (int(2 * extent / GRID_SIZE), int(2 * extent / GRID_SIZE))
+    legacy_times, exact_times = [], []
+    mismatches = 0
+    for seed in range(n_scans):
+        pose_x, pose_y, x, y = synthetic_scan(n_beams, seed=seed)
+
+        grid = np.full(shape, 0.5)
+        t0 = time.perf_counter()
+        legacy_clear_rays(grid, x_min, y_min, x, y, pose_x, pose_y, range_max)
+        legacy_times.append(time.perf_counter() - t0)
+
+        grid = np.full(shape, 0.5)
+        t0 = time.perf_counter()
+        dx, dy = x - pose_x, y - pose_y
+        scale = np.minimum(1.0, range_max / np.maximum(np.hypot(dx, dy), 1e-12))
+        free_cells = traverse_rays(pose_x, pose_y, pose_x + dx * scale, pose_y + dy * scale, x_min, y_min, GRID_SIZE, shape)
+        grid.flat[free_cells] = 0.0
+        exact_times.append(time.perf_counter() - t0)
+
+        expected = set()
+        for x1, y1 in zip(pose_x + dx * scale, pose_y + dy * scale):
+            expected.update(cy * shape[1] + cx for cx, cy in walk_ray(pose_x, pose_y, x1, y1, x_min, y_min, GRID_SIZE))
+        mismatches += len(expected.symmetric_difference(free_cells.tolist()))
+    return np.median(legacy_times), np.median(exact_times), mismatches
+
+# Per-scan cost and memory of each occupancy model on the same scans, and the
+# published value of a wall cell seen by n_hits scans after one stray ray
+# (e.g. a dropout beam traced to max range) passes through it
+def benchmark_models(n_scans=20, n_beams=1080, range_max=12.0, extent=20.0, n_hits=5):
+    x_min = y_min = -extent
+    shape = (int(2 * extent / GRID_SIZE), int(2 * extent / GRID_SIZE))
+    results = {}
+    for mode in ['overwrite', 'log_odds']:
+        model = make_occupancy_model(mode)
+        grid = model.new_grid(shape)
+        times = []
+        for seed in range(n_scans):
+            pose_x, pose_y, x, y = synthetic_scan(n_beams, seed=seed)
+            t0 = time.perf_counter()
+            model.apply_misses(grid, traverse_rays(pose_x, pose_y, x, y, x_min, y_min, GRID_SIZE, shape))
+            i = ((x - x_min) / GRID_SIZE).astype(int)
+            j = ((y - y_min) / GRID_SIZE).astype(int)
+            model.apply_hits(grid, j * shape[1] + i)
+            times.append(time.perf_counter() - t0)
+
+        grid = model.new_grid(shape)
+        wall = int((0.0 - y_min) / GRID_SIZE) * shape[1] + int((2.0 - x_min) / GRID_SIZE)
+        for _ in range(n_hits):
+            model.apply_hits(grid, np.array([wall]))
+        model.apply_misses(grid, traverse_rays(0.05, 0.05, [4.05], [0.05], x_min, y_min, GRID_SIZE, shape))
+        results[mode] = (np.median(times), grid.nbytes, model.to_ros_data(grid)[wall])
+    return results
+
+# Grow a dense grid with np.pad to cover the given points, as
+# update_occupancy_grid did before the tiled map
+def legacy_pad_grid(grid, x_min, x_max, y_min, y_max, all_x, all_y, unknown=0.5):
+    pad_left = pad_right = pad_bottom = pad_top = 0
+    if np.min(all_x) < x_min:
+        pad_left = int(np.ceil((x_min - np.min(all_x)) / GRID_SIZE))
+        x_min -= pad_left * GRID_SIZE
+    if np.max(all_x) > x_max:
+        pad_right = int(np.ceil((np.max(all_x) - x_max) / GRID_SIZE))
+        x_max += pad_right * GRID_SIZE
+    if np.min(all_y) < y_min:
+        pad_bottom = int(np.ceil((y_min - np.min(all_y)) / GRID_SIZE))
+        y_min -= pad_bottom * GRID_SIZE
+    if np.max(all_y) > y_max:
+        pad_top = int(np.ceil((np.max(all_y) - y_max) / GRID_SIZE))
+        y_max += pad_top * GRID_SIZE
+    if any([pad_left, pad_right, pad_bottom, pad_top]):
+        grid = np.pad(grid, ((pad_bottom, pad_top), (pad_left, pad_right)), mode='constant', constant_values=unknown)
+    return grid, x_min, x_max, y_min, y_max
+
+# Per-scan map update (without publishing) while the robot explores outward
+# along a spiral, so the map keeps growing: whole-grid np.pad vs tiled map
+def benchmark_growth(n_scans=300, n_beams=360, max_range=8.0):
+    model = make_occupancy_model('overwrite')
+    grid, x_min, x_max, y_min, y_max = model.new_grid((40, 40)), -2.0, 2.0, -2.0, 2.0
+    tiled_map = TiledGrid(GRID_SIZE, model, bounds=(-2.0, 2.0, -2.0, 2.0))
+    pad_times, tiled_times = [], []
+    for k in range(n_scans):
+        pose_x, pose_y = 0.2 * k * np.cos(0.05 * k), 0.2 * k * np.sin(0.05 * k)
+        scan_x, scan_y, x, y = synthetic_scan(n_beams, max_range, seed=k)
+        x, y = x - scan_x + pose_x, y - scan_y + pose_y
+
+        t0 = time.perf_counter()
+        grid, x_min, x_max, y_min, y_max = legacy_pad_grid(grid, x_min, x_max, y_min, y_max,
+                                                           np.append(x, pose_x), np.append(y, pose_y))
+        model.apply_misses(grid, traverse_rays(pose_x, pose_y, x, y, x_min, y_min, GRID_SIZE, grid.shape))
+        model.apply_hits(grid, ((y - y_min) / GRID_SIZE).astype(int) * grid.shape[1] + ((x - x_min) / GRID_SIZE).astype(int))
+        pad_times.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        tiled_map.ensure_region(pose_x, pose_x, pose_y, pose_y)
+        tiled_map.integrate_scan(pose_x, pose_y, x, y, x, y)
+        tiled_times.append(time.perf_counter() - t0)
+
+    dense = tiled_map.dense()[0]
+    t0 = time.perf_counter()
+    tiled_map.dense()
+    dense_time = time.perf_counter() - t0
+    return (np.mean(pad_times), np.mean(tiled_times), np.mean(pad_times[-50:]), np.mean(tiled_times[-50:]),
+            grid.shape, dense.shape, grid.nbytes, tiled_map.nbytes, dense_time)
+
+# Ray tracing for the full map and the camera-FOV layer: two traversals (one
+# per grid, as before the fused update) vs one layered traversal, for FOV
+# layers of increasing size. Beams without a return are traced to
+# camera_range in the FOV layer only.
+def benchmark_fused(fov_deg, camera_range, n_scans=200, n_beams=1080, range_max=12.0):
+    rng = np.random.default_rng(0)
+    angles = np.linspace(-np.pi, np.pi, n_beams)
+    in_fov = np.abs(angles) <= np.radians(fov_deg / 2.0)
+    shape, x_min, y_min = (260, 260), -13.0, -13.0
+    separate_times, fused_times = [], []
+    mismatches = 0
+    for _ in range(n_scans):
+        ranges = rng.uniform(0.3, 10.0, n_beams)
+        ranges[rng.random(n_beams) < 0.1] = np.inf
+        pose_x, pose_y = rng.uniform(-1.0, 1.0, 2)
+        valid = np.isfinite(ranges)
+        full_length = np.where(valid, np.minimum(ranges, range_max), 0.0)
+        fov_length = np.where(in_fov, np.clip(np.where(valid, ranges, camera_range), 0.0, camera_range), 0.0)
+
+        t0 = time.perf_counter()
+        full_cells = traverse_rays(pose_x, pose_y, pose_x + full_length[valid] * np.cos(angles[valid]),
+                                   pose_y + full_length[valid] * np.sin(angles[valid]), x_min, y_min, GRID_SIZE, shape)
+        fov_cells = traverse_rays(pose_x, pose_y, pose_x + fov_length[in_fov] * np.cos(angles[in_fov]),
+                                  pose_y + fov_length[in_fov] * np.sin(angles[in_fov]), x_min, y_min, GRID_SIZE, shape)
+        separate_times.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        trace_length = np.maximum(full_length, fov_length)
+        traced = trace_length > 0
+        trace_length = trace_length[traced]
+        layers = traverse_rays_layered(pose_x, pose_y, pose_x + trace_length * np.cos(angles[traced]),
+                                       pose_y + trace_length * np.sin(angles[traced]),
+                                       [full_length[traced] / trace_length, fov_length[traced] / trace_length],
+                                       x_min, y_min, GRID_SIZE, shape)
+        fused_times.append(time.perf_counter() - t0)
+        mismatches += len(set(full_cells.tolist()).symmetric_difference(layers[0].tolist()))
+        mismatches += len(set(fov_cells.tolist()).symmetric_difference(layers[1].tolist()))
+    return np.median(separate_times), np.median(fused_times), mismatches
+
+if __name__ == "__main__":
+    print("Ray clearing per scan (ms), synthetic 360 deg scans on a 0.1 m grid")
+    print(f"{'beams':>6} {'legacy loop':>12} {'exact':>8} {'speedup':>8} {'cell mismatches':>16}")
+    for n_beams in [360, 1080, 2160]:
+        legacy, exact, mismatches = benchmark_clear_rays(n_beams=n_beams)
+        print(f"{n_beams:>6} {1e3 * legacy:12.2f} {1e3 * exact:8.2f} {legacy / exact:7.1f}x {mismatches:>16}")
+
+    print("\nOccupancy models: per-scan update, grid memory, wall cell after one stray ray")
+    for mode, (update_time, nbytes, wall) in benchmark_models().items():
+        print(f"{mode:>10}: {1e3 * update_time:6.2f} ms/scan, {nbytes / 1024:7.0f} KiB, published value {wall}")
+
+    print("\nGrowing map over 300 scans along a 60 m spiral (per-scan update, ms)")
+    pad_mean, tiled_mean, pad_late, tiled_late, pad_shape, dense_shape, pad_bytes, tiled_bytes, dense_time = benchmark_growth()
+    print(f"  np.pad grid: {1e3 * pad_mean:6.2f} mean, {1e3 * pad_late:6.2f} last 50 scans, {pad_shape} {pad_bytes / 1024:7.0f} KiB")
+    print(f"  tiled map:   {1e3 * tiled_mean:6.2f} mean, {1e3 * tiled_late:6.2f} last 50 scans, {dense_shape} {tiled_bytes / 1024:7.0f} KiB in tiles")
+    print(f"  dense export for publishing: {1e3 * dense_time:.2f} ms")
+
+    print("\nFull map + camera-FOV layer ray tracing per scan (ms), 1080 beams")
+    print(f"{'FOV':>12} {'two passes':>11} {'fused':>8} {'cell mismatches':>16}")
+    for fov_deg, camera_range in [(66, 3.0), (120, 6.0), (360, 12.0)]:
+        separate, fused, mismatches = benchmark_fused(fov_deg, camera_range)
+        print(f"{fov_deg:>4} deg {camera_range:4.0f} m {1e3 * separate:10.2f} {1e3 * fused:8.2f} {mismatches:>16}")
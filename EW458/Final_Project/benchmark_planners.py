@@ -0,0 +1,249 @@
+import os
+import csv
+import json
+import time
+import random
+import argparse
+import importlib.util
+import numpy as np
+from scipy import ndimage
+from RRT import RRT, RRTConnect, PLANNER_MODES
+from grid_planner import GridPlanner, GRID_PLANNER_MODES
+from benchmark_rrt import DATA_DIR, SAVED_MAP_DIRS, load_saved_map, pick_free_points
+
+# Benchmark suite for every planner copy in the repo over saved, wall-layout and
+# maze maps. All maps are built in the Final_Project convention (1.0 free,
+# 0.5 unknown, 0.0 occupied, row 0 at y_min) and converted per planner copy.
+
+REPO_DIR = os.path.normpath(os.path.join(DATA_DIR, '..'))
+LEGACY_RRT_FILES = {
+    'project_3': os.path.join(REPO_DIR, 'Project_3', 'RRT.py'),
+    'project_4': os.path.join(REPO_DIR, 'Project_4', 'RRT.py'),
+    '12_weeks': os.path.join(REPO_DIR, '12_Weeks', 'RRT.py'),
+}
+PROJECT_4_MAP = os.path.join(REPO_DIR, 'Project_4', 'Occupancy208_100m2p.png')
+
+# Load one of the older RRT.py copies under its own module name
+def load_legacy_rrt(name):
+    spec = importlib.util.spec_from_file_location(f"rrt_{name}", LEGACY_RRT_FILES[name])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.RRT
+
+def map_params_for(grid, res, x_min, y_min):
+    return {
+        'res': res,
+        'x_limit': [x_min, x_min + grid.shape[1] * res],
+        'y_limit': [y_min, y_min + grid.shape[0] * res],
+        'origin': [x_min, y_min]
+    }
+
+# Rasterize rectangular walls (center x, center y, length, thickness, yaw) the
+# way Project_3.py does, then inflate them by the robot radius
+def wall_layout_map(walls, res=0.1, extent=5.0, robot_radius=0.3):
+    n = int(round(2 * extent / res))
+    centers = -extent + (np.arange(n) + 0.5) * res
+    x_grid, y_grid = np.meshgrid(centers, centers)
+    occupied = np.zeros((n, n), dtype=bool)
+    for x, y, length, thickness, yaw in walls:
+        u = np.cos(yaw) * (x_grid - x) + np.sin(yaw) * (y_grid - y)
+        v = -np.sin(yaw) * (x_grid - x) + np.cos(yaw) * (y_grid - y)
+        occupied |= (np.abs(u) <= length / 2) & (np.abs(v) <= thickness / 2)
+    inflation = int(np.ceil(robot_radius / res))
+    if inflation > 0:
+        occupied = ndimage.binary_dilation(occupied, iterations=inflation)
+    grid = np.where(occupied, 0.0, 1.0)
+    return grid, map_params_for(grid, res, -extent, -extent)
+
+# A 10 m x 10 m arena with interior walls, similar to the Project_3 scene
+PROJECT_3_WALLS = [
+    (0.0, 4.95, 10.0, 0.1, 0.0), (0.0, -4.95, 10.0, 0.1, 0.0),
+    (4.95, 0.0, 10.0, 0.1, np.pi / 2), (-4.95, 0.0, 10.0, 0.1, np.pi / 2),
+    (-2.5, 2.5, 5.0, 0.1, 0.0), (2.0, 1.0, 4.0, 0.1, np.pi / 2),
+    (-1.0, -1.0, 4.0, 0.1, 0.0), (-3.0, -3.0, 3.0, 0.1, np.pi / 2),
+    (2.5, -2.5, 3.0, 0.1, np.pi / 4), (0.5, 3.5, 2.0, 0.1, np.pi / 2),
+]
+
+# Perfect maze from an iterative depth-first search over an n_cells x n_cells
+# lattice; corridors are corridor cells wide and walls are one cell thick
+def maze_map(n_cells=8, corridor=6, res=0.1, seed=0):
+    rng = np.random.default_rng(seed)
+    size = n_cells * (corridor + 1) + 1
+    free = np.zeros((size, size), dtype=bool)
+
+    def carve(cx, cy):
+        free[cy * (corridor + 1) + 1:cy * (corridor + 1) + 1 + corridor,
+             cx * (corridor + 1) + 1:cx * (corridor + 1) + 1 + corridor] = True
+
+    visited = np.zeros((n_cells, n_cells), dtype=bool)
+    stack = [(0, 0)]
+    visited[0, 0] = True
+    carve(0, 0)
+    while stack:
+        cx, cy = stack[-1]
+        options = [(cx + dx, cy + dy) for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1))
+                   if 0 <= cx + dx < n_cells and 0 <= cy + dy < n_cells and not visited[cy + dy, cx + dx]]
+        if not options:
+            stack.pop()
+            continue
+        nx, ny = options[rng.integers(len(options))]
+        visited[ny, nx] = True
+        carve(nx, ny)
+        # Open the wall between the two lattice cells
+        x0 = min(cx, nx) * (corridor + 1) + 1
+        y0 = min(cy, ny) * (corridor + 1) + 1
+        if nx != cx:
+            free[y0:y0 + corridor, x0 + corridor] = True
+        else:
+            free[y0 + corridor, x0:x0 + corridor] = True
+        stack.append((nx, ny))
+
+    grid = np.where(free, 1.0, 0.0)
+    extent = size * res / 2
+    return grid, map_params_for(grid, res, -extent, -extent)
+
+# Project_4's floor-plan image (white free, black occupied, row 0 at y_max),
+# only when Pillow is available
+def project_4_map(res=0.1):
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    image = np.array(Image.open(PROJECT_4_MAP).convert('L'), dtype=float) / 255.0
+    grid = np.where(np.flipud(image) >= 0.5, 1.0, 0.0)
+    return grid, map_params_for(grid, res, -grid.shape[1] * res / 2, -grid.shape[0] * res / 2)
+
+def build_maps(n_mazes=2):
+    maps = {}
+    for map_dir in SAVED_MAP_DIRS:
+        maps['saved_' + os.path.basename(os.path.normpath(map_dir)).lower()] = load_saved_map(map_dir)
+    maps['project_3_walls'] = wall_layout_map(PROJECT_3_WALLS)
+    for seed in range(n_mazes):
+        maps[f'maze_{seed}'] = maze_map(seed=seed)
+    project_4 = project_4_map()
+    if project_4 is not None:
+        maps['project_4_floor'] = project_4
+    return maps
+
+# Adapters: build a planner for one start/goal on a Final_Project-convention
+# grid and return (planner, plan function). The old copies read the global
+# random module, so it is seeded here.
+def make_legacy_planner(name, rrt_class, grid, map_params, start, goal, expand_dis, max_iter, seed):
+    random.seed(seed)
+    if name == 'project_3':
+        # 1.0 (or anything above 0.5) is occupied
+        legacy_grid = np.where(grid == 1.0, 0.0, 1.0)
+    elif name == 'project_4':
+        # Row 0 is y_max and cells below 0.5 are occupied, so unknown must be blocked
+        legacy_grid = np.flipud(np.where(grid == 1.0, 1.0, 0.0))
+    else:
+        legacy_grid = grid
+    planner = rrt_class(start=start, goal=goal, map_grid=legacy_grid, map_params=map_params,
+                        expand_dis=expand_dis, max_iter=max_iter)
+    return planner, planner.plan
+
+def make_final_planner(variant, grid, map_params, start, goal, expand_dis, max_iter, seed, deadline_s=None):
+    if variant in GRID_PLANNER_MODES:
+        planner = GridPlanner(start=start, goal=goal, map_grid=grid, map_params=map_params, mode=variant)
+    elif variant == 'rrt_connect':
+        planner = RRTConnect(start=start, goal=goal, map_grid=grid, map_params=map_params,
+                             expand_dis=expand_dis, max_iter=max_iter, sampler='free', seed=seed)
+    else:
+        planner = RRT(start=start, goal=goal, map_grid=grid, map_params=map_params, expand_dis=expand_dis,
+                      max_iter=max_iter, mode=variant, refine_iter=300, sampler='free', goal_bias=0.05, seed=seed)
+    return planner, lambda: planner.plan(deadline_s=deadline_s)
+
+FINAL_VARIANTS = list(PLANNER_MODES) + ['rrt_connect'] + list(GRID_PLANNER_MODES)
+ALL_PLANNERS = list(LEGACY_RRT_FILES) + ['final_' + v for v in FINAL_VARIANTS]
+
+def path_length(path):
+    path = np.asarray(path, dtype=float)
+    return float(np.sum(np.hypot(np.diff(path[:, 0]), np.diff(path[:, 1]))))
+
+# Run every planner on every map for n_trials seeded start/goal pairs and
+# return one record per trial
+def run_benchmark(maps, planners, n_trials=10, expand_dis=0.5, max_iter=3000, legacy_max_iter=1500,
+                  min_dist=4.0, max_dist=10.0, deadline_s=None):
+    legacy_classes = {name: load_legacy_rrt(name) for name in planners if name in LEGACY_RRT_FILES}
+    records = []
+    for map_name, (grid, map_params) in maps.items():
+        pairs = [pick_free_points(grid, map_params, min_dist=min_dist, max_dist=max_dist, seed=seed) for seed in range(n_trials)]
+        for name in planners:
+            for seed, (start, goal) in enumerate(pairs):
+                t0 = time.perf_counter()
+                if name in legacy_classes:
+                    planner, plan = make_legacy_planner(name, legacy_classes[name], grid, map_params, start, goal,
+                                                        expand_dis, legacy_max_iter, seed)
+                else:
+                    planner, plan = make_final_planner(name[len('final_'):], grid, map_params, start, goal,
+                                                       expand_dis, max_iter, seed, deadline_s)
+                path = plan()
+                elapsed = time.perf_counter() - t0
+                stats = getattr(planner, 'stats', {})
+                records.append({
+                    'map': map_name,
+                    'planner': name,
+                    'seed': seed,
+                    'success': path is not None,
+                    'path_length': path_length(path) if path is not None else None,
+                    'iterations': stats.get('iterations'),
+                    'nodes': len(planner.tree),
+                    'time_s': elapsed,
+                })
+    return records
+
+# Success rate, median path length / iterations / nodes and p50/p95/p99 time per (map, planner)
+def summarize(records):
+    groups = {}
+    for record in records:
+        groups.setdefault((record['map'], record['planner']), []).append(record)
+    summary = []
+    for (map_name, name), rows in groups.items():
+        times = np.array([r['time_s'] for r in rows])
+        lengths = [r['path_length'] for r in rows if r['success']]
+        iterations = [r['iterations'] for r in rows if r['iterations'] is not None]
+        summary.append({
+            'map': map_name,
+            'planner': name,
+            'trials': len(rows),
+            'success_rate': float(np.mean([r['success'] for r in rows])),
+            'path_length_median': float(np.median(lengths)) if lengths else None,
+            'iterations_median': float(np.median(iterations)) if iterations else None,
+            'nodes_median': float(np.median([r['nodes'] for r in rows])),
+            'time_p50_s': float(np.percentile(times, 50)),
+            'time_p95_s': float(np.percentile(times, 95)),
+            'time_p99_s': float(np.percentile(times, 99)),
+        })
+    return summary
+
+def write_results(summary, records, out_prefix):
+    with open(out_prefix + '.json', 'w') as f:
+        json.dump({'summary': summary, 'trials': records}, f, indent=2)
+    with open(out_prefix + '.csv', 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(summary[0].keys()))
+        writer.writeheader()
+        writer.writerows(summary)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark every RRT copy and Final_Project planner mode.")
+    parser.add_argument('--trials', type=int, default=10, help="seeded start/goal pairs per map")
+    parser.add_argument('--planners', nargs='+', default=ALL_PLANNERS, choices=ALL_PLANNERS)
+    parser.add_argument('--mazes', type=int, default=2, help="number of procedural mazes")
+    parser.add_argument('--max-iter', type=int, default=3000, help="max_iter for Final_Project planners")
+    parser.add_argument('--legacy-max-iter', type=int, default=1500, help="max_iter for the older RRT copies")
+    parser.add_argument('--deadline', type=float, default=None, help="deadline_s for Final_Project planners")
+    parser.add_argument('--out', default=os.path.join(DATA_DIR, 'planner_benchmark'), help="output path prefix for .json and .csv")
+    args = parser.parse_args()
+
+    maps = build_maps(args.mazes)
+    records = run_benchmark(maps, args.planners, n_trials=args.trials, max_iter=args.max_iter,
+                            legacy_max_iter=args.legacy_max_iter, deadline_s=args.deadline)
+    summary = summarize(records)
+    write_results(summary, records, args.out)
+
+    print(f"{'map':>20} {'planner':>28} {'success':>8} {'length':>7} {'nodes':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for row in summary:
+        length = f"{row['path_length_median']:.2f}" if row['path_length_median'] is not None else '-'
+        print(f"{row['map']:>20} {row['planner']:>28} {100 * row['success_rate']:7.1f}% {length:>7} {row['nodes_median']:7.0f} "
+              f"{1e3 * row['time_p50_s']:8.1f} {1e3 * row['time_p95_s']:8.1f} {1e3 * row['time_p99_s']:8.1f}")
+    print(f"Results written to {args.out}.json and {args.out}.csv")
@@ -0,0 +1,268 @@
+import os
+import time
+import numpy as np
+from scipy import ndimage
+from RRT import RRT
+from grid_planner import GridPlanner, GRID_PLANNER_MODES
+from collision import GridCollisionChecker
+from nearest_neighbor import make_nn_index
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Maps saved by save_results() in Final_Project.py and 12_Weeks.py
+SAVED_MAP_DIRS = [DATA_DIR, os.path.join(DATA_DIR, '..', '12_Weeks')]
+
+def load_saved_map(map_dir=DATA_DIR, grid_file='occupancy_grid.npy', info_file='occupancy_grid_info.npy'):
+    occupancy_grid = np.load(os.path.join(map_dir, grid_file))
+    info = np.load(os.path.join(map_dir, info_file), allow_pickle=True).item()
+    map_params = {
+        'res': info['grid_size'],
+        'x_limit': [info['map_x_min'], info['map_x_max']],
+        'y_limit': [info['map_y_min'], info['map_y_max']],
+        'origin': [info['map_x_min'], info['map_y_min']]
+    }
+    return occupancy_grid, map_params
+
+# Original nearest-node search from RRT.plan, kept here as the baseline
+class PythonLoopIndex:
+    def __init__(self, capacity=1024):
+        self.points = []
+
+    def add(self, point):
+        self.points.append(np.array(point))
+        return len(self.points) - 1
+
+    def nearest(self, point):
+        return int(np.argmin([np.linalg.norm(n - point) for n in self.points]))
+
+# Original half-cell stepping segment check from RRT, kept here as the baseline
+def legacy_segment_free(occupancy_grid, map_params, start_node, end_node):
+    res = map_params['res']
+    x_limit = map_params['x_limit']
+    y_limit = map_params['y_limit']
+    dist = np.linalg.norm(end_node - start_node)
+    if dist == 0: return True
+    steps = int(np.ceil(dist / (res * 0.5)))
+    direction = (end_node - start_node) / dist
+    for i in range(steps + 1):
+        check_point = start_node + direction * (i * (dist / steps))
+        x_idx = int((check_point[0] - x_limit[0]) / res)
+        y_idx = int((check_point[1] - y_limit[0]) / res)
+        if x_idx < 0 or x_idx >= occupancy_grid.shape[1] or y_idx < 0 or y_idx >= occupancy_grid.shape[0]:
+            return False
+        if occupancy_grid[y_idx, x_idx] != 1.0:
+            return False
+    return True
+
+# Original greedy shortcut pruning from RRT.prune_path, kept here as the baseline:
+# from each waypoint jump to the farthest later waypoint with a free segment
+def legacy_prune_path(planner, path):
+    if path is None or len(path) <= 2:
+        return path
+    path_np = [np.array(p) for p in path]
+    pruned = [path_np[0]]
+    i = 0
+    while i < len(path_np) - 1:
+        next_i = i + 1
+        for j in range(len(path_np) - 1, i, -1):
+            if planner.is_segment_collision_free(path_np[i], path_np[j]):
+                next_i = j
+                break
+        pruned.append(path_np[next_i])
+        i = next_i
+    return pruned
+
+# Random segments of a fixed length starting in free cells
+def random_free_segments(occupancy_grid, map_params, n_segments, length, seed=0):
+    rng = np.random.default_rng(seed)
+    free_cells = np.argwhere(occupancy_grid == 1.0)  # [y_idx, x_idx]
+    picks = free_cells[rng.integers(len(free_cells), size=n_segments)]
+    res = map_params['res']
+    starts = np.column_stack((
+        map_params['x_limit'][0] + (picks[:, 1] + rng.random(n_segments)) * res,
+        map_params['y_limit'][0] + (picks[:, 0] + rng.random(n_segments)) * res
+    ))
+    heading = rng.uniform(-np.pi, np.pi, n_segments)
+    ends = starts + length * np.column_stack((np.cos(heading), np.sin(heading)))
+    return starts, ends
+
+# Compare the legacy stepping checker against the exact traversal checker
+# (one segment per call and one batched call) on a saved map
+def benchmark_segments(occupancy_grid, map_params, n_segments=2000, length=0.6, seed=0):
+    starts, ends = random_free_segments(occupancy_grid, map_params, n_segments, length, seed)
+
+    t0 = time.perf_counter()
+    legacy = np.array([legacy_segment_free(occupancy_grid, map_params, s, e) for s, e in zip(starts, ends)])
+    legacy_us = (time.perf_counter() - t0) / n_segments * 1e6
+
+    t0 = time.perf_counter()
+    checker = GridCollisionChecker(occupancy_grid, map_params)
+    build_ms = (time.perf_counter() - t0) * 1e3
+
+    t0 = time.perf_counter()
+    single = np.array([checker.is_segment_free(s, e) for s, e in zip(starts, ends)])
+    single_us = (time.perf_counter() - t0) / n_segments * 1e6
+
+    t0 = time.perf_counter()
+    batch = checker.segments_free(starts, ends)
+    batch_us = (time.perf_counter() - t0) / n_segments * 1e6
+
+    return {
+        'legacy_us': legacy_us,
+        'single_us': single_us,
+        'batch_us': batch_us,
+        'build_ms': build_ms,
+        'single_matches_batch': bool(np.array_equal(single, batch)),
+        # Exact traversal is stricter: it also catches cells the half-cell steps skip
+        'agreement': float(np.mean(legacy == batch)),
+        'legacy_free_exact_blocked': int(np.sum(legacy & ~batch)),
+        'legacy_blocked_exact_free': int(np.sum(~legacy & batch)),
+    }
+
+# Time one nearest() + add() pair per iteration while the index grows, and
+# report the mean per-iteration cost for each block of block_size insertions.
+def benchmark_nearest(nn_index, n_nodes, block_size=1000, bounds=(-20.0, 20.0), seed=0):
+    rng = np.random.default_rng(seed)
+    samples = rng.uniform(bounds[0], bounds[1], size=(n_nodes, 2))
+    index = make_nn_index(nn_index, capacity=n_nodes + 1)
+    index.add(samples[0])
+
+    block_us = []
+    for block_start in range(1, n_nodes, block_size):
+        block = samples[block_start:block_start + block_size]
+        t0 = time.perf_counter()
+        for point in block:
+            index.nearest(point)
+            index.add(point)
+        block_us.append((time.perf_counter() - t0) / len(block) * 1e6)
+    return block_us
+
+# Plan on a saved map between two free cells with a fixed seed
+def benchmark_plan(nn_index, occupancy_grid, map_params, start, goal, expand_dis=0.6, max_iter=10000, seed=0):
+    planner = RRT(start=start, goal=goal, map_grid=occupancy_grid, map_params=map_params,
+                  expand_dis=expand_dis, max_iter=max_iter, enable_pruning=False, nn_index=nn_index, seed=seed)
+    t0 = time.perf_counter()
+    path = planner.plan()
+    elapsed = time.perf_counter() - t0
+    return elapsed, len(planner.tree), path is not None
+
+# Run RRT over several seeded start/goal pairs with a given sampler and report
+# success rate, median planning time and tree nodes added per second
+def benchmark_sampler(occupancy_grid, map_params, n_trials=20, expand_dis=0.6, max_iter=10000, **planner_kwargs):
+    found, times, rates = [], [], []
+    for seed in range(n_trials):
+        start, goal = pick_free_points(occupancy_grid, map_params, min_dist=6.0, max_dist=14.0, seed=seed)
+        planner = RRT(start=start, goal=goal, map_grid=occupancy_grid, map_params=map_params, expand_dis=expand_dis,
+                      max_iter=max_iter, enable_pruning=False, seed=seed, **planner_kwargs)
+        t0 = time.perf_counter()
+        path = planner.plan()
+        elapsed = time.perf_counter() - t0
+        found.append(path is not None)
+        times.append(elapsed)
+        rates.append(planner.node_count / elapsed)
+    return np.mean(found), np.median(times), np.median(rates)
+
+# Plan unpruned paths over several seeded start/goal pairs, then prune each
+# with the legacy greedy pass and the batched visibility pruning
+def benchmark_prune(occupancy_grid, map_params, n_trials=10, expand_dis=0.3, max_iter=20000):
+    rows = []
+    for seed in range(n_trials):
+        start, goal = pick_free_points(occupancy_grid, map_params, min_dist=8.0, max_dist=16.0, seed=seed)
+        planner = RRT(start=start, goal=goal, map_grid=occupancy_grid, map_params=map_params, expand_dis=expand_dis,
+                      max_iter=max_iter, enable_pruning=False, sampler='free', seed=seed)
+        path = planner.plan()
+        if path is None:
+            continue
+        t0 = time.perf_counter()
+        greedy = legacy_prune_path(planner, path)
+        greedy_ms = (time.perf_counter() - t0) * 1e3
+        t0 = time.perf_counter()
+        pruned = planner.prune_path(path)
+        batched_ms = (time.perf_counter() - t0) * 1e3
+        rows.append((len(path), len(greedy), len(pruned), greedy_ms, batched_ms))
+    return rows
+
+# Run a grid planner mode over several seeded start/goal pairs and report
+# success rate, median and worst planning time and median path length
+def benchmark_grid_planner(occupancy_grid, map_params, mode, n_trials=20):
+    checker = GridCollisionChecker(occupancy_grid, map_params)
+    heuristic_cache = {}
+    found, times, lengths = [], [], []
+    for seed in range(n_trials):
+        start, goal = pick_free_points(occupancy_grid, map_params, min_dist=6.0, max_dist=14.0, seed=seed)
+        planner = GridPlanner(start=start, goal=goal, map_grid=occupancy_grid, map_params=map_params, mode=mode,
+                              clearance_map=checker, heuristic_cache=heuristic_cache)
+        path = planner.plan()
+        found.append(path is not None)
+        times.append(planner.stats['time_s'])
+        if path is not None:
+            lengths.append(planner.stats['path_length'])
+    return np.mean(found), np.median(times), np.max(times), np.median(lengths) if lengths else float('nan')
+
+# Pick a start and goal in the largest connected free region, min_dist..max_dist apart
+def pick_free_points(occupancy_grid, map_params, min_dist=4.0, max_dist=8.0, seed=0):
+    rng = np.random.default_rng(seed)
+    labels, _ = ndimage.label(occupancy_grid == 1.0)
+    largest = np.argmax(np.bincount(labels.ravel())[1:]) + 1
+    free_cells = np.argwhere(labels == largest)  # [y_idx, x_idx]
+    res = map_params['res']
+    free_world = np.column_stack((
+        map_params['x_limit'][0] + (free_cells[:, 1] + 0.5) * res,
+        map_params['y_limit'][0] + (free_cells[:, 0] + 0.5) * res
+    ))
+    while True:
+        start = free_world[rng.integers(len(free_world))]
+        dist = np.linalg.norm(free_world - start, axis=1)
+        candidates = np.where((dist >= min_dist) & (dist <= max_dist))[0]
+        if candidates.size > 0:
+            goal = free_world[rng.choice(candidates)]
+            return start.tolist(), goal.tolist()
+
+if __name__ == "__main__":
+    block_size = 1000
+    print("Nearest-node lookup: mean cost per RRT iteration (us) by tree size")
+    results = {
+        'python_loop': benchmark_nearest(PythonLoopIndex, 3001, block_size),
+        'linear': benchmark_nearest('linear', 20001, block_size),
+        'kdtree': benchmark_nearest('kdtree', 20001, block_size),
+    }
+    print(f"{'tree size':>10} " + " ".join(f"{name:>12}" for name in results))
+    n_blocks = max(len(r) for r in results.values())
+    for b in range(n_blocks):
+        cells = [f"{r[b]:12.1f}" if b < len(r) else f"{'-':>12}" for r in results.values()]
+        print(f"{(b + 1) * block_size:>10} " + " ".join(cells))
+
+    print("\nSegment collision check: mean cost per segment (us)")
+    for map_dir in SAVED_MAP_DIRS:
+        occupancy_grid, map_params = load_saved_map(map_dir)
+        for length in [0.6, 3.0]:
+            r = benchmark_segments(occupancy_grid, map_params, length=length)
+            print(f"{os.path.basename(os.path.normpath(map_dir)):>14} {occupancy_grid.shape} length={length:.1f} m: "
+                  f"legacy {r['legacy_us']:.1f}, exact single {r['single_us']:.1f}, exact batch {r['batch_us']:.2f} "
+                  f"(mask build {r['build_ms']:.2f} ms, agreement {100 * r['agreement']:.1f}%, "
+                  f"legacy-only free {r['legacy_free_exact_blocked']}, exact-only free {r['legacy_blocked_exact_free']}, "
+                  f"single == batch: {r['single_matches_batch']})")
+
+    occupancy_grid, map_params = load_saved_map()
+    print("\nSamplers on saved map (success rate, median time, median nodes added per second)")
+    for name, kwargs in [('uniform', {'sampler': 'uniform'}),
+                         ('free', {'sampler': 'free'}),
+                         ('free + 5% goal', {'sampler': 'free', 'goal_bias': 0.05})]:
+        success, median_time, node_rate = benchmark_sampler(occupancy_grid, map_params, **kwargs)
+        print(f"{name:>16}: {100 * success:5.1f}%, {median_time:.3f} s, {node_rate:.0f} nodes/s")
+
+    print("\nGrid planners on saved map (success rate, median / worst time, median path length)")
+    for mode in GRID_PLANNER_MODES:
+        success, median_time, worst_time, median_length = benchmark_grid_planner(occupancy_grid, map_params, mode)
+        print(f"{mode:>16}: {100 * success:5.1f}%, {median_time:.3f} / {worst_time:.3f} s, {median_length:.2f} m")
+
+    print("\nPath pruning on saved map (raw waypoints, greedy / batched waypoints, greedy / batched ms)")
+    for raw, n_greedy, n_batched, greedy_ms, batched_ms in benchmark_prune(occupancy_grid, map_params):
+        print(f"{raw:>5} raw: {n_greedy:>3} / {n_batched:>3} waypoints, {greedy_ms:7.2f} / {batched_ms:6.2f} ms")
+
+    start, goal = pick_free_points(occupancy_grid, map_params)
+    print(f"\nRRT.plan on saved map from {np.round(start, 2)} to {np.round(goal, 2)}")
+    for name in ['python_loop', 'linear', 'kdtree']:
+        nn_index = PythonLoopIndex if name == 'python_loop' else name
+        elapsed, n_nodes, found = benchmark_plan(nn_index, occupancy_grid, map_params, start, goal)
+        print(f"{name:>12}: {elapsed:.3f} s, {n_nodes} nodes, path found: {found}")
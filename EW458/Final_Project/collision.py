@@ -0,0 +1,315 @@
+import copy
+import math
+import numpy as np
+from scipy import ndimage
+
+# Segments passing within this distance (cells) of a grid corner are treated as
+# touching both cells beside the corner, so float noise in cell-center to
+# cell-center segments cannot let a path squeeze diagonally between two blocked
+# cells. Every check below applies the same rule.
+CORNER_EPS = 1e-9
+
+# Grid collision checker built once per map. It precomputes a boolean free mask
+# (padded with a one-cell blocked border so out-of-bounds cells read as blocked)
+# and checks segments by exact cell traversal: every grid cell a segment passes
+# through is visited exactly once, found by splitting the segment at each
+# crossing of a vertical or horizontal grid line. Batches of segments are
+# traversed together in a single vectorized pass. map_version is an optional
+# tag (e.g. a map update counter) so callers can tell when to rebuild.
+class GridCollisionChecker:
+    def __init__(self, map_grid, map_params, free_mask=None, scalar_walk_max_cells=64, map_version=None):
+        self.map_version = map_version
+        self.res = map_params['res']
+        self.x_min = map_params['x_limit'][0]
+        self.y_min = map_params['y_limit'][0]
+        self.height, self.width = map_grid.shape
+
+        # 1.0 means free, 0.5 means unknown, 0.0 means occupied
+        if free_mask is None:
+            free_mask = map_grid == 1.0
+        self.free_mask = np.zeros((self.height + 2, self.width + 2), dtype=bool)
+        self.free_mask[1:-1, 1:-1] = free_mask
+        self.free_rows = self.free_mask.tolist() # nested lists index faster than NumPy in scalar loops
+
+        # Segments crossing at most this many grid lines use the scalar walk
+        self.scalar_walk_max_cells = scalar_walk_max_cells
+        self._free_cells = None
+
+    # Flat (row-major) indices of free cells in the unpadded grid, cached per mask
+    def free_cells(self):
+        if self._free_cells is None:
+            self._free_cells = np.flatnonzero(self.free_mask[1:-1, 1:-1])
+        return self._free_cells
+
+    # Convert world points (..., 2) to continuous grid coordinates (cell units)
+    def to_grid_coords(self, points):
+        points = np.asarray(points, dtype=float)
+        return np.stack(((points[..., 0] - self.x_min) / self.res,
+                         (points[..., 1] - self.y_min) / self.res), axis=-1)
+
+    # Look up free cells for integer cell indices, treating out-of-bounds as blocked
+    def cells_free(self, cx, cy):
+        cx = np.clip(cx + 1, 0, self.width + 1)
+        cy = np.clip(cy + 1, 0, self.height + 1)
+        return self.free_mask[cy, cx]
+
+    def is_point_free(self, point):
+        x_idx = math.floor((point[0] - self.x_min) / self.res)
+        y_idx = math.floor((point[1] - self.y_min) / self.res)
+        if x_idx < 0 or x_idx >= self.width or y_idx < 0 or y_idx >= self.height:
+            return False
+        return bool(self.free_mask[y_idx + 1, x_idx + 1])
+
+    # Check a batch of (n, 2) world points at once
+    def points_free(self, points):
+        g = self.to_grid_coords(points).reshape(-1, 2)
+        return self.cells_free(np.floor(g[:, 0]).astype(np.intp), np.floor(g[:, 1]).astype(np.intp))
+
+    def is_segment_free(self, start_node, end_node):
+        gx0 = (start_node[0] - self.x_min) / self.res
+        gy0 = (start_node[1] - self.y_min) / self.res
+        gx1 = (end_node[0] - self.x_min) / self.res
+        gy1 = (end_node[1] - self.y_min) / self.res
+        cx0, cy0 = math.floor(gx0), math.floor(gy0)
+        cx1, cy1 = math.floor(gx1), math.floor(gy1)
+        n_cross = abs(cx1 - cx0) + abs(cy1 - cy0)
+        if n_cross <= self.scalar_walk_max_cells:
+            return self._walk_segment(gx0, gy0, gx1, gy1, cx0, cy0, n_cross)
+        return bool(self.segments_free(np.asarray(start_node, dtype=float)[None], np.asarray(end_node, dtype=float)[None])[0])
+
+    # Scalar Amanatides-Woo walk for short segments, where NumPy call overhead
+    # would outweigh the handful of cells visited. Stops at the first blocked cell.
+    def _walk_segment(self, gx0, gy0, gx1, gy1, cx, cy, n_cross):
+        free_rows = self.free_rows
+        width, height = self.width, self.height
+        dx = gx1 - gx0
+        dy = gy1 - gy0
+        step_x = 1 if dx > 0 else -1
+        step_y = 1 if dy > 0 else -1
+        t_max_x = ((cx + (step_x > 0)) - gx0) / dx if dx != 0 else math.inf
+        t_max_y = ((cy + (step_y > 0)) - gy0) / dy if dy != 0 else math.inf
+        t_delta_x = abs(1.0 / dx) if dx != 0 else math.inf
+        t_delta_y = abs(1.0 / dy) if dy != 0 else math.inf
+        corner_t = CORNER_EPS / max(min(abs(dx), abs(dy)), 1e-6)
+
+        n_left = n_cross
+        while True:
+            if cx < 0 or cx >= width or cy < 0 or cy >= height or not free_rows[cy + 1][cx + 1]:
+                return False
+            if n_left == 0:
+                return True
+            if n_left >= 2 and abs(t_max_x - t_max_y) <= corner_t:
+                # Through a grid corner: both cells beside it count as visited
+                if not (0 <= cx + step_x < width and free_rows[cy + 1][cx + step_x + 1]):
+                    return False
+                if not (0 <= cy + step_y < height and free_rows[cy + step_y + 1][cx + 1]):
+                    return False
+                cx += step_x
+                cy += step_y
+                t_max_x += t_delta_x
+                t_max_y += t_delta_y
+                n_left -= 2
+            elif t_max_x < t_max_y:
+                cx += step_x
+                t_max_x += t_delta_x
+                n_left -= 1
+            else:
+                cy += step_y
+                t_max_y += t_delta_y
+                n_left -= 1
+
+    # Check a batch of segments at once. starts and ends are (n, 2) world points;
+    # returns a boolean array that is True where the segment is collision free.
+    # Every cell a segment visits after its start cell is entered across a grid
+    # line, so checking the start cell plus the two cells on either side of each
+    # crossing covers the traversal without sorting crossings along the segment.
+    # A crossing within CORNER_EPS of a grid corner checks the cells on both
+    # sides of the corner.
+    def segments_free(self, starts, ends):
+        g0 = self.to_grid_coords(starts).reshape(-1, 2)
+        g1 = self.to_grid_coords(ends).reshape(-1, 2)
+        n = len(g0)
+        if n == 0:
+            return np.zeros(0, dtype=bool)
+        c0 = np.floor(g0).astype(np.intp)
+        c1 = np.floor(g1).astype(np.intp)
+        d = g1 - g0
+
+        blocked = (~self.cells_free(c0[:, 0], c0[:, 1])).astype(np.intp)
+        for axis in range(2):
+            n_cross = np.abs(c1[:, axis] - c0[:, axis])
+            total = int(n_cross.sum())
+            if total == 0:
+                continue
+            # Grid lines crossed along this axis, flattened with their segment ids
+            seg = np.repeat(np.arange(n), n_cross)
+            offsets = np.cumsum(n_cross) - n_cross
+            k = np.arange(total) - np.repeat(offsets, n_cross) + 1
+            boundary = np.minimum(c0[seg, axis], c1[seg, axis]) + k
+            t = (boundary - g0[seg, axis]) / d[seg, axis]
+            other = 1 - axis
+            coord_other = g0[seg, other] + d[seg, other] * t
+            low = np.floor(coord_other - CORNER_EPS).astype(np.intp)
+            high = np.floor(coord_other + CORNER_EPS).astype(np.intp)
+            if axis == 0:
+                free = (self.cells_free(boundary - 1, low) & self.cells_free(boundary, low)
+                        & self.cells_free(boundary - 1, high) & self.cells_free(boundary, high))
+            else:
+                free = (self.cells_free(low, boundary - 1) & self.cells_free(low, boundary)
+                        & self.cells_free(high, boundary - 1) & self.cells_free(high, boundary))
+            blocked += np.bincount(seg[~free], minlength=n)
+        return blocked == 0
+
+    # Check a batch of segments given as one (n, 2, 2) array of [start, end] pairs
+    def check_segments(self, segments):
+        segments = np.asarray(segments, dtype=float).reshape(-1, 2, 2)
+        return self.segments_free(segments[:, 0], segments[:, 1])
+
+    # Index of the first blocked segment of a path (k, 2), or -1 if the whole
+    # path is free. A single-point path is checked as a point.
+    def first_blocked_segment(self, path):
+        path = np.asarray(path, dtype=float)
+        if len(path) < 2:
+            return -1 if len(path) == 1 and self.is_point_free(path[0]) else 0
+        blocked = np.flatnonzero(~self.segments_free(path[:-1], path[1:]))
+        return int(blocked[0]) if blocked.size > 0 else -1
+
+    # Check whether every segment of a path (k, 2) is collision free
+    def is_path_free(self, path):
+        return self.first_blocked_segment(path) < 0
+
+# Clearance layer built once per map version from Euclidean distance
+# transforms, so the robot radius is a threshold instead of a dilation.
+#   occ_dist:  cell-center distance (cells) to the nearest occupied cell
+#   free_dist: cell-center distance (cells) to the nearest cell that is not
+#              known free (occupied, unknown or outside the map)
+# A cell is free for a robot of radius r when it is known free and
+# occ_dist > r / res + 0.5, i.e. the robot centred on it stays clear of the
+# occupied cell's edge. Segment checks sphere-trace: from a free cell every
+# point within min(free_dist, occ_dist - r_cells) - sqrt(2) cells is also free,
+# so the walk can jump that far instead of visiting every cell in between.
+# Batched checks (segments_free) use the thresholded free mask directly.
+class ClearanceMap(GridCollisionChecker):
+    def __init__(self, map_grid, map_params, robot_radius=0.0, occupied_mask=None, known_free_mask=None, map_version=None):
+        # 1.0 means free, 0.5 means unknown, 0.0 means occupied
+        if occupied_mask is None:
+            occupied_mask = map_grid <= 0.0
+        if known_free_mask is None:
+            known_free_mask = map_grid == 1.0
+        self.known_free_mask = np.asarray(known_free_mask, dtype=bool)
+        super().__init__(map_grid, map_params, free_mask=self.known_free_mask, map_version=map_version)
+
+        # Maps with no occupied cells get an effectively infinite clearance
+        if np.any(occupied_mask):
+            self.occ_dist = ndimage.distance_transform_edt(~occupied_mask)
+        else:
+            self.occ_dist = np.full(map_grid.shape, np.inf)
+        # Cells outside the map count as not free, so use the padded mask
+        self.free_dist = ndimage.distance_transform_edt(self.free_mask)[1:-1, 1:-1]
+
+        self.robot_radius = None
+        self.set_robot_radius(robot_radius)
+
+    # Clearance in meters from each cell center to the edge of the nearest occupied cell
+    @property
+    def clearance(self):
+        return (self.occ_dist - 0.5) * self.res
+
+    # Re-threshold the free mask and sphere-trace step field for a new robot radius
+    def set_robot_radius(self, robot_radius):
+        if robot_radius == self.robot_radius:
+            return
+        self.robot_radius = robot_radius
+        radius_cells = robot_radius / self.res + 0.5 if robot_radius > 0 else 0.0
+        free = self.known_free_mask & (self.occ_dist > radius_cells)
+        self.free_mask[1:-1, 1:-1] = free
+        self.free_rows = self.free_mask.tolist()
+        self._free_cells = None
+        self.step_field = np.minimum(self.free_dist, self.occ_dist - radius_cells) - math.sqrt(2.0)
+        self.step_rows = self.step_field.tolist()
+
+    # Checker for another robot radius that shares this map's distance fields.
+    # This map is left as it is, since other planners may be using it.
+    def with_robot_radius(self, robot_radius):
+        if robot_radius == self.robot_radius:
+            return self
+        view = copy.copy(self)
+        view.free_mask = self.free_mask.copy() # set_robot_radius writes the mask in place
+        view.set_robot_radius(robot_radius)
+        return view
+
+    # Copy of map_grid with cells inside the robot radius of an obstacle marked occupied
+    def inflated_grid(self, map_grid):
+        grid = np.array(map_grid, copy=True)
+        radius_cells = self.robot_radius / self.res + 0.5 if self.robot_radius > 0 else 0.0
+        grid[self.occ_dist <= radius_cells] = 0.0
+        return grid
+
+    # Amanatides-Woo walk that jumps ahead by the local clearance wherever it
+    # exceeds min_jump cells; near obstacles it steps cell by cell
+    def is_segment_free(self, start_node, end_node, min_jump=3.0):
+        gx0 = (start_node[0] - self.x_min) / self.res
+        gy0 = (start_node[1] - self.y_min) / self.res
+        gx1 = (end_node[0] - self.x_min) / self.res
+        gy1 = (end_node[1] - self.y_min) / self.res
+        dx = gx1 - gx0
+        dy = gy1 - gy0
+        length = math.hypot(dx, dy)
+        if length == 0:
+            return self.is_point_free(start_node)
+        inv_length = 1.0 / length
+
+        free_rows = self.free_rows
+        step_rows = self.step_rows
+        width, height = self.width, self.height
+        cx, cy = math.floor(gx0), math.floor(gy0)
+        cx1, cy1 = math.floor(gx1), math.floor(gy1)
+        step_x = 1 if dx > 0 else -1
+        step_y = 1 if dy > 0 else -1
+        t_delta_x = abs(1.0 / dx) if dx != 0 else math.inf
+        t_delta_y = abs(1.0 / dy) if dy != 0 else math.inf
+        t_max_x = ((cx + (step_x > 0)) - gx0) / dx if dx != 0 else math.inf
+        t_max_y = ((cy + (step_y > 0)) - gy0) / dy if dy != 0 else math.inf
+        n_left = abs(cx1 - cx) + abs(cy1 - cy)
+        corner_t = CORNER_EPS / max(min(abs(dx), abs(dy)), 1e-6)
+
+        t = 0.0 # segment parameter in [0, 1] where the current cell was entered
+        while True:
+            if cx < 0 or cx >= width or cy < 0 or cy >= height or not free_rows[cy + 1][cx + 1]:
+                return False
+            if n_left == 0:
+                return True
+
+            step = step_rows[cy][cx]
+            if step > min_jump:
+                # Sphere-trace jump: every cell skipped is guaranteed free
+                t += step * inv_length
+                if t >= 1.0:
+                    return True
+                cx = math.floor(gx0 + dx * t)
+                cy = math.floor(gy0 + dy * t)
+                t_max_x = ((cx + (step_x > 0)) - gx0) / dx if dx != 0 else math.inf
+                t_max_y = ((cy + (step_y > 0)) - gy0) / dy if dy != 0 else math.inf
+                n_left = abs(cx1 - cx) + abs(cy1 - cy)
+            elif n_left >= 2 and abs(t_max_x - t_max_y) <= corner_t:
+                # Through a grid corner: both cells beside it count as visited
+                if not (0 <= cx + step_x < width and free_rows[cy + 1][cx + step_x + 1]):
+                    return False
+                if not (0 <= cy + step_y < height and free_rows[cy + step_y + 1][cx + 1]):
+                    return False
+                t = max(t_max_x, t_max_y)
+                cx += step_x
+                cy += step_y
+                t_max_x += t_delta_x
+                t_max_y += t_delta_y
+                n_left -= 2
+            elif t_max_x < t_max_y:
+                t = t_max_x
+                cx += step_x
+                t_max_x += t_delta_x
+                n_left -= 1
+            else:
+                t = t_max_y
+                cy += step_y
+                t_max_y += t_delta_y
+                n_left -= 1
@@ -0,0 +1,188 @@
+import base64
+import struct
+import zlib
+import numpy as np
+
+# Delta-encoded occupancy grid transport. Instead of a nav_msgs/OccupancyGrid
+# with the whole grid as a JSON list of ints on every update, the publisher
+# sends a compact binary packet with only the cells that changed since the
+# previous packet, plus a full keyframe every keyframe_interval packets or
+# whenever the grid size / origin changes. Each packet carries a sequence
+# number and the sequence it applies on, so a decoder that misses a packet
+# waits for the next keyframe instead of drawing a corrupted map.
+#
+# Packets go over rosbridge as std_msgs/UInt8MultiArray, whose uint8[] data
+# rosbridge carries as a base64 string.
+MAP_TRANSPORTS = ('full', 'delta', 'both')
+
+KEYFRAME = 0
+DELTA = 1
+
+# magic, kind, seq, base_seq, width, height, resolution, origin x, origin y, stamp
+_HEADER = struct.Struct('<4sBIIIIdddd')
+_MAGIC = b'OGD1'
+
+# Delta topic for a nav_msgs/OccupancyGrid topic
+def delta_topic(topic):
+    return topic + '_delta'
+
+class GridDeltaEncoder:
+    def __init__(self, keyframe_interval=20, compress_level=1):
+        self.keyframe_interval = keyframe_interval
+        self.compress_level = compress_level
+        self.seq = 0
+        self.last_data = None
+        self.last_info = None
+        self.last_keyframe_seq = 0
+
+    # Packet bytes for flat int8 grid data (0 free, 50 unknown, 100 occupied)
+    def encode(self, data, width, height, resolution, x_min, y_min, stamp):
+        data = np.ascontiguousarray(data, dtype=np.int8).ravel()
+        info = (width, height, resolution, x_min, y_min)
+        base_seq = self.seq
+        self.seq += 1
+
+        kind = DELTA
+        if self.last_data is None or info != self.last_info or self.seq - self.last_keyframe_seq >= self.keyframe_interval:
+            kind = KEYFRAME
+        else:
+            changed = np.flatnonzero(data != self.last_data)
+            # Each changed cell costs 5 bytes before compression, a keyframe 1 per cell
+            if 5 * changed.size > data.size:
+                kind = KEYFRAME
+
+        if kind == KEYFRAME:
+            payload = data.tobytes()
+            self.last_keyframe_seq = self.seq
+            base_seq = self.seq
+        else:
+            # Index gaps instead of absolute indices: small, repetitive, compress well
+            gaps = np.diff(changed, prepend=0).astype(np.uint32)
+            payload = struct.pack('<I', changed.size) + gaps.tobytes() + data[changed].tobytes()
+
+        self.last_data = data.copy()
+        self.last_info = info
+        header = _HEADER.pack(_MAGIC, kind, self.seq, base_seq, width, height, resolution, x_min, y_min, stamp)
+        return header + zlib.compress(payload, self.compress_level)
+
+    # std_msgs/UInt8MultiArray message fields for a packet
+    def encode_msg(self, data, width, height, resolution, x_min, y_min, stamp):
+        packet = self.encode(data, width, height, resolution, x_min, y_min, stamp)
+        return {
+            'layout': {'dim': [], 'data_offset': 0},
+            'data': base64.b64encode(packet).decode('ascii')
+        }
+
+class GridDeltaDecoder:
+    def __init__(self):
+        self.seq = None
+        self.data = None
+        self.info = None
+        self.stamp = None
+        self.keyframes = 0
+        self.deltas = 0
+        self.dropped = 0 # packets skipped while waiting for a keyframe
+
+    # Apply one packet (bytes, a base64 string or a list of ints). Returns
+    # True if the grid is now current, False if the packet was skipped.
+    def decode(self, packet):
+        if isinstance(packet, str):
+            packet = base64.b64decode(packet)
+        elif not isinstance(packet, (bytes, bytearray)):
+            packet = bytes(bytearray(packet))
+        magic, kind, seq, base_seq, width, height, resolution, x_min, y_min, stamp = _HEADER.unpack_from(packet)
+        if magic != _MAGIC:
+            raise ValueError("Not an occupancy grid delta packet.")
+        payload = zlib.decompress(packet[_HEADER.size:])
+
+        if kind == KEYFRAME:
+            self.data = np.frombuffer(payload, dtype=np.int8).copy()
+            self.keyframes += 1
+        elif self.data is not None and base_seq == self.seq and self.info[:2] == (width, height):
+            count = struct.unpack_from('<I', payload)[0]
+            gaps = np.frombuffer(payload, dtype=np.uint32, count=count, offset=4)
+            values = np.frombuffer(payload, dtype=np.int8, count=count, offset=4 + 4 * count)
+            self.data[np.cumsum(gaps, dtype=np.int64)] = values
+            self.deltas += 1
+        else:
+            # Lost the packet this delta builds on: hold until the next keyframe
+            self.seq = None
+            self.data = None
+            self.dropped += 1
+            return False
+
+        self.seq = seq
+        self.info = (width, height, resolution, x_min, y_min)
+        self.stamp = stamp
+        return True
+
+    # Decode a std_msgs/UInt8MultiArray message into a dict shaped like
+    # nav_msgs/OccupancyGrid, so existing map callbacks can use it as is.
+    # data is a read-only view of the decoder's grid. None if skipped.
+    def to_grid_msg(self, msg):
+        if not self.decode(msg['data']):
+            return None
+        width, height, resolution, x_min, y_min = self.info
+        data = self.data.view()
+        data.flags.writeable = False
+        return {
+            'header': {
+                'stamp': {'sec': int(self.stamp), 'nanosec': int((self.stamp - int(self.stamp)) * 1e9)},
+                'frame_id': 'map'
+            },
+            'info': {
+                'width': width,
+                'height': height,
+                'resolution': resolution,
+                'origin': {
+                    'position': {'x': x_min, 'y': y_min, 'z': 0.0},
+                    'orientation': {'x': 0.0, 'y': 0.0, 'z': 0.0, 'w': 1.0}
+                }
+            },
+            'data': data
+        }
+
+if __name__ == "__main__":
+    import json
+    import time
+
+    # Simulated mapping run: a 400 x 400 map where each update observes a
+    # patch of cells around a moving robot, compared against the JSON list
+    # publish_occupancy_grid sent before
+    rng = np.random.default_rng(0)
+    width = height = 400
+    grid = np.full(width * height, 50, dtype=np.int8)
+    encoder = GridDeltaEncoder(keyframe_interval=20)
+    decoder = GridDeltaDecoder()
+    full_bytes, delta_bytes = 0, 0
+    full_time, delta_time, decode_time = 0.0, 0.0, 0.0
+    mismatches = 0
+    n_updates = 200
+    for k in range(n_updates):
+        cx, cy = 200 + int(150 * np.cos(0.03 * k)), 200 + int(150 * np.sin(0.03 * k))
+        patch = rng.integers(0, 3, (30, 30)) * 50
+        grid.reshape(height, width)[cy - 15:cy + 15, cx - 15:cx + 15] = patch
+
+        t0 = time.perf_counter()
+        full_bytes += len(json.dumps({'data': (grid.astype(int)).tolist()}))
+        full_time += time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        msg = encoder.encode_msg(grid, width, height, 0.1, -20.0, -20.0, 0.1 * k)
+        delta_bytes += len(json.dumps(msg))
+        delta_time += time.perf_counter() - t0
+
+        # Lose one packet to check recovery at the next keyframe
+        if k == 47:
+            continue
+        t0 = time.perf_counter()
+        grid_msg = decoder.to_grid_msg(msg)
+        decode_time += time.perf_counter() - t0
+        if grid_msg is not None and not np.array_equal(grid_msg['data'], grid):
+            mismatches += 1
+
+    print(f"full JSON list: {full_bytes / n_updates / 1024:8.1f} KiB/update, {1e3 * full_time / n_updates:6.2f} ms encode")
+    print(f"delta packets:  {delta_bytes / n_updates / 1024:8.1f} KiB/update, {1e3 * delta_time / n_updates:6.2f} ms encode, "
+          f"{1e3 * decode_time / n_updates:.2f} ms decode")
+    print(f"decoder: {decoder.keyframes} keyframes, {decoder.deltas} deltas, {decoder.dropped} skipped after the lost packet, "
+          f"{mismatches} mismatched grids")
@@ -0,0 +1,242 @@
+import math
+import heapq
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from collision import GridCollisionChecker
+from planner_common import PlannerMixin
+
+# 'astar' searches the 8-connected grid. 'theta_star' also tries to connect each
+# neighbour straight to the parent of the expanded cell (any-angle paths), with
+# a line-of-sight check per neighbour. 'lazy_theta_star' assumes that shortcut
+# holds and checks line of sight once per expansion instead.
+GRID_PLANNER_MODES = ('astar', 'theta_star', 'lazy_theta_star')
+
+SQRT2 = math.sqrt(2.0)
+
+# Deterministic grid search over the same map_grid / map_params inputs as RRT,
+# with the same plan(deadline_s) -> path-or-None contract and stats. Cells are
+# numbered in the padded free mask of the collision checker, so the blocked
+# border makes neighbour lookups safe without bounds checks. g-costs, parents
+# and the closed set live in flat per-cell arrays; the open list is a binary
+# heap of (f, cell) pairs. heuristic_cache is an optional dict that keeps the
+# NumPy distance-to-goal field between plans to the same goal on the same grid.
+class GridPlanner(PlannerMixin):
+    def __init__(
+        self,
+        start,
+        goal,
+        map_grid,
+        map_params,
+        mode='astar',
+        enable_pruning=True,
+        clearance_map=None,
+        robot_radius=None,
+        heuristic_cache=None,
+        max_iter=None,
+    ):
+        if mode not in GRID_PLANNER_MODES:
+            raise ValueError(f"Unknown grid planner mode '{mode}'. Use one of {list(GRID_PLANNER_MODES)}.")
+
+        self.start = np.array(start, dtype=float)
+        self.goal = np.array(goal, dtype=float)
+        self.map = map_grid
+        self.map_params = map_params
+        self.mode = mode
+        self.enable_pruning = enable_pruning
+        self.max_iter = max_iter # max cell expansions (None: until the open list is empty)
+        self.heuristic_cache = heuristic_cache
+
+        if clearance_map is not None:
+            if robot_radius is not None:
+                clearance_map = clearance_map.with_robot_radius(robot_radius)
+            self.collision_checker = clearance_map
+        else:
+            self.collision_checker = GridCollisionChecker(map_grid, map_params)
+
+        checker = self.collision_checker
+        self.res = checker.res
+        self.x_min = checker.x_min
+        self.y_min = checker.y_min
+        self.stride = checker.width + 2 # row length of the padded grid
+        self.n_cells = (checker.height + 2) * self.stride
+        self.closed = bytearray(self.n_cells)
+
+    # Padded cell number of a world point
+    def cell_of(self, point):
+        x_idx = math.floor((point[0] - self.x_min) / self.res)
+        y_idx = math.floor((point[1] - self.y_min) / self.res)
+        if x_idx < 0 or x_idx >= self.collision_checker.width or y_idx < 0 or y_idx >= self.collision_checker.height:
+            return -1
+        return (y_idx + 1) * self.stride + x_idx + 1
+
+    # World point of a cell: its center, or the exact start / goal point
+    def point_of(self, cell):
+        if cell == self.start_cell:
+            return (self.start[0], self.start[1])
+        if cell == self.goal_cell:
+            return (self.goal[0], self.goal[1])
+        y_idx, x_idx = divmod(cell, self.stride)
+        return (self.x_min + (x_idx - 0.5) * self.res, self.y_min + (y_idx - 0.5) * self.res)
+
+    # Distance (m) from every cell center to the goal, as a flat list over the padded grid
+    def heuristic(self):
+        checker = self.collision_checker
+        key = (tuple(self.goal), checker.height, checker.width, self.x_min, self.y_min, self.res)
+        if self.heuristic_cache is not None and key in self.heuristic_cache:
+            return self.heuristic_cache[key]
+        xs = self.x_min + (np.arange(self.stride) - 0.5) * self.res
+        ys = self.y_min + (np.arange(checker.height + 2) - 0.5) * self.res
+        h = np.hypot(xs[None, :] - self.goal[0], ys[:, None] - self.goal[1]).ravel().tolist()
+        if self.heuristic_cache is not None:
+            if len(self.heuristic_cache) >= 8:
+                self.heuristic_cache.clear()
+            self.heuristic_cache[key] = h
+        return h
+
+    # Cells expanded by the last search, shape (n, 2), for plotting
+    @property
+    def tree(self):
+        closed = np.flatnonzero(np.frombuffer(self.closed, dtype=np.uint8))
+        y_idx, x_idx = np.divmod(closed, self.stride)
+        return np.column_stack((self.x_min + (x_idx - 0.5) * self.res, self.y_min + (y_idx - 0.5) * self.res))
+
+    def plan(self, deadline_s=None):
+        self.start_clock(deadline_s)
+        return self.record_stats(self._search())
+
+    def _search(self):
+        self.closed = bytearray(self.n_cells)
+        self.start_cell = self.cell_of(self.start)
+        self.goal_cell = self.cell_of(self.goal)
+        free = self.collision_checker.free_mask.ravel().tolist()
+        if self.start_cell < 0 or self.goal_cell < 0 or not free[self.start_cell] or not free[self.goal_cell]:
+            return None
+
+        stride = self.stride
+        res = self.res
+        # (offset, step cost, offsets of the two cells beside a diagonal move)
+        neighbours = []
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                if dx == 0 and dy == 0:
+                    continue
+                diagonal = dx != 0 and dy != 0
+                neighbours.append((dy * stride + dx, SQRT2 * res if diagonal else res, dx, dy * stride))
+        any_angle = self.mode != 'astar'
+        lazy = self.mode == 'lazy_theta_star'
+        line_of_sight = self.collision_checker.is_segment_free
+        point_of = self.point_of
+        h = self.heuristic()
+        closed = self.closed
+        g = [math.inf] * self.n_cells
+        parent = [-1] * self.n_cells
+
+        start_cell, goal_cell = self.start_cell, self.goal_cell
+        g[start_cell] = 0.0
+        parent[start_cell] = start_cell
+        open_list = [(h[start_cell], start_cell)]
+        max_iter = self.max_iter if self.max_iter is not None else self.n_cells
+        while open_list and self.iterations < max_iter:
+            _, cell = heapq.heappop(open_list)
+            if closed[cell]:
+                continue
+            if self.out_of_time():
+                break
+
+            # Lazy Theta*: confirm the assumed shortcut, otherwise fall back to
+            # the best already-expanded neighbour
+            if lazy and parent[cell] != cell and not line_of_sight(point_of(parent[cell]), point_of(cell)):
+                best_g, best_parent = math.inf, -1
+                for offset, step, side_x, side_y in neighbours:
+                    other = cell + offset
+                    if side_x and side_y and not (free[cell + side_x] and free[cell + side_y]):
+                        continue
+                    if closed[other] and g[other] + step < best_g:
+                        best_g, best_parent = g[other] + step, other
+                g[cell] = best_g
+                parent[cell] = best_parent
+            closed[cell] = 1
+            if cell == goal_cell:
+                return self.finish_path(parent)
+
+            cell_parent = parent[cell]
+            parent_point = point_of(cell_parent)
+            for offset, step, side_x, side_y in neighbours:
+                other = cell + offset
+                if closed[other] or not free[other]:
+                    continue
+                # No corner cutting: a diagonal move needs both side cells free
+                if side_x and side_y and not (free[cell + side_x] and free[cell + side_y]):
+                    continue
+
+                if any_angle and cell_parent != cell:
+                    other_point = point_of(other)
+                    shortcut = math.hypot(other_point[0] - parent_point[0], other_point[1] - parent_point[1])
+                    if lazy or line_of_sight(parent_point, other_point):
+                        new_g = g[cell_parent] + shortcut
+                        if new_g < g[other]:
+                            g[other] = new_g
+                            parent[other] = cell_parent
+                            heapq.heappush(open_list, (new_g + h[other], other))
+                        continue
+                new_g = g[cell] + step
+                if new_g < g[other]:
+                    g[other] = new_g
+                    parent[other] = cell
+                    heapq.heappush(open_list, (new_g + h[other], other))
+        return None
+
+    # Walk parents from the goal cell back to the start
+    def finish_path(self, parent):
+        chain = [self.goal_cell]
+        while chain[-1] != self.start_cell:
+            chain.append(parent[chain[-1]])
+        path = [np.array(self.point_of(cell)) for cell in chain[::-1]]
+        if len(path) == 1:
+            path.append(np.array(self.goal))
+        if self.enable_pruning:
+            return self.prune_path(path)
+        return path
+
+# Travel cost (m) from one point to every free cell, from a single Dijkstra
+# wavefront over the 8-connected free cells of a collision checker (same moves
+# and no-corner-cutting rule as GridPlanner). The cell graph is built once per
+# checker, i.e. once per map version; unreachable cells get inf.
+class Wavefront:
+    def __init__(self, collision_checker):
+        self.collision_checker = collision_checker
+        free = collision_checker.free_mask # padded with a blocked border
+        h, w = collision_checker.height, collision_checker.width
+        cell_idx = np.arange(h * w).reshape(h, w)
+        src, dst, weight = [], [], []
+        # Each undirected edge once: right, up, and the two upward diagonals
+        for dx, dy in ((1, 0), (0, 1), (1, 1), (-1, 1)):
+            edge = free[1:h + 1, 1:w + 1] & free[1 + dy:h + 1 + dy, 1 + dx:w + 1 + dx]
+            if dx != 0 and dy != 0:
+                edge &= free[1:h + 1, 1 + dx:w + 1 + dx] & free[1 + dy:h + 1 + dy, 1:w + 1]
+            a = cell_idx[edge]
+            src.append(a)
+            dst.append(a + dy * w + dx)
+            weight.append(np.full(a.size, math.hypot(dx, dy) * collision_checker.res))
+        self.graph = csr_matrix((np.concatenate(weight), (np.concatenate(src), np.concatenate(dst))), shape=(h * w, h * w))
+
+    # (height, width) travel costs from a world point. A point outside the free
+    # space starts from the nearest free cell, with that offset added.
+    def costs_from(self, point):
+        checker = self.collision_checker
+        h, w = checker.height, checker.width
+        x_idx = math.floor((point[0] - checker.x_min) / checker.res)
+        y_idx = math.floor((point[1] - checker.y_min) / checker.res)
+        offset = 0.0
+        if not checker.is_point_free(point):
+            free_cells = checker.free_cells()
+            if free_cells.size == 0:
+                return np.full((h, w), math.inf)
+            free_y, free_x = np.divmod(free_cells, w)
+            gap = np.hypot(free_x - x_idx, free_y - y_idx)
+            nearest = int(np.argmin(gap))
+            x_idx, y_idx = int(free_x[nearest]), int(free_y[nearest])
+            offset = float(gap[nearest]) * checker.res
+        costs = dijkstra(self.graph, directed=False, indices=y_idx * w + x_idx)
+        return costs.reshape(h, w) + offset
@@ -0,0 +1,190 @@
+import math
+import numpy as np
+from collision import GridCollisionChecker, CORNER_EPS
+from nearest_neighbor import LinearIndex, KDTreeIndex
+
+# Optional compiled backend for the planner's scalar hot loops (point and
+# segment collision checks, nearest-node scans). The kernels are plain Python
+# over NumPy arrays; when Numba is importable they are compiled with njit,
+# otherwise they stay interpreted and the planner keeps the NumPy backend.
+try:
+    import numba
+except ImportError:
+    numba = None
+
+HAVE_NUMBA = numba is not None
+
+# 'auto' picks 'numba' when it is installed and 'numpy' otherwise
+KERNEL_BACKENDS = ('auto', 'numpy', 'numba')
+
+def jit(function):
+    if numba is None:
+        return function
+    return numba.njit(cache=True)(function)
+
+# Free-cell lookup of one world point in a padded free mask (blocked border)
+@jit
+def point_free_kernel(free_mask, x_min, y_min, res, x, y):
+    x_idx = math.floor((x - x_min) / res)
+    y_idx = math.floor((y - y_min) / res)
+    if x_idx < 0 or x_idx >= free_mask.shape[1] - 2 or y_idx < 0 or y_idx >= free_mask.shape[0] - 2:
+        return False
+    return free_mask[y_idx + 1, x_idx + 1]
+
+# Amanatides-Woo walk of one segment, same cell order and corner rule as
+# GridCollisionChecker._walk_segment
+@jit
+def segment_free_kernel(free_mask, x_min, y_min, res, x0, y0, x1, y1):
+    height = free_mask.shape[0] - 2
+    width = free_mask.shape[1] - 2
+    gx0 = (x0 - x_min) / res
+    gy0 = (y0 - y_min) / res
+    gx1 = (x1 - x_min) / res
+    gy1 = (y1 - y_min) / res
+    cx = math.floor(gx0)
+    cy = math.floor(gy0)
+    n_left = abs(math.floor(gx1) - cx) + abs(math.floor(gy1) - cy)
+    dx = gx1 - gx0
+    dy = gy1 - gy0
+    step_x = 1 if dx > 0 else -1
+    step_y = 1 if dy > 0 else -1
+    t_max_x = ((cx + (1 if step_x > 0 else 0)) - gx0) / dx if dx != 0 else math.inf
+    t_max_y = ((cy + (1 if step_y > 0 else 0)) - gy0) / dy if dy != 0 else math.inf
+    t_delta_x = abs(1.0 / dx) if dx != 0 else math.inf
+    t_delta_y = abs(1.0 / dy) if dy != 0 else math.inf
+    corner_t = CORNER_EPS / max(min(abs(dx), abs(dy)), 1e-6)
+
+    while True:
+        if cx < 0 or cx >= width or cy < 0 or cy >= height or not free_mask[cy + 1, cx + 1]:
+            return False
+        if n_left == 0:
+            return True
+        if n_left >= 2 and abs(t_max_x - t_max_y) <= corner_t:
+            # Through a grid corner: both cells beside it count as visited
+            if not (0 <= cx + step_x < width and free_mask[cy + 1, cx + step_x + 1]):
+                return False
+            if not (0 <= cy + step_y < height and free_mask[cy + step_y + 1, cx + 1]):
+                return False
+            cx += step_x
+            cy += step_y
+            t_max_x += t_delta_x
+            t_max_y += t_delta_y
+            n_left -= 2
+        elif t_max_x < t_max_y:
+            cx += step_x
+            t_max_x += t_delta_x
+            n_left -= 1
+        else:
+            cy += step_y
+            t_max_y += t_delta_y
+            n_left -= 1
+
+# Walk a batch of (n, 2) start / end points one segment at a time
+@jit
+def segments_free_kernel(free_mask, x_min, y_min, res, starts, ends):
+    free = np.empty(starts.shape[0], dtype=np.bool_)
+    for i in range(starts.shape[0]):
+        free[i] = segment_free_kernel(free_mask, x_min, y_min, res, starts[i, 0], starts[i, 1], ends[i, 0], ends[i, 1])
+    return free
+
+# Closest of points[lo:hi] to (qx, qy): returns (index, squared distance),
+# keeping the first index on ties like np.argmin
+@jit
+def nearest_kernel(points, lo, hi, qx, qy):
+    best_idx = -1
+    best_d2 = math.inf
+    for i in range(lo, hi):
+        dx = points[i, 0] - qx
+        dy = points[i, 1] - qy
+        d2 = dx * dx + dy * dy
+        if d2 < best_d2:
+            best_d2 = d2
+            best_idx = i
+    return best_idx, best_d2
+
+# Indices of points[:count] within radius of (qx, qy), in index order
+@jit
+def within_kernel(points, count, qx, qy, radius):
+    r2 = radius * radius
+    found = np.empty(count, dtype=np.intp)
+    n = 0
+    for i in range(count):
+        dx = points[i, 0] - qx
+        dy = points[i, 1] - qy
+        if dx * dx + dy * dy <= r2:
+            found[n] = i
+            n += 1
+    return found[:n]
+
+# GridCollisionChecker whose scalar checks run the compiled kernels. Batches
+# also go through the kernel walk, which stops at the first blocked cell of
+# each segment instead of checking every crossing.
+class NumbaCollisionChecker(GridCollisionChecker):
+    def is_point_free(self, point):
+        return bool(point_free_kernel(self.free_mask, self.x_min, self.y_min, self.res, float(point[0]), float(point[1])))
+
+    def is_segment_free(self, start_node, end_node):
+        return bool(segment_free_kernel(self.free_mask, self.x_min, self.y_min, self.res,
+                                        float(start_node[0]), float(start_node[1]),
+                                        float(end_node[0]), float(end_node[1])))
+
+    def segments_free(self, starts, ends):
+        starts = np.ascontiguousarray(starts, dtype=float).reshape(-1, 2)
+        ends = np.ascontiguousarray(ends, dtype=float).reshape(-1, 2)
+        return segments_free_kernel(self.free_mask, self.x_min, self.y_min, self.res, starts, ends)
+
+class NumbaLinearIndex(LinearIndex):
+    def nearest(self, point):
+        if self.count == 0:
+            return -1
+        return int(nearest_kernel(self.points, 0, self.count, float(point[0]), float(point[1]))[0])
+
+    def within(self, point, radius):
+        return within_kernel(self.points, self.count, float(point[0]), float(point[1]), float(radius))
+
+# KD-tree index whose unindexed tail is scanned by the compiled kernel
+class NumbaKDTreeIndex(KDTreeIndex):
+    def nearest(self, point):
+        if self.count == 0:
+            return -1
+
+        best_idx = -1
+        best_d2 = np.inf
+        if self.kdtree is not None:
+            dist, idx = self.kdtree.query(point)
+            best_idx = int(idx)
+            best_d2 = dist * dist
+
+        if self.count > self.n_indexed:
+            tail_idx, tail_d2 = nearest_kernel(self.points, self.n_indexed, self.count, float(point[0]), float(point[1]))
+            if tail_d2 < best_d2:
+                best_idx = int(tail_idx)
+        return best_idx
+
+NUMBA_NN_INDEX_TYPES = {
+    'linear': NumbaLinearIndex,
+    'kdtree': NumbaKDTreeIndex,
+}
+
+# Turn a backend name from KERNEL_BACKENDS into 'numpy' or 'numba'
+def resolve_backend(backend):
+    if backend not in KERNEL_BACKENDS:
+        raise ValueError(f"Unknown kernel backend '{backend}'. Use one of {list(KERNEL_BACKENDS)}.")
+    if backend == 'auto':
+        return 'numba' if HAVE_NUMBA else 'numpy'
+    if backend == 'numba' and not HAVE_NUMBA:
+        raise ImportError("The 'numba' kernel backend needs Numba installed (pip install numba).")
+    return backend
+
+# Collision checker for a backend; extra keyword arguments go to the checker
+def make_collision_checker(map_grid, map_params, backend='auto', **kwargs):
+    if resolve_backend(backend) == 'numba':
+        return NumbaCollisionChecker(map_grid, map_params, **kwargs)
+    return GridCollisionChecker(map_grid, map_params, **kwargs)
+
+# Swap a named nearest-neighbour index for its compiled version on the numba
+# backend; classes and index instances are passed through unchanged
+def backend_nn_index(nn_index, backend='auto'):
+    if resolve_backend(backend) == 'numba' and isinstance(nn_index, str) and nn_index in NUMBA_NN_INDEX_TYPES:
+        return NUMBA_NN_INDEX_TYPES[nn_index]
+    return nn_index
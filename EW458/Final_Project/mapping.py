@@ -1,12 +1,23 @@
 import math
 import time
+import threading
 import roslibpy
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.spatial.transform import Rotation as R
+from occupancy_models import make_occupancy_model
+from tiled_map import TiledGrid, integrate_scan_layers
+from scan_geometry import scan_geometry, rotate_points
+from pose_history import PoseHistory
+from grid_codec import GridDeltaEncoder, MAP_TRANSPORTS, delta_topic
+from mapping_worker import BatchWorker
+from scan_matcher import CorrelativeScanMatcher, compose_pose, invert_pose
 
 class MapClass():
-    def __init__(self, source, plot_map=False, id=86, update_delay=1.0, camera_fov_deg=66.0, camera_range=3.0):
+    def __init__(self, source, plot_map=False, id=86, update_delay=1.0, camera_fov_deg=66.0, camera_range=3.0,
+                 full_map_mode='overwrite', fov_map_mode='overwrite', log_odds_params=None,
+                 map_transport='full', keyframe_interval=20, scan_queue_size=4, scan_batch_size=8,
+                 scan_matching=False, scan_match_params=None):
         self.plot_map = plot_map
         self.running = True
         self.update_delay = update_delay
@@ -14,7 +25,20 @@ class MapClass():
         self.camera_fov_deg = camera_fov_deg
         self.camera_fov_half_rad = math.radians(camera_fov_deg / 2.0)
         self.camera_range = camera_range
-        
+
+        # Cell update rule per grid: 'overwrite' (latest scan wins) or 'log_odds'
+        # (accumulated evidence in int8/int16 cells, tuned by log_odds_params)
+        self.full_map_model = make_occupancy_model(full_map_mode, log_odds_params)
+        self.fov_map_model = make_occupancy_model(fov_map_mode, log_odds_params)
+
+        # Map publishing: 'full' nav_msgs/OccupancyGrid, 'delta' binary packets with
+        # only the changed cells (and a keyframe every keyframe_interval), or 'both'
+        if map_transport not in MAP_TRANSPORTS:
+            raise ValueError(f"Unknown map transport '{map_transport}'. Use one of {list(MAP_TRANSPORTS)}.")
+        self.map_transport = map_transport
+        self.full_map_encoder = GridDeltaEncoder(keyframe_interval)
+        self.fov_map_encoder = GridDeltaEncoder(keyframe_interval)
+
         # ROS variables
         self.id = id
         self.client = roslibpy.Ros(host=f'10.24.6.{self.id}', port=9090)
@@ -22,16 +46,32 @@ class MapClass():
         self.x = None; self.y = None; self.z = None
         self.roll = None; self.pitch = None; self.yaw = None
         self.pose_time = None; self.lidar_time = None
-        self.pose_history = []
+        self.pose_history = PoseHistory(capacity=256) # timestamped poses for matching lidar scans
 
         # Lidar variables
-        self.x_min = -2.0; self.x_max = 2.0; self.y_min = -2.0; self.y_max = 2.0
         self.grid_size = 0.1
-        n_x = (self.x_max - self.x_min) / self.grid_size
-        n_y = (self.y_max - self.y_min) / self.grid_size
-        self.occupancy_grid = np.full((int(np.ceil(n_y)), int(np.ceil(n_x))), 0.5)  # Initialize with unknown state (0.5)
-        self.x_min_fov = self.x_min; self.x_max_fov = self.x_max; self.y_min_fov = self.y_min; self.y_max_fov = self.y_max
-        self.fov_occupancy_grid = np.full((int(np.ceil(n_y)), int(np.ceil(n_x))), 0.5)  # Camera FOV-limited map
+        # Tiled maps grow only where scans land; occupancy_grid / fov_occupancy_grid
+        # and their bounds are the dense exports used for publishing and plotting.
+        # The mapping worker replaces the exports, the latest scan points and
+        # map_correction together under map_lock, once per batch, and plot_scan
+        # copies them under it, so a plot never mixes two updates.
+        self.map_lock = threading.Lock()
+        self.full_map = TiledGrid(self.grid_size, self.full_map_model, bounds=(-2.0, 2.0, -2.0, 2.0))  # Initialize with unknown state
+        self.fov_map = TiledGrid(self.grid_size, self.fov_map_model, bounds=(-2.0, 2.0, -2.0, 2.0))  # Camera FOV-limited map
+        self.occupancy_grid, self.x_min, self.x_max, self.y_min, self.y_max = self.full_map.dense()
+        self.fov_occupancy_grid, self.x_min_fov, self.x_max_fov, self.y_min_fov, self.y_max_fov = self.fov_map.dense()
+
+        # With scan_matching in 'odom' mode, scans are matched against the full map before
+        # they are integrated, correcting odometry drift; odom_correction is the map <- odom
+        # transform from the latest match (scan_match_params: matcher keyword arguments).
+        # Off by default: it shifts the map into the scan-matched frame, so it must be
+        # paired with CreateClass(pose_source='corrected') or the robot steers on raw odometry
+        self.scan_matcher = None
+        if scan_matching and source == 'odom':
+            self.scan_matcher = CorrelativeScanMatcher(self.grid_size, **(scan_match_params or {}))
+        self.odom_correction = (0.0, 0.0, 0.0) # worker only; map_correction is the exported copy
+        self.map_correction = self.odom_correction
+        self.scan_points = (np.array([]), np.array([]), np.array([]), np.array([])) # worker only: last scan x, y, FOV x, y
         self.x_scan_global = np.array([])
         self.y_scan_global = np.array([])
         self.x_scan_global_fov = np.array([])
@@ -53,6 +93,12 @@ class MapClass():
         })
         reset_odom_service.call(reset_odom_request)
 
+        # Mapping runs on its own thread: lidar_callback only queues the raw scan
+        # and its pose (dropping the oldest when scan_queue_size are waiting), and
+        # the worker integrates up to scan_batch_size scans before each publish
+        self.mapping_worker = BatchWorker(self.process_scans, maxsize=scan_queue_size, max_batch=scan_batch_size,
+                                          name='mapping-worker')
+
         # ROS Subscribers
         self.mocap_sub = roslibpy.Topic(self.client, f'/create_{self.id}/pose', 'geometry_msgs/PoseStamped')
         self.odom_sub = roslibpy.Topic(self.client, f'/create_{self.id}/odom', 'nav_msgs/Odometry')
@@ -69,6 +115,12 @@ class MapClass():
         # ROS Publishers
         self.occupancy_grid_pub = roslibpy.Topic(self.client, f'/create_{self.id}/occupancy_grid', 'nav_msgs/OccupancyGrid')
         self.fov_occupancy_grid_pub = roslibpy.Topic(self.client, f'/create_{self.id}/occupancy_grid_fov', 'nav_msgs/OccupancyGrid')
+        self.occupancy_grid_delta_pub = roslibpy.Topic(self.client, delta_topic(f'/create_{self.id}/occupancy_grid'), 'std_msgs/UInt8MultiArray')
+        self.fov_occupancy_grid_delta_pub = roslibpy.Topic(self.client, delta_topic(f'/create_{self.id}/occupancy_grid_fov'), 'std_msgs/UInt8MultiArray')
+        self.corrected_pose_pub = roslibpy.Topic(self.client, f'/create_{self.id}/pose_corrected', 'geometry_msgs/PoseStamped')
+
+        # Scans queued before this point wait for the publishers
+        self.mapping_worker.start()
 
     def odom_callback(self, msg):
         self.pose_time = msg['header']['stamp']['sec'] + msg['header']['stamp']['nanosec'] * 1e-9 
@@ -86,9 +138,7 @@ class MapClass():
         # print(f"Pose Update: x={self.x:.2f}, y={self.y:.2f}, yaw={self.yaw:.2f} rad", end="\r", flush=True)
 
         # Store pose history for synchronization with lidar scans
-        self.pose_history.append((self.pose_time, self.x, self.y, self.yaw))
-        if len(self.pose_history) > 100:
-            self.pose_history.pop(0)
+        self.pose_history.append(self.pose_time, self.x, self.y, self.yaw)
 
     def pose_callback(self, msg):
         self.pose_time = msg['header']['stamp']['sec'] + msg['header']['stamp']['nanosec'] * 1e-9
@@ -110,194 +160,183 @@ class MapClass():
         # print(f"Pose Update: x={self.x:.2f}, y={self.y:.2f}, yaw={self.yaw:.2f} rad", end="\r", flush=True)
 
         # Store pose history for synchronization with lidar scans
-        self.pose_history.append((self.pose_time, self.x, self.y, self.yaw))
-        if len(self.pose_history) > 100:
-            self.pose_history.pop(0)
+        self.pose_history.append(self.pose_time, self.x, self.y, self.yaw)
     
     def lidar_callback(self, msg):
         self.lidar_time = msg['header']['stamp']['sec'] + msg['header']['stamp']['nanosec'] * 1e-9
         # print("lidar callback: time={:.2f} sec".format(self.lidar_time))
 
-        ranges_raw = np.array(msg['ranges'])
-
-        # Calculate angles for valid ranges only
-        angles_raw = np.linspace(msg['angle_min'], msg['angle_max'], len(msg['ranges']))
-
-        # Filter out invalid ranges (NaN, Inf, out of range)
-        valid_ranges = np.isfinite(ranges_raw)
-        # valid_ranges &= (ranges_raw >= msg['range_min'])
-        valid_ranges &= (ranges_raw >= 0.1) # add small threshold to filter out super close readings
-        # valid_ranges &= (ranges_raw <= msg['range_max'])
-        valid_ranges &= (ranges_raw <= 20.0) # add upper threshold to filter out spurious long readings
-        ranges = ranges_raw[valid_ranges]
-        angles = angles_raw[valid_ranges]
-
-        # Find closest pose in history
-        if not self.pose_history:
+        # Pose at the scan time, interpolated between the poses around it
+        if len(self.pose_history) == 0:
             return
-        _, pose_x, pose_y, pose_yaw = min(self.pose_history, key=lambda p: abs(p[0] - self.lidar_time))
-
-        # Transform full-map valid lidar points to Global Frame
-        self.R_BG = np.array([[math.cos(pose_yaw), -math.sin(pose_yaw)], [math.sin(pose_yaw), math.cos(pose_yaw)]])
-        if ranges.size > 0:
-            self.x_scan = ranges * np.cos(angles)
-            self.y_scan = ranges * np.sin(angles)
-            P_G = self.R_BG @ np.array([self.x_scan, self.y_scan]) + np.array([[pose_x], [pose_y]])
-            self.x_scan_global = P_G[0, :]
-            self.y_scan_global = P_G[1, :]
-        else:
-            self.x_scan_global = np.array([])
-            self.y_scan_global = np.array([])
-
-        # Camera FOV and range filtering
-        camera_fov_mask_raw = np.abs(angles_raw) <= self.camera_fov_half_rad
-        camera_angles = angles_raw[camera_fov_mask_raw]
-        camera_ranges_raw = ranges_raw[camera_fov_mask_raw]
-
-        # Trace rays out to max camera range for all angles within FOV, then mark valid hits separately
-        trace_ranges = np.where(np.isfinite(camera_ranges_raw), camera_ranges_raw, self.camera_range)
-        trace_ranges = np.clip(trace_ranges, 0.0, self.camera_range) # ensure trace ranges are within camera range
-        x_scan_fov_trace = trace_ranges * np.cos(camera_angles)
-        y_scan_fov_trace = trace_ranges * np.sin(camera_angles)
-        P_G_fov_trace = self.R_BG @ np.array([x_scan_fov_trace, y_scan_fov_trace]) + np.array([[pose_x], [pose_y]])
-        x_scan_global_fov_trace = P_G_fov_trace[0, :]
-        y_scan_global_fov_trace = P_G_fov_trace[1, :]
-
-        valid_camera_hits = np.isfinite(camera_ranges_raw)
-        valid_camera_hits &= (camera_ranges_raw >= msg['range_min'])
-        valid_camera_hits &= (camera_ranges_raw <= msg['range_max'])
-        valid_camera_hits &= (camera_ranges_raw <= self.camera_range)
-        if np.any(valid_camera_hits):
-            x_scan_fov_hits = camera_ranges_raw[valid_camera_hits] * np.cos(camera_angles[valid_camera_hits])
-            y_scan_fov_hits = camera_ranges_raw[valid_camera_hits] * np.sin(camera_angles[valid_camera_hits])
-            P_G_fov_hits = self.R_BG @ np.array([x_scan_fov_hits, y_scan_fov_hits]) + np.array([[pose_x], [pose_y]])
-            self.x_scan_global_fov = P_G_fov_hits[0, :]
-            self.y_scan_global_fov = P_G_fov_hits[1, :]
-        else:
-            self.x_scan_global_fov = np.array([])
-            self.y_scan_global_fov = np.array([])
-
-        # Only update the occupancy grid at the specified rate
-        if self.update_delay > 0 and self.last_update_time is not None and (self.lidar_time - self.last_update_time) < self.update_delay:
+        pose = self.pose_history.pose_at(self.lidar_time)
+
+        # Everything else runs on the mapping worker, off the ROS receive thread
+        self.mapping_worker.submit((self.lidar_time, np.array(msg['ranges']), msg['angle_min'], msg['angle_max'],
+                                    msg['range_min'], msg['range_max'], pose))
+
+    # Mapping worker: integrate a batch of queued scans, then export and publish
+    # both grids once for the batch
+    def process_scans(self, scans):
+        stamp_time = None
+        for scan in scans:
+            if self.integrate_scan(*scan):
+                stamp_time = scan[0]
+        if stamp_time is not None:
+            full_export = self.full_map.dense()
+            fov_export = self.fov_map.dense()
+        with self.map_lock:
+            if stamp_time is not None:
+                self.occupancy_grid, self.x_min, self.x_max, self.y_min, self.y_max = full_export
+                self.fov_occupancy_grid, self.x_min_fov, self.x_max_fov, self.y_min_fov, self.y_max_fov = fov_export
+            self.x_scan_global, self.y_scan_global, self.x_scan_global_fov, self.y_scan_global_fov = self.scan_points
+            self.map_correction = self.odom_correction
+        if stamp_time is None:
             return
-        self.last_update_time = self.lidar_time
-
-        self.occupancy_grid, self.x_min, self.x_max, self.y_min, self.y_max = self.update_occupancy_grid(
-            self.occupancy_grid,
-            self.x_min,
-            self.x_max,
-            self.y_min,
-            self.y_max,
-            self.x_scan_global,
-            self.y_scan_global,
-            pose_x,
-            pose_y,
-            msg['range_max']
-        )
-
-        self.fov_occupancy_grid, self.x_min_fov, self.x_max_fov, self.y_min_fov, self.y_max_fov = self.update_occupancy_grid(
-            self.fov_occupancy_grid,
-            self.x_min_fov,
-            self.x_max_fov,
-            self.y_min_fov,
-            self.y_max_fov,
-            x_scan_global_fov_trace, # use trace points to clear rays out to max camera range
-            y_scan_global_fov_trace,
-            pose_x,
-            pose_y,
-            self.camera_range,
-            x_occupied_global=self.x_scan_global_fov, # only mark valid hits as occupied in the FOV-limited map
-            y_occupied_global=self.y_scan_global_fov
-        )
 
         # Publish both occupancy grids
-        self.publish_occupancy_grid(
+        self.publish_map(
             self.occupancy_grid_pub,
+            self.occupancy_grid_delta_pub,
+            self.full_map_encoder,
             self.occupancy_grid,
             self.x_min,
             self.y_min,
-            self.lidar_time
+            stamp_time,
+            self.full_map_model
         )
-        self.publish_occupancy_grid(
+        self.publish_map(
             self.fov_occupancy_grid_pub,
+            self.fov_occupancy_grid_delta_pub,
+            self.fov_map_encoder,
             self.fov_occupancy_grid,
             self.x_min_fov,
             self.y_min_fov,
-            self.lidar_time
+            stamp_time,
+            self.fov_map_model
         )
 
-    def update_occupancy_grid(self, grid, x_min, x_max, y_min, y_max, x_scan_global, y_scan_global, pose_x, pose_y, range_max, x_occupied_global=None, y_occupied_global=None):
-        # Dynamically expand the grid if points or robot fall outside bounds
-        all_x = np.append(x_scan_global, pose_x) if x_scan_global.size > 0 else np.array([pose_x])
-        all_y = np.append(y_scan_global, pose_y) if y_scan_global.size > 0 else np.array([pose_y])
-        min_x, max_x = np.min(all_x), np.max(all_x)
-        min_y, max_y = np.min(all_y), np.max(all_y)
-
-        pad_left = pad_right = pad_bottom = pad_top = 0
-        if min_x < x_min:
-            pad_left = int(np.ceil((x_min - min_x) / self.grid_size))
-            x_min -= pad_left * self.grid_size
-        if max_x > x_max:
-            pad_right = int(np.ceil((max_x - x_max) / self.grid_size))
-            x_max += pad_right * self.grid_size
-        if min_y < y_min:
-            pad_bottom = int(np.ceil((y_min - min_y) / self.grid_size))
-            y_min -= pad_bottom * self.grid_size
-        if max_y > y_max:
-            pad_top = int(np.ceil((max_y - y_max) / self.grid_size))
-            y_max += pad_top * self.grid_size
-
-        if any([pad_left, pad_right, pad_bottom, pad_top]):
-            grid = np.pad(
-                grid,
-                ((pad_bottom, pad_top), (pad_left, pad_right)),
-                mode='constant',
-                constant_values=0.5
-            )
-
-        if x_scan_global.size == 0:
-            return grid, x_min, x_max, y_min, y_max
-
-        if x_occupied_global is None or y_occupied_global is None:
-            x_occupied_global = x_scan_global
-            y_occupied_global = y_scan_global
-
-        # Clear cells traversed by each laser ray
-        dx = x_scan_global - pose_x
-        dy = y_scan_global - pose_y
-        distances = np.sqrt(dx**2 + dy**2)
-
-        # Limit ray tracing to the maximum range to avoid marking cells beyond valid hits as free
-        trace_distances = np.minimum(distances, range_max)
-        N_list = trace_distances / self.grid_size # number of steps to trace for each ray, based on limited trace distance
-
-        max_steps = int(np.ceil(np.max(N_list))) if N_list.size > 0 else 0
-        for step in range(max_steps):
-            mask = step < (N_list - 1.0) # only trace up to one step before the occupied cell to avoid clearing it
-            if not np.any(mask):
-                break
-
-            t = step / N_list[mask] 
-            x = pose_x + dx[mask] * t
-            y = pose_y + dy[mask] * t
-
-            i = ((x - x_min) / self.grid_size).astype(int)
-            j = ((y - y_min) / self.grid_size).astype(int)
-            valid_idx = (i >= 0) & (i < grid.shape[1]) & (j >= 0) & (j < grid.shape[0])
-            grid[j[valid_idx], i[valid_idx]] = 0.0
-
-        # Mark hit cells as occupied
-        if x_occupied_global.size == 0:
-            return grid, x_min, x_max, y_min, y_max
-        i = ((x_occupied_global - x_min) / self.grid_size).astype(int)
-        j = ((y_occupied_global - y_min) / self.grid_size).astype(int)
-        valid_idx = (i >= 0) & (i < grid.shape[1]) & (j >= 0) & (j < grid.shape[0])
-        grid[j[valid_idx], i[valid_idx]] = 1.0
-
-        return grid, x_min, x_max, y_min, y_max
-
-    def publish_occupancy_grid(self, publisher, grid, x_min, y_min, stamp_time):
+    # Transform one scan to the global frame and, at the update rate, integrate
+    # it into both tiled maps in one pass. Returns True if the maps changed.
+    def integrate_scan(self, lidar_time, ranges_raw, angle_min, angle_max, range_min, range_max, pose):
+        # Odometry pose moved into the map frame by the latest scan-match correction
+        pose_x, pose_y, pose_yaw = compose_pose(self.odom_correction, pose)
+
+        # Beam angles, cos/sin and the camera FOV mask are cached per scan layout
+        geometry = scan_geometry(angle_min, angle_max, len(ranges_raw))
+
+        # Filter out invalid ranges (NaN, Inf, out of range)
+        finite_ranges = np.isfinite(ranges_raw)
+        valid_ranges = finite_ranges.copy()
+        # valid_ranges &= (ranges_raw >= range_min)
+        valid_ranges &= (ranges_raw >= 0.1) # add small threshold to filter out super close readings
+        # valid_ranges &= (ranges_raw <= range_max)
+        valid_ranges &= (ranges_raw <= 20.0) # add upper threshold to filter out spurious long readings
+        ranges = ranges_raw[valid_ranges]
+
+        # Only update the occupancy grid at the specified rate
+        update = not (self.update_delay > 0 and self.last_update_time is not None and
+                      (lidar_time - self.last_update_time) < self.update_delay)
+
+        # Correct the drift by matching the scan against the map before it goes in
+        if update and self.scan_matcher is not None and ranges.size > 0:
+            matched = self.match_scan(geometry, ranges, valid_ranges, (pose_x, pose_y, pose_yaw))
+            if matched is not None:
+                pose_x, pose_y, pose_yaw = matched
+                self.odom_correction = compose_pose(matched, invert_pose(pose))
+        if self.scan_matcher is not None:
+            self.publish_corrected_pose(lidar_time, pose_x, pose_y, pose_yaw)
+
+        # Beam directions are rotated to the global frame once; every point below
+        # is pose + range * direction
+        ux, uy = rotate_points(geometry.cos, geometry.sin, 0.0, 0.0, pose_yaw)
+
+        # Full-map valid lidar points in the Global Frame
+        x_scan = pose_x + ranges * ux[valid_ranges]
+        y_scan = pose_y + ranges * uy[valid_ranges]
+
+        # Camera FOV and range filtering: only valid hits within camera range are occupied
+        camera_fov_mask = geometry.fov_mask(self.camera_fov_half_rad)
+        valid_camera_hits = camera_fov_mask & finite_ranges
+        valid_camera_hits &= (ranges_raw >= range_min)
+        valid_camera_hits &= (ranges_raw <= range_max)
+        valid_camera_hits &= (ranges_raw <= self.camera_range)
+        x_scan_fov = pose_x + ranges_raw[valid_camera_hits] * ux[valid_camera_hits]
+        y_scan_fov = pose_y + ranges_raw[valid_camera_hits] * uy[valid_camera_hits]
+        self.scan_points = (x_scan, y_scan, x_scan_fov, y_scan_fov)
+
+        if not update:
+            return False
+        self.last_update_time = lidar_time
+
+        # Length each layer clears along each beam, up to but not including the
+        # end cell. The full map clears to the hit, cut at the maximum range to
+        # avoid marking cells beyond valid hits as free. The FOV layer clears out
+        # to max camera range for all angles within FOV, returns or not.
+        full_length = np.zeros(len(ranges_raw))
+        full_length[valid_ranges] = np.minimum(ranges, range_max)
+        camera_ranges_raw = ranges_raw[camera_fov_mask]
+        fov_length = np.zeros(len(ranges_raw))
+        fov_length[camera_fov_mask] = np.clip(np.where(np.isfinite(camera_ranges_raw), camera_ranges_raw, self.camera_range),
+                                              0.0, self.camera_range)
+
+        # Trace each beam once, out to the longer of the two, and split the
+        # traversed cells between the layers. Both tiled maps share the global
+        # cell frame, so one window covers the scan in each of them.
+        trace_length = np.maximum(full_length, fov_length)
+        traced = trace_length > 0
+        trace_length = trace_length[traced]
+        self.full_map.ensure_region(pose_x, pose_x, pose_y, pose_y)
+        self.fov_map.ensure_region(pose_x, pose_x, pose_y, pose_y)
+        integrate_scan_layers(pose_x, pose_y, pose_x + trace_length * ux[traced], pose_y + trace_length * uy[traced], [
+            (self.full_map, full_length[traced] / trace_length, x_scan, y_scan),
+            (self.fov_map, fov_length[traced] / trace_length, x_scan_fov, y_scan_fov)
+        ])
+        return True
+
+    # Match a scan against the full map around the predicted pose (x, y, yaw).
+    # The lookup grids are built from a window of the tiled map just large
+    # enough for the scan at any candidate pose. Returns the corrected pose, or
+    # None if the map has nothing to match yet or the best match is too weak.
+    def match_scan(self, geometry, ranges, valid_ranges, pose):
+        x_body, y_body = geometry.to_body(ranges, valid_ranges)
+        reach = min(float(ranges.max()), self.scan_matcher.max_range) + self.scan_matcher.margin
+        cx0, cy0, cx1, cy1 = self.full_map.cell_range(pose[0] - reach, pose[0] + reach, pose[1] - reach, pose[1] + reach)
+        window = self.full_map.read(cx0, cy0, cx1, cy1)
+        occupied = self.full_map_model.to_ros_data(window).reshape(window.shape) == 100
+        if not self.scan_matcher.set_map(occupied, cx0 * self.grid_size, cy0 * self.grid_size):
+            return None
+        matched = self.scan_matcher.match(x_body, y_body, pose)
+        return matched[:3] if matched is not None else None
+
+    def publish_corrected_pose(self, stamp_time, x, y, yaw):
+        pose_msg = roslibpy.Message({
+            'header': {
+                'stamp': {
+                    'sec': int(stamp_time),
+                    'nanosec': int((stamp_time - int(stamp_time)) * 1e9)
+                },
+                'frame_id': 'map'
+            },
+            'pose': {
+                'position': {'x': x, 'y': y, 'z': 0.0},
+                'orientation': {'x': 0.0, 'y': 0.0, 'z': math.sin(yaw / 2.0), 'w': math.cos(yaw / 2.0)}
+            }
+        })
+        self.corrected_pose_pub.publish(pose_msg)
+
+    # Publish a grid on the topics selected by map_transport. The 0-100 encoding
+    # is built once and shared by the full message and the delta packet.
+    def publish_map(self, grid_publisher, delta_publisher, encoder, grid, x_min, y_min, stamp_time, model):
+        data = model.to_ros_data(grid) # 0-100 encoding only at publish time
         grid_height, grid_width = grid.shape
+        if self.map_transport in ('full', 'both'):
+            self.publish_occupancy_grid(grid_publisher, data, grid_width, grid_height, x_min, y_min, stamp_time)
+        if self.map_transport in ('delta', 'both'):
+            delta_publisher.publish(roslibpy.Message(
+                encoder.encode_msg(data, grid_width, grid_height, self.grid_size, x_min, y_min, stamp_time)))
+
+    def publish_occupancy_grid(self, publisher, data, grid_width, grid_height, x_min, y_min, stamp_time):
         occupancy_msg = roslibpy.Message({
             'header': {
                 'stamp': {
@@ -315,13 +354,14 @@ class MapClass():
                     'orientation': {'x': 0.0, 'y': 0.0, 'z': 0.0, 'w': 1.0}
                 }
             },
-            'data': (grid.flatten() * 100).astype(int).tolist()
+            'data': data.tolist()
         })
         publisher.publish(occupancy_msg)
 
     def on_plot_close(self, event):
         print("\nPlot window closed. Stopping...")
         self.running = False
+        self.mapping_worker.stop()
         try:
             self.client.terminate()
         except Exception as e:
@@ -331,39 +371,50 @@ class MapClass():
         return (angle + math.pi) % (2 * math.pi) - math.pi
 
     def plot_scan(self):
+        # One consistent copy of everything the mapping worker updates
+        with self.map_lock:
+            grid, extent = self.occupancy_grid, [self.x_min, self.x_max, self.y_min, self.y_max]
+            fov_grid, fov_extent = self.fov_occupancy_grid, [self.x_min_fov, self.x_max_fov, self.y_min_fov, self.y_max_fov]
+            x_scan, y_scan = self.x_scan_global, self.y_scan_global
+            x_scan_fov, y_scan_fov = self.x_scan_global_fov, self.y_scan_global_fov
+            correction = self.map_correction
+        robot_pose = (self.x, self.y, self.yaw)
+
         self.ax_full.clear()
         self.ax_fov.clear()
 
         self.ax_full.imshow(
-            self.occupancy_grid,
-            extent=[self.x_min, self.x_max, self.y_min, self.y_max],
+            self.full_map_model.to_probability(grid),
+            extent=extent,
             origin='lower',
             cmap='Greys',
             vmin=0,
             vmax=1
         )
         self.ax_fov.imshow(
-            self.fov_occupancy_grid,
-            extent=[self.x_min_fov, self.x_max_fov, self.y_min_fov, self.y_max_fov],
+            self.fov_map_model.to_probability(fov_grid),
+            extent=fov_extent,
             origin='lower',
             cmap='Greys',
             vmin=0,
             vmax=1
         )
 
-        if self.x_scan_global.size and self.y_scan_global.size:
-            self.ax_full.plot(self.x_scan_global, self.y_scan_global, 'b.', markersize=1)
-        if self.x_scan_global_fov.size and self.y_scan_global_fov.size:
-            self.ax_fov.plot(self.x_scan_global_fov, self.y_scan_global_fov, 'g.', markersize=1)
+        if x_scan.size and y_scan.size:
+            self.ax_full.plot(x_scan, y_scan, 'b.', markersize=1)
+        if x_scan_fov.size and y_scan_fov.size:
+            self.ax_fov.plot(x_scan_fov, y_scan_fov, 'g.', markersize=1)
 
-        if self.x is not None and self.y is not None:
+        if None not in robot_pose:
+            # Robot in the map frame (odometry with the scan-match correction)
+            x, y, yaw = compose_pose(correction, robot_pose)
             for ax in [self.ax_full, self.ax_fov]:
-                ax.plot(self.x, self.y, 'ro', markersize=5)
+                ax.plot(x, y, 'ro', markersize=5)
                 ax.arrow(
-                    self.x,
-                    self.y,
-                    0.5 * math.cos(self.yaw),
-                    0.5 * math.sin(self.yaw),
+                    x,
+                    y,
+                    0.5 * math.cos(yaw),
+                    0.5 * math.sin(yaw),
                     head_width=0.1,
                     head_length=0.1,
                     fc='r',
@@ -372,10 +423,10 @@ class MapClass():
 
             # Keep robot centered in each view
             window_size = 5.0
-            self.ax_full.set_xlim(self.x - window_size, self.x + window_size)
-            self.ax_full.set_ylim(self.y - window_size, self.y + window_size)
-            self.ax_fov.set_xlim(self.x - window_size, self.x + window_size)
-            self.ax_fov.set_ylim(self.y - window_size, self.y + window_size)
+            self.ax_full.set_xlim(x - window_size, x + window_size)
+            self.ax_full.set_ylim(y - window_size, y + window_size)
+            self.ax_fov.set_xlim(x - window_size, x + window_size)
+            self.ax_fov.set_ylim(y - window_size, y + window_size)
 
         self.ax_full.set_xlabel('X (m)')
         self.ax_full.set_ylabel('Y (m)')
@@ -400,4 +451,6 @@ if __name__ == "__main__":
                 map.plot_scan()
             time.sleep(0.1)
     except KeyboardInterrupt:
-        print("\nStopping...")
\ No newline at end of file
+        print("\nStopping...")
+        map.mapping_worker.stop()
+    print(f"Mapping worker: {map.mapping_worker.stats()}")
\ No newline at end of file
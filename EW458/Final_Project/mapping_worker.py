@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import deque
+
+# Bounded FIFO where put() never blocks: when it is full the oldest item is
+# dropped to make room, so a consumer that falls behind always works on the
+# most recent data and the producer (a ROS callback) returns immediately.
+class DropOldestQueue:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.items = deque() # (enqueue time, item)
+        self.cond = threading.Condition()
+        self.closed = False
+        self.enqueued = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def __len__(self):
+        with self.cond:
+            return len(self.items)
+
+    def put(self, item):
+        with self.cond:
+            if len(self.items) >= self.maxsize:
+                self.items.popleft()
+                self.dropped += 1
+            self.items.append((time.monotonic(), item))
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, len(self.items))
+            self.cond.notify()
+
+    # Wait up to timeout for an item, then take up to max_items of them, oldest
+    # first, as (enqueue time, item) pairs. Empty on timeout or once closed.
+    def get_batch(self, max_items, timeout=None):
+        with self.cond:
+            if not self.items and not self.closed:
+                self.cond.wait(timeout)
+            return [self.items.popleft() for _ in range(min(max_items, len(self.items)))]
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+# Daemon thread that drains a DropOldestQueue and hands batches of up to
+# max_batch items to process_batch(items). Tracks queue depth, drops and the
+# latency from submit() to the end of the batch that handled each item.
+class BatchWorker:
+    def __init__(self, process_batch, maxsize=4, max_batch=8, name='batch-worker'):
+        self.process_batch = process_batch
+        self.max_batch = max_batch
+        self.queue = DropOldestQueue(maxsize)
+        self.running = False
+        self.thread = threading.Thread(target=self.run, name=name, daemon=True)
+
+        # Counters
+        self.stats_lock = threading.Lock()
+        self.processed = 0
+        self.batches = 0
+        self.errors = 0
+        self.latency_last = 0.0
+        self.latency_max = 0.0
+        self.latency_sum = 0.0
+
+    def start(self):
+        self.running = True
+        self.thread.start()
+
+    def submit(self, item):
+        self.queue.put(item)
+
+    def run(self):
+        while self.running:
+            batch = self.queue.get_batch(self.max_batch, timeout=0.1)
+            if not batch:
+                continue
+            try:
+                self.process_batch([item for _, item in batch])
+            except Exception as e:
+                with self.stats_lock:
+                    self.errors += 1
+                print(f"Error in {self.thread.name}: {e}")
+            done = time.monotonic()
+            with self.stats_lock:
+                self.batches += 1
+                for enqueue_time, _ in batch:
+                    latency = done - enqueue_time
+                    self.latency_max = max(self.latency_max, latency)
+                    self.latency_sum += latency
+                    self.processed += 1
+                self.latency_last = done - batch[-1][0]
+
+    def stop(self, timeout=1.0):
+        self.running = False
+        self.queue.close()
+        if self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+    # Snapshot of the counters; latencies in milliseconds
+    def stats(self):
+        with self.queue.cond:
+            depth = len(self.queue.items)
+            enqueued, dropped, max_depth = self.queue.enqueued, self.queue.dropped, self.queue.max_depth
+        with self.stats_lock:
+            return {
+                'depth': depth,
+                'max_depth': max_depth,
+                'enqueued': enqueued,
+                'dropped': dropped,
+                'processed': self.processed,
+                'batches': self.batches,
+                'errors': self.errors,
+                'latency_last_ms': 1e3 * self.latency_last,
+                'latency_mean_ms': 1e3 * self.latency_sum / self.processed if self.processed else 0.0,
+                'latency_max_ms': 1e3 * self.latency_max
+            }
+
+if __name__ == "__main__":
+    # A 10 Hz producer against a consumer that needs 150 ms per batch plus
+    # 5 ms per item. One item per batch cannot keep up, so the queue drops the
+    # oldest; batching catches up. Either way submit() never blocks.
+    for max_batch in [1, 8]:
+        seen = []
+        def slow_batch(items):
+            time.sleep(0.15 + 0.005 * len(items))
+            seen.extend(items)
+
+        worker = BatchWorker(slow_batch, maxsize=4, max_batch=max_batch, name='demo-worker')
+        worker.start()
+        put_times = []
+        for k in range(40):
+            t0 = time.perf_counter()
+            worker.submit(k)
+            put_times.append(time.perf_counter() - t0)
+            time.sleep(0.1)
+        time.sleep(1.0)
+        worker.stop()
+        stats = worker.stats()
+        assert seen == sorted(seen) and stats['processed'] + stats['dropped'] + stats['depth'] == stats['enqueued']
+        print(f"max_batch {max_batch}: submit max {1e6 * max(put_times):.0f} us, " +
+              ", ".join(f"{key} {value:.0f}" if isinstance(value, float) else f"{key} {value}" for key, value in stats.items()))
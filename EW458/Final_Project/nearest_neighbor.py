@@ -0,0 +1,131 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+# Brute-force nearest-node search over a preallocated point array. Every query
+# is a single vectorized distance computation over all stored points. Pass
+# points to share an existing (capacity, 2) array, e.g. the planner's node
+# storage, instead of allocating a separate one.
+class LinearIndex:
+    def __init__(self, capacity=1024, points=None):
+        if points is None:
+            points = np.empty((max(1, int(capacity)), 2))
+        self.points = points
+        self.count = 0
+
+    def _reserve(self, size):
+        if size <= len(self.points):
+            return
+        new_capacity = max(size, 2 * len(self.points))
+        grown = np.empty((new_capacity, 2))
+        grown[:self.count] = self.points[:self.count]
+        self.points = grown
+
+    # Store a point and return its integer index
+    def add(self, point):
+        self._reserve(self.count + 1)
+        self.points[self.count] = point
+        self.count += 1
+        return self.count - 1
+
+    # Index the first count rows of a (possibly new or reordered) point array
+    def reset(self, points, count):
+        self.points = points
+        self.count = count
+
+    # Return the index of the stored point closest to the query point
+    def nearest(self, point):
+        if self.count == 0:
+            return -1
+        dx = self.points[:self.count, 0] - point[0]
+        dy = self.points[:self.count, 1] - point[1]
+        return int(np.argmin(dx * dx + dy * dy))
+
+    # Return the indices of all stored points within radius of the query point
+    def within(self, point, radius):
+        dx = self.points[:self.count, 0] - point[0]
+        dy = self.points[:self.count, 1] - point[1]
+        return np.flatnonzero(dx * dx + dy * dy <= radius * radius)
+
+# Incrementally rebuilt KD-tree. Points land in a preallocated array; the
+# KD-tree covers a prefix of that array and the newest points sit in a short
+# unindexed tail that is scanned linearly. The tree is rebuilt once the tail
+# grows past a fraction of the indexed size, so rebuild cost stays amortized
+# O(log n) per insertion and query cost stays roughly flat as the tree grows.
+class KDTreeIndex(LinearIndex):
+    def __init__(self, capacity=1024, points=None, leafsize=16, min_tail=512, tail_ratio=0.125):
+        super().__init__(capacity, points)
+        self.leafsize = leafsize
+        self.min_tail = min_tail
+        self.tail_ratio = tail_ratio
+        self.kdtree = None
+        self.n_indexed = 0 # number of leading points covered by the KD-tree
+
+    def add(self, point):
+        idx = super().add(point)
+        tail_size = self.count - self.n_indexed
+        if tail_size > max(self.min_tail, int(self.n_indexed * self.tail_ratio)):
+            self.rebuild()
+        return idx
+
+    def reset(self, points, count):
+        super().reset(points, count)
+        self.rebuild()
+
+    def rebuild(self):
+        if self.count == 0:
+            self.kdtree = None
+            self.n_indexed = 0
+            return
+        self.kdtree = cKDTree(self.points[:self.count], leafsize=self.leafsize)
+        self.n_indexed = self.count
+
+    def nearest(self, point):
+        if self.count == 0:
+            return -1
+
+        best_idx = -1
+        best_d2 = np.inf
+        if self.kdtree is not None:
+            dist, idx = self.kdtree.query(point)
+            best_idx = int(idx)
+            best_d2 = dist * dist
+
+        # Check the points added since the last rebuild
+        if self.count > self.n_indexed:
+            dx = self.points[self.n_indexed:self.count, 0] - point[0]
+            dy = self.points[self.n_indexed:self.count, 1] - point[1]
+            d2 = dx * dx + dy * dy
+            tail_idx = int(np.argmin(d2))
+            if d2[tail_idx] < best_d2:
+                best_idx = self.n_indexed + tail_idx
+        return best_idx
+
+    def within(self, point, radius):
+        if self.kdtree is None:
+            return super().within(point, radius)
+        indexed = np.asarray(self.kdtree.query_ball_point(point, radius), dtype=np.intp)
+        if self.count == self.n_indexed:
+            return indexed
+        dx = self.points[self.n_indexed:self.count, 0] - point[0]
+        dy = self.points[self.n_indexed:self.count, 1] - point[1]
+        tail = np.flatnonzero(dx * dx + dy * dy <= radius * radius) + self.n_indexed
+        return np.concatenate((indexed, tail))
+
+NN_INDEX_TYPES = {
+    'linear': LinearIndex,
+    'kdtree': KDTreeIndex,
+}
+
+# Build a nearest-neighbour index from a name in NN_INDEX_TYPES, a class, or an
+# existing index instance (anything exposing add(point) and nearest(point), plus
+# within(point, radius) for the RRT* modes and reset(points, count) for RRT.replan)
+def make_nn_index(nn_index, capacity=1024, points=None):
+    if isinstance(nn_index, str):
+        if nn_index not in NN_INDEX_TYPES:
+            raise ValueError(f"Unknown nearest-neighbour index '{nn_index}'. Use one of {list(NN_INDEX_TYPES)}.")
+        return NN_INDEX_TYPES[nn_index](capacity, points)
+    if isinstance(nn_index, type):
+        if issubclass(nn_index, LinearIndex):
+            return nn_index(capacity, points)
+        return nn_index(capacity)
+    return nn_index
@@ -0,0 +1,88 @@
+import math
+import numpy as np
+
+# Cell update rules for MapClass grids. 'overwrite' keeps the original float
+# grid (0.0 free, 0.5 unknown, 1.0 occupied) where the latest scan wins.
+# 'log_odds' accumulates evidence as quantized log-odds in int8/int16 cells,
+# so a single spurious return no longer flips a cell for good. Both publish
+# the same nav_msgs/OccupancyGrid encoding (0 free, 50 unknown, 100 occupied).
+OCCUPANCY_MODES = ('overwrite', 'log_odds')
+
+class OverwriteModel:
+    unknown = 0.5
+
+    def new_grid(self, shape):
+        return np.full(shape, self.unknown)
+
+    # Mark flat cell indices as observed free / occupied
+    def apply_misses(self, grid, cells):
+        grid.flat[cells] = 0.0
+
+    def apply_hits(self, grid, cells):
+        grid.flat[cells] = 1.0
+
+    # Occupancy probability per cell, for plotting
+    def to_probability(self, grid):
+        return grid
+
+    # Flat int8 message data in the 0-100 encoding
+    def to_ros_data(self, grid):
+        return (grid.ravel() * 100).astype(np.int8)
+
+# Log-odds l = log(p / (1 - p)) stored in ticks of resolution, clamped to
+# [clamp_min, clamp_max] so a cell can always be flipped by enough new
+# evidence. Storage is int8 when the clamped range fits, otherwise int16.
+# Published cells are occupied at p >= occupied_threshold, free at
+# p <= free_threshold and unknown in between, since the planners treat only
+# exact 0 / 100 as known.
+class LogOddsModel:
+    unknown = 0
+
+    def __init__(self, hit=0.85, miss=-0.4, clamp_min=-2.0, clamp_max=3.5, resolution=0.05,
+                 free_threshold=0.3, occupied_threshold=0.7):
+        self.resolution = resolution
+        self.hit = int(round(hit / resolution))
+        self.miss = int(round(miss / resolution))
+        self.clamp_min = int(round(clamp_min / resolution))
+        self.clamp_max = int(round(clamp_max / resolution))
+        if max(-self.clamp_min, self.clamp_max) <= np.iinfo(np.int8).max:
+            self.dtype = np.int8
+        elif max(-self.clamp_min, self.clamp_max) <= np.iinfo(np.int16).max:
+            self.dtype = np.int16
+        else:
+            raise ValueError("Log-odds clamp range does not fit in int16 at this resolution.")
+        self.free_ticks = math.log(free_threshold / (1 - free_threshold)) / resolution
+        self.occupied_ticks = math.log(occupied_threshold / (1 - occupied_threshold)) / resolution
+
+    def new_grid(self, shape):
+        return np.full(shape, self.unknown, dtype=self.dtype)
+
+    # Add one increment to each flat cell index (indices must be unique)
+    def add(self, grid, cells, increment):
+        values = grid.flat[cells].astype(np.int32) + increment
+        grid.flat[cells] = np.clip(values, self.clamp_min, self.clamp_max)
+
+    def apply_misses(self, grid, cells):
+        self.add(grid, cells, self.miss)
+
+    def apply_hits(self, grid, cells):
+        self.add(grid, np.unique(cells), self.hit)
+
+    def to_probability(self, grid):
+        return 1.0 / (1.0 + np.exp(-grid.astype(float) * self.resolution))
+
+    def to_ros_data(self, grid):
+        grid = grid.ravel()
+        data = np.full(grid.shape, 50, dtype=np.int8)
+        data[grid <= self.free_ticks] = 0
+        data[grid >= self.occupied_ticks] = 100
+        return data
+
+# Build the model for a mode in OCCUPANCY_MODES; log_odds_params is an optional
+# dict of LogOddsModel keyword arguments
+def make_occupancy_model(mode='overwrite', log_odds_params=None):
+    if mode == 'overwrite':
+        return OverwriteModel()
+    if mode == 'log_odds':
+        return LogOddsModel(**(log_odds_params or {}))
+    raise ValueError(f"Unknown occupancy mode '{mode}'. Use one of {list(OCCUPANCY_MODES)}.")
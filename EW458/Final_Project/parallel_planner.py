@@ -0,0 +1,192 @@
+import os
+import time
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import shared_memory
+from RRT import RRT, RRTConnect
+from kernels import make_collision_checker
+
+# Worker-side cache: the attached shared-memory block and the collision checker
+# built for the current map version, so each job only pays for planning
+_worker_shm = None
+_worker_grid = None
+_worker_checker = None
+_worker_map_key = None
+
+# Attach to the shared grid block in a worker process (once per block)
+def _attach_grid(shm_name, shape, dtype):
+    global _worker_shm, _worker_grid
+    if _worker_shm is not None and _worker_shm.name == shm_name:
+        return _worker_grid
+    if _worker_shm is not None:
+        _worker_shm.close()
+    # Workers share the parent's resource tracker, so the parent's unlink in
+    # release_map() is the only cleanup the block needs
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_grid = np.ndarray(shape, dtype=dtype, buffer=_worker_shm.buf)
+    return _worker_grid
+
+# Started once per worker by ParallelPlanner.__init__, so process start-up and
+# module imports are paid before the first replan
+def _warm_up():
+    return os.getpid()
+
+# Run one planner on the shared grid and return its path, stats and tree.
+# end_time is an absolute time.monotonic() deadline (None for no deadline);
+# the clock is system-wide, so time spent queued or building the collision
+# checker counts against the caller's budget.
+def _plan_job(shm_name, shape, dtype, map_version, start, goal, map_params, planner_type, planner_kwargs, end_time):
+    global _worker_checker, _worker_map_key
+    grid = _attach_grid(shm_name, shape, dtype)
+    if _worker_map_key != (shm_name, map_version):
+        _worker_checker = make_collision_checker(grid, map_params)
+        _worker_map_key = (shm_name, map_version)
+
+    planner_class = RRTConnect if planner_type == 'rrt_connect' else RRT
+    planner = planner_class(start=start, goal=goal, map_grid=grid, map_params=map_params,
+                            clearance_map=_worker_checker, **planner_kwargs)
+    path = planner.plan(deadline_s=None if end_time is None else max(0.0, end_time - time.monotonic()))
+    return {
+        'path': None if path is None else np.array(path),
+        'stats': planner.stats,
+        'tree': np.array(planner.tree),
+        'expand_dis': planner_kwargs['expand_dis'],
+        'seed': planner_kwargs.get('seed'),
+    }
+
+# Runs several independent RRT instances (different seeds and expand_dis) on a
+# pool of worker processes. The occupancy grid is copied once per map update
+# into a shared-memory block that the workers read directly, so only the small
+# job arguments and results are pickled. The pool is kept alive between
+# replans, and started here, so process start-up is paid before the first
+# replan. result_margin_s is how long plan() waits past deadline_s for
+# results to come back from the workers.
+class ParallelPlanner:
+    def __init__(self, n_workers=None, mp_context='spawn', result_margin_s=0.05):
+        self.n_workers = n_workers if n_workers is not None else max(1, (os.cpu_count() or 1) - 1)
+        self.result_margin_s = result_margin_s
+        # spawn avoids forking a process that is running ROS and control threads
+        self.executor = ProcessPoolExecutor(max_workers=self.n_workers,
+                                            mp_context=multiprocessing.get_context(mp_context))
+        wait([self.executor.submit(_warm_up) for _ in range(self.n_workers)])
+        self.shm = None
+        self.grid = None # numpy view of the shared block
+        self.map_version = 0
+        self.stale = [] # jobs of earlier plan() calls that had not finished
+        self.stats = None
+
+    # Copy a new occupancy grid into shared memory (reallocated only when the
+    # grid size or dtype changes)
+    def set_map(self, occupancy_grid):
+        occupancy_grid = np.asarray(occupancy_grid)
+        if self.grid is None or self.grid.shape != occupancy_grid.shape or self.grid.dtype != occupancy_grid.dtype:
+            self.release_map()
+            self.shm = shared_memory.SharedMemory(create=True, size=max(1, occupancy_grid.nbytes))
+            self.grid = np.ndarray(occupancy_grid.shape, dtype=occupancy_grid.dtype, buffer=self.shm.buf)
+        self.grid[:] = occupancy_grid
+        self.map_version += 1
+
+    def release_map(self):
+        if self.shm is not None:
+            self.grid = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    # Plan from start to goal with one job per (expand_dis, seed) pair.
+    # strategy='first' returns the first successful result; 'shortest' waits
+    # for every job and returns the shortest path. With deadline_s, plan()
+    # returns within deadline_s + result_margin_s; jobs still queued then are
+    # cancelled, and running ones stop at the same deadline. Returns a dict
+    # with path, stats, tree, expand_dis and seed, or None. self.stats sums up
+    # the call: iterations and nodes over the jobs that returned, the elapsed
+    # time, and timed_out if any job hit the deadline or did not return.
+    def plan(self, start, goal, map_params, expand_dis_list, seeds=None, deadline_s=None,
+             strategy='first', planner_type='rrt', **planner_kwargs):
+        if self.grid is None:
+            raise RuntimeError("ParallelPlanner.set_map() must be called before plan().")
+        if strategy not in ('first', 'shortest'):
+            raise ValueError(f"Unknown strategy '{strategy}'. Use 'first' or 'shortest'.")
+        if seeds is None:
+            seeds = np.random.SeedSequence().generate_state(len(expand_dis_list)).tolist()
+
+        # Jobs left from earlier calls: drop the queued ones so they do not
+        # delay these; running ones stop at their own deadline
+        for future in self.stale:
+            future.cancel()
+        self.stale = [future for future in self.stale if not future.done()]
+
+        t0 = time.perf_counter()
+        end_time = None if deadline_s is None else time.monotonic() + deadline_s
+        futures = []
+        for expand_dis, seed in zip(expand_dis_list, seeds):
+            kwargs = dict(planner_kwargs, expand_dis=expand_dis, seed=seed)
+            futures.append(self.executor.submit(
+                _plan_job, self.shm.name, self.grid.shape, self.grid.dtype.str, self.map_version,
+                list(start), list(goal), map_params, planner_type, kwargs, end_time))
+
+        # Jobs stop themselves at end_time; allow a small margin for the results
+        wait_end = None if end_time is None else end_time + self.result_margin_s
+        best = None
+        pending = set(futures)
+        iterations, nodes, timed_out = 0, 0, False
+        while pending:
+            remaining = None if wait_end is None else max(0.0, wait_end - time.monotonic())
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                timed_out = True # jobs that did not return in time
+                break
+            for future in done:
+                result = future.result()
+                iterations += result['stats']['iterations']
+                nodes += result['stats']['nodes']
+                timed_out |= result['stats']['timed_out']
+                if result['path'] is None:
+                    continue
+                if best is None or result['stats']['path_length'] < best['stats']['path_length']:
+                    best = result
+            if best is not None and strategy == 'first':
+                break
+
+        # Drop jobs that have not started yet; running ones end at their deadline
+        # and are dropped by the next call once they finish
+        for future in pending:
+            future.cancel()
+        self.stale.extend(future for future in pending if not future.done())
+        self.stats = {
+            'iterations': iterations,
+            'nodes': nodes,
+            'time_s': time.perf_counter() - t0,
+            'timed_out': timed_out,
+            'path_found': best is not None,
+            'path_length': None if best is None else best['stats']['path_length'],
+        }
+        return best
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.release_map()
+
+if __name__ == "__main__":
+    from benchmark_rrt import load_saved_map, pick_free_points
+
+    occupancy_grid, map_params = load_saved_map()
+    planner = ParallelPlanner()
+    planner.set_map(occupancy_grid)
+    expand_dis_list = [0.6 * 0.75 ** k for k in range(4)]
+    try:
+        for seed in range(5):
+            start, goal = pick_free_points(occupancy_grid, map_params, min_dist=6.0, max_dist=14.0, seed=seed)
+            for strategy in ['first', 'shortest']:
+                t0 = time.perf_counter()
+                result = planner.plan(start, goal, map_params, expand_dis_list, seeds=list(range(4)),
+                                      deadline_s=0.5, strategy=strategy, max_iter=10000, sampler='free')
+                elapsed = time.perf_counter() - t0
+                if result is None:
+                    print(f"pair {seed} {strategy:>8}: no path ({elapsed:.3f} s)")
+                else:
+                    print(f"pair {seed} {strategy:>8}: length {result['stats']['path_length']:.2f} m, "
+                          f"expand_dis {result['expand_dis']:.2f}, seed {result['seed']} ({elapsed:.3f} s)")
+    finally:
+        planner.close()
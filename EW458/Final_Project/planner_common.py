@@ -0,0 +1,96 @@
+import math
+import time
+import numpy as np
+
+# Deadline, stats and path-pruning helpers shared by the tree planners (RRT,
+# RRTConnect) and GridPlanner. A planner using it provides collision_checker
+# (for prune_path) and a tree property (node count for record_stats), and
+# calls start_clock / out_of_time / record_stats around its search.
+class PlannerMixin:
+    def start_clock(self, deadline_s):
+        self.plan_start_time = time.perf_counter()
+        self.deadline = math.inf if deadline_s is None else self.plan_start_time + deadline_s
+        self.iterations = 0
+        self.timed_out = False
+
+    # Count one iteration, or return True once the deadline has passed
+    def out_of_time(self):
+        if time.perf_counter() >= self.deadline:
+            self.timed_out = True
+            return True
+        self.iterations += 1
+        return False
+
+    def record_stats(self, path):
+        path_length = None
+        if path is not None:
+            path_np = np.asarray(path)
+            path_length = float(np.sum(np.hypot(np.diff(path_np[:, 0]), np.diff(path_np[:, 1]))))
+        self.stats = {
+            'iterations': self.iterations,
+            'nodes': len(self.tree),
+            'time_s': time.perf_counter() - self.plan_start_time,
+            'timed_out': self.timed_out,
+            'path_found': path is not None,
+            'path_length': path_length,
+        }
+        return path
+
+    # Visibility-based path pruning: find the chain of waypoints with the fewest
+    # hops where every hop is a collision-free shortcut (ties broken by length).
+    # A breadth-first search over the visibility DAG checks, per level, every
+    # segment from the current level to every unreached waypoint in one batched
+    # query, and stops as soon as the goal is reached. The greedy
+    # farthest-visible pruning is one such chain, so the result never has more
+    # waypoints than it.
+    def prune_path(self, path, n_samples=8, max_batch=50000):
+        if path is None or len(path) <= 2:
+            return path
+
+        path_np = np.asarray(path, dtype=float)
+        n = len(path_np)
+        hops = np.full(n, -1, dtype=np.int64)
+        prev = np.full(n, -1, dtype=np.int64)
+        length = np.zeros(n)
+        hops[0] = 0
+        frontier = np.array([0])
+        level = 0
+        while hops[n - 1] < 0:
+            level += 1
+            unreached = np.flatnonzero(hops < 0)
+            rows = np.repeat(frontier, len(unreached))
+            cols = np.tile(unreached, len(frontier))
+            visible = self.shortcuts_free(path_np, rows, cols, n_samples, max_batch)
+            # Consecutive waypoints are tree edges; keep them so the search always advances
+            visible |= cols == rows + 1
+
+            through = np.where(visible, length[rows] + np.hypot(path_np[cols, 0] - path_np[rows, 0], path_np[cols, 1] - path_np[rows, 1]), math.inf)
+            through = through.reshape(len(frontier), len(unreached))
+            best = np.argmin(through, axis=0)
+            best_length = through[best, np.arange(len(unreached))]
+            reached = np.isfinite(best_length)
+            newly = unreached[reached]
+            hops[newly] = level
+            prev[newly] = frontier[best[reached]]
+            length[newly] = best_length[reached]
+            frontier = newly
+
+        chain = [n - 1]
+        while chain[-1] != 0:
+            chain.append(int(prev[chain[-1]]))
+        return [path_np[idx] for idx in chain[::-1]]
+
+    # Check path segments rows[k] -> cols[k] in batches. A segment with one of
+    # n_samples evenly spaced points in a blocked cell is blocked, so that cheap
+    # test runs first and only the survivors get the exact cell traversal.
+    def shortcuts_free(self, path_np, rows, cols, n_samples=8, max_batch=50000):
+        free = np.zeros(len(rows), dtype=bool)
+        fractions = (np.arange(n_samples) + 0.5) / n_samples
+        for start in range(0, len(rows), max_batch):
+            r = rows[start:start + max_batch]
+            c = cols[start:start + max_batch]
+            samples = path_np[r, None, :] + (path_np[c] - path_np[r])[:, None, :] * fractions[None, :, None]
+            maybe = self.collision_checker.points_free(samples.reshape(-1, 2)).reshape(-1, n_samples).all(axis=1)
+            candidates = np.flatnonzero(maybe)
+            free[start + candidates] = self.collision_checker.segments_free(path_np[r[candidates]], path_np[c[candidates]])
+        return free
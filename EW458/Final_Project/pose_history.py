@@ -0,0 +1,102 @@
+import math
+import numpy as np
+
+# Fixed-capacity ring buffer of timestamped poses (t, x, y, yaw) in NumPy
+# arrays. Appends are O(1) and overwrite the oldest sample once full. Samples
+# stay in time order around the ring, so a lookup is a binary search
+# (np.searchsorted) over at most two contiguous runs. pose_at() interpolates
+# x / y linearly and yaw along the shorter way around the circle.
+class PoseHistory:
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.times = np.zeros(capacity)
+        self.poses = np.zeros((capacity, 3)) # x, y, yaw
+        self.start = 0 # physical index of the oldest sample
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.start = 0
+        self.count = 0
+
+    # Physical index of the i-th oldest sample
+    def _slot(self, i):
+        return (self.start + i) % self.capacity
+
+    def append(self, t, x, y, yaw):
+        # A clock that jumps back (e.g. a restarted simulator) starts a new history
+        if self.count > 0 and t < self.times[self._slot(self.count - 1)]:
+            self.clear()
+        if self.count < self.capacity:
+            slot = self._slot(self.count)
+            self.count += 1
+        else:
+            slot = self.start
+            self.start = (self.start + 1) % self.capacity
+        self.times[slot] = t
+        self.poses[slot] = (x, y, yaw)
+
+    # Logical index of the first sample with time >= t (count if none)
+    def _search(self, t):
+        first_run = min(self.count, self.capacity - self.start)
+        if first_run == self.count or t <= self.times[self.start + first_run - 1]:
+            return int(np.searchsorted(self.times[self.start:self.start + first_run], t))
+        return first_run + int(np.searchsorted(self.times[:self.count - first_run], t))
+
+    # Pose (x, y, yaw) at time t, interpolated between the samples around it;
+    # times outside the history clamp to the oldest / newest sample. None if empty.
+    def pose_at(self, t):
+        if self.count == 0:
+            return None
+        i = self._search(t)
+        if i == 0:
+            return tuple(self.poses[self.start].tolist())
+        if i == self.count:
+            return tuple(self.poses[self._slot(self.count - 1)].tolist())
+        t0, t1 = float(self.times[self._slot(i - 1)]), float(self.times[self._slot(i)])
+        x0, y0, yaw0 = self.poses[self._slot(i - 1)].tolist()
+        x1, y1, yaw1 = self.poses[self._slot(i)].tolist()
+        alpha = (t - t0) / (t1 - t0) if t1 > t0 else 1.0
+        yaw_step = (yaw1 - yaw0 + math.pi) % (2 * math.pi) - math.pi
+        yaw = (yaw0 + alpha * yaw_step + math.pi) % (2 * math.pi) - math.pi
+        return (x0 + alpha * (x1 - x0), y0 + alpha * (y1 - y0), yaw)
+
+if __name__ == "__main__":
+    import time
+
+    # Compare against the list history it replaced: interpolation error and
+    # lookup cost for a robot turning in a circle with odometry at 100 Hz
+    rng = np.random.default_rng(0)
+    history = PoseHistory(capacity=100)
+    samples = []
+    speed, turn_rate = 0.3, 0.8
+    truth = lambda t: (speed / turn_rate * math.sin(turn_rate * t), speed / turn_rate * (1 - math.cos(turn_rate * t)),
+                       (turn_rate * t + math.pi) % (2 * math.pi) - math.pi)
+    nearest_err, interp_err = [], []
+    nearest_time, interp_time = 0.0, 0.0
+    for k in range(3000):
+        t = 0.01 * k
+        x, y, yaw = truth(t)
+        history.append(t, x, y, yaw)
+        samples.append((t, x, y, yaw))
+        if len(samples) > 100:
+            samples.pop(0)
+        if k < 100:
+            continue
+        scan_t = t - rng.uniform(0.0, 0.5)
+
+        t0 = time.perf_counter()
+        _, nx, ny, _ = min(samples, key=lambda p: abs(p[0] - scan_t))
+        nearest_time += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        ix, iy, _ = history.pose_at(scan_t)
+        interp_time += time.perf_counter() - t0
+
+        tx, ty, _ = truth(scan_t)
+        nearest_err.append(math.hypot(nx - tx, ny - ty))
+        interp_err.append(math.hypot(ix - tx, iy - ty))
+    n = len(interp_err)
+    print(f"nearest sample: {1e6 * nearest_time / n:6.1f} us/lookup, max position error {1e3 * max(nearest_err):.3f} mm")
+    print(f"ring buffer:    {1e6 * interp_time / n:6.1f} us/lookup, max position error {1e3 * max(interp_err):.3f} mm")
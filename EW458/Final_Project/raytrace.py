@@ -0,0 +1,168 @@
+import math
+import numpy as np
+
+# Exact (Amanatides-Woo) traversal of a whole scan in one vectorized pass.
+# Every cell a ray visits after its start cell is entered across a vertical or
+# horizontal grid line, so the start cell plus the cell entered at each line
+# crossing is the full traversal; the crossings of all rays are generated
+# together and never need sorting along the ray. A crossing that lands on a
+# grid corner enters the diagonal cell, as in a scalar walk.
+# Returns the unique flat (row-major) indices of the traversed cells of a
+# (height, width) grid whose cell (0, 0) has its lower-left corner at
+# (x_min, y_min). Each ray's end cell is left out unless include_end is True,
+# and cells outside the grid are dropped.
+def traverse_rays(x0, y0, x_end, y_end, x_min, y_min, res, shape, include_end=False):
+    height, width = shape
+    gx1 = (np.asarray(x_end, dtype=float).ravel() - x_min) / res
+    gy1 = (np.asarray(y_end, dtype=float).ravel() - y_min) / res
+    if gx1.size == 0:
+        return np.zeros(0, dtype=np.intp)
+    gx0 = (x0 - x_min) / res
+    gy0 = (y0 - y_min) / res
+    cx0, cy0 = math.floor(gx0), math.floor(gy0)
+    cx1 = np.floor(gx1).astype(np.intp)
+    cy1 = np.floor(gy1).astype(np.intp)
+    # End cells outside the grid become -1 so they never match a grid cell
+    end_cells = np.where((cx1 >= 0) & (cx1 < width) & (cy1 >= 0) & (cy1 < height), cy1 * width + cx1, -1)
+
+    cells = []
+    # The shared start cell, unless every ray also ends in it
+    if include_end or np.any((cx1 != cx0) | (cy1 != cy0)):
+        if 0 <= cx0 < width and 0 <= cy0 < height:
+            cells.append(np.array([cy0 * width + cx0], dtype=np.intp))
+    # A grid holding the start and every end point holds every traversed cell
+    inside = (0 <= cx0 < width and 0 <= cy0 < height and cx1.min() >= 0 and cx1.max() < width
+              and cy1.min() >= 0 and cy1.max() < height)
+    for axis in range(2):
+        crossings = _axis_crossings(axis, cx0, cy0, cx1, cy1, gx0, gy0, gx1, gy1)
+        if crossings is None:
+            continue
+        entered, other, n_cross, _ = crossings
+        flat = other * width + entered if axis == 0 else entered * width + other
+        if not inside:
+            cx, cy = (entered, other) if axis == 0 else (other, entered)
+            keep = (cx >= 0) & (cx < width) & (cy >= 0) & (cy < height)
+            if not include_end:
+                keep &= flat != np.repeat(end_cells, n_cross)
+            flat = flat[keep]
+        elif not include_end:
+            flat = flat[flat != np.repeat(end_cells, n_cross)]
+        cells.append(flat)
+
+    return _unique_cells(cells, height * width)
+
+# Rays near the robot overlap heavily; a boolean scatter removes the
+# duplicates much faster than np.unique's sort or hash
+def _unique_cells(cells, n_cells):
+    if not cells:
+        return np.zeros(0, dtype=np.intp)
+    visited = np.zeros(n_cells, dtype=bool)
+    visited[np.concatenate(cells)] = True
+    return np.flatnonzero(visited)
+
+# Cells entered across the grid lines of one axis (0 = x, 1 = y), for all rays
+# and in any order: lines min(c0, c1) + 1 .. max(c0, c1) within each ray, and
+# the entered cell is one below the line when the ray moves down. Returns
+# (entered, other, n_cross, backward) with the entered index along the axis
+# and the other coordinate per crossing, or None if no ray crosses a line.
+def _axis_crossings(axis, cx0, cy0, cx1, cy1, gx0, gy0, gx1, gy1):
+    c0, c1, g0, d = (cx0, cx1, gx0, gx1 - gx0) if axis == 0 else (cy0, cy1, gy0, gy1 - gy0)
+    g0_other, d_other = (gy0, gy1 - gy0) if axis == 0 else (gx0, gx1 - gx0)
+    n_cross = np.abs(c1 - c0)
+    total = int(n_cross.sum())
+    if total == 0:
+        return None
+    offsets = np.cumsum(n_cross) - n_cross
+    backward = d < 0
+    entered = np.arange(total) + np.repeat(np.minimum(c0, c1) + 1 - backward - offsets, n_cross)
+    # Other coordinate at the crossing, as a + b * entered per ray. The nudge
+    # makes a crossing exactly on a corner pick the cell the ray moves into.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(n_cross > 0, d_other / d, 0.0)
+    offset = g0_other + slope * (backward - g0) + np.sign(d_other) * 1e-9
+    other = np.floor(np.repeat(offset, n_cross) + np.repeat(slope, n_cross) * entered).astype(np.intp)
+    return entered, other, n_cross, backward
+
+# Trace each ray once for several layers that clear different lengths of the
+# same rays (e.g. a full map and a camera-FOV map). limits[k][i] is the
+# fraction of ray i that layer k covers, 0 to leave the ray out of it. Layer k
+# gets the cells traverse_rays would return for the rays cut at limits[k],
+# end cells left out; returns one array of unique flat indices per layer.
+# A cut ray crosses the same grid lines as the whole ray up to its own end
+# cell, which along each axis is a contiguous run of the ray's crossings, so
+# each layer gathers its runs instead of testing every crossing. Rays that
+# layer 0 traces whole are moved to the front, so when the rest are left out
+# of it (e.g. a full map plus FOV-only rays) its crossings are just a prefix.
+def traverse_rays_layered(x0, y0, x_end, y_end, limits, x_min, y_min, res, shape):
+    height, width = shape
+    gx1 = (np.asarray(x_end, dtype=float).ravel() - x_min) / res
+    gy1 = (np.asarray(y_end, dtype=float).ravel() - y_min) / res
+    limits = [np.asarray(limit, dtype=float).ravel() for limit in limits]
+    if gx1.size == 0:
+        return [np.zeros(0, dtype=np.intp) for _ in limits]
+    order = np.argsort(limits[0] < 1.0, kind='stable')
+    gx1, gy1 = gx1[order], gy1[order]
+    limits = [limit[order] for limit in limits]
+    gx0 = (x0 - x_min) / res
+    gy0 = (y0 - y_min) / res
+    cx0, cy0 = math.floor(gx0), math.floor(gy0)
+    cx1 = np.floor(gx1).astype(np.intp)
+    cy1 = np.floor(gy1).astype(np.intp)
+    inside = (0 <= cx0 < width and 0 <= cy0 < height and cx1.min() >= 0 and cx1.max() < width
+              and cy1.min() >= 0 and cy1.max() < height)
+
+    # End cell of each layer's cut rays (the whole ray's end cell at limit 1),
+    # flat index -1 outside the grid so it never matches a grid cell. Rays left
+    # out of a layer cross no lines in it.
+    layer_ends = []
+    cells = [[] for _ in limits]
+    for k, limit in enumerate(limits):
+        whole = limit >= 1.0
+        used = limit > 0
+        ex = np.where(whole, cx1, np.floor(gx0 + limit * (gx1 - gx0)).astype(np.intp))
+        ey = np.where(whole, cy1, np.floor(gy0 + limit * (gy1 - gy0)).astype(np.intp))
+        ex = np.where(used, ex, cx0)
+        ey = np.where(used, ey, cy0)
+        ends = np.where((ex >= 0) & (ex < width) & (ey >= 0) & (ey < height), ey * width + ex, -1)
+        layer_ends.append((ex, ey, ends, used))
+        # The shared start cell, unless every ray of the layer also ends in it
+        if 0 <= cx0 < width and 0 <= cy0 < height and np.any(used & ((ex != cx0) | (ey != cy0))):
+            cells[k].append(np.array([cy0 * width + cx0], dtype=np.intp))
+
+    for axis in range(2):
+        crossings = _axis_crossings(axis, cx0, cy0, cx1, cy1, gx0, gy0, gx1, gy1)
+        if crossings is None:
+            continue
+        entered, other, n_cross, backward = crossings
+        flat = other * width + entered if axis == 0 else entered * width + other
+        offsets = np.cumsum(n_cross) - n_cross
+        c0 = cx0 if axis == 0 else cy0
+        on_grid = None
+        if not inside:
+            cx, cy = (entered, other) if axis == 0 else (other, entered)
+            on_grid = (cx >= 0) & (cx < width) & (cy >= 0) & (cy < height)
+        for k, (ex, ey, ends, used) in enumerate(layer_ends):
+            # Crossings run in increasing line order within a ray, so a forward
+            # ray keeps its first n_keep and a backward ray its last n_keep
+            n_keep = np.minimum(np.abs((ex if axis == 0 else ey) - c0), n_cross)
+            n_keep[~used] = 0
+            layer_flat, layer_on_grid = flat, on_grid
+            partial = np.flatnonzero(n_keep != n_cross)
+            if partial.size > 0 and not np.any(n_keep[partial[0]:]):
+                # Whole rays then rays left out: a prefix of the crossings
+                layer_flat = flat[:offsets[partial[0]]]
+                if on_grid is not None:
+                    layer_on_grid = on_grid[:offsets[partial[0]]]
+            elif partial.size > 0:
+                first = offsets + np.where(backward, n_cross - n_keep, 0)
+                kept_offsets = np.cumsum(n_keep) - n_keep
+                kept = np.arange(int(n_keep.sum())) + np.repeat(first - kept_offsets, n_keep)
+                layer_flat = flat[kept]
+                if on_grid is not None:
+                    layer_on_grid = on_grid[kept]
+            keep = layer_flat != np.repeat(ends, n_keep)
+            if layer_on_grid is not None:
+                keep &= layer_on_grid
+            cells[k].append(layer_flat[keep])
+
+    return [_unique_cells(layer_cells, height * width) for layer_cells in cells]
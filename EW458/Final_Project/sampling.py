@@ -0,0 +1,80 @@
+from abc import ABC, abstractmethod
+import numpy as np
+
+# Batched RRT samplers. Samples are drawn batch_size at a time with a seeded
+# numpy.random.Generator and handed out one by one, so a planner iteration
+# only pops a pair of floats off a list. With goal_bias > 0 that fraction of
+# samples is replaced by the goal point.
+class Sampler(ABC):
+    def __init__(self, rng=None, seed=None, goal=None, goal_bias=0.0, batch_size=1024):
+        self.rng = rng if rng is not None else np.random.default_rng(seed)
+        self.goal = None if goal is None else np.asarray(goal, dtype=float)
+        self.goal_bias = goal_bias if goal is not None else 0.0
+        self.batch_size = batch_size
+        self.batch = []
+        self.samples_drawn = 0
+
+    # Subclasses return a (n, 2) array of sample points
+    @abstractmethod
+    def draw(self, n):
+        pass
+
+    def refill(self):
+        points = self.draw(self.batch_size)
+        if self.goal_bias > 0:
+            points[self.rng.random(self.batch_size) < self.goal_bias] = self.goal
+        # Reverse so pop() hands samples out in draw order
+        self.batch = points[::-1].tolist()
+
+    def sample(self):
+        if not self.batch:
+            self.refill()
+        self.samples_drawn += 1
+        return self.batch.pop()
+
+# Uniform samples over the map bounding box (the original RRT behaviour)
+class UniformSampler(Sampler):
+    def __init__(self, x_limit, y_limit, **kwargs):
+        super().__init__(**kwargs)
+        self.low = np.array([x_limit[0], y_limit[0]], dtype=float)
+        self.high = np.array([x_limit[1], y_limit[1]], dtype=float)
+
+    def draw(self, n):
+        return self.rng.uniform(self.low, self.high, size=(n, 2))
+
+# Samples drawn only from free cells, with uniform sub-cell jitter, so no
+# samples are wasted on occupied or unknown space. free_cells holds flat
+# indices into a (height, width) grid, e.g. GridCollisionChecker.free_cells().
+class FreeCellSampler(Sampler):
+    def __init__(self, free_cells, width, map_params, **kwargs):
+        super().__init__(**kwargs)
+        self.free_cells = free_cells
+        self.width = width
+        self.res = map_params['res']
+        self.x_min = map_params['x_limit'][0]
+        self.y_min = map_params['y_limit'][0]
+
+    def draw(self, n):
+        cells = self.free_cells[self.rng.integers(len(self.free_cells), size=n)]
+        y_idx, x_idx = np.divmod(cells, self.width)
+        jitter = self.rng.random((n, 2))
+        points = np.empty((n, 2))
+        points[:, 0] = self.x_min + (x_idx + jitter[:, 0]) * self.res
+        points[:, 1] = self.y_min + (y_idx + jitter[:, 1]) * self.res
+        return points
+
+SAMPLER_TYPES = ('uniform', 'free')
+
+# Build a sampler from a name in SAMPLER_TYPES or return an existing sampler.
+# 'free' falls back to 'uniform' when the map has no free cells.
+def make_sampler(sampler, collision_checker, map_params, rng=None, seed=None, goal=None, goal_bias=0.0, batch_size=1024):
+    if not isinstance(sampler, str):
+        return sampler
+    if sampler not in SAMPLER_TYPES:
+        raise ValueError(f"Unknown sampler '{sampler}'. Use one of {list(SAMPLER_TYPES)}.")
+    kwargs = dict(rng=rng, seed=seed, goal=goal, goal_bias=goal_bias, batch_size=batch_size)
+    if sampler == 'free':
+        free_cells = collision_checker.free_cells()
+        if len(free_cells) > 0:
+            return FreeCellSampler(free_cells, collision_checker.width, map_params, **kwargs)
+    return UniformSampler(map_params['x_limit'], map_params['y_limit'], **kwargs)
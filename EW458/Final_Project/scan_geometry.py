@@ -0,0 +1,53 @@
+import math
+import numpy as np
+
+# Beam geometry of a LaserScan: the angle, cos and sin of every beam, computed
+# once per (angle_min, angle_max, n) instead of on every callback. A lidar's
+# beam layout never changes, so callbacks only scale the cached unit vectors
+# by the ranges and rotate them into the global frame.
+class ScanGeometry:
+    def __init__(self, angle_min, angle_max, n):
+        self.angles = np.linspace(angle_min, angle_max, n)
+        self.cos = np.cos(self.angles)
+        self.sin = np.sin(self.angles)
+        self._fov_masks = {}
+
+    # Boolean mask of beams with |angle| <= half_angle (radians), cached per angle
+    def fov_mask(self, half_angle):
+        mask = self._fov_masks.get(half_angle)
+        if mask is None:
+            mask = np.abs(self.angles) <= half_angle
+            self._fov_masks[half_angle] = mask
+        return mask
+
+    # Body-frame points of the beams selected by mask (all beams if None);
+    # ranges must already be filtered by the same mask
+    def to_body(self, ranges, mask=None):
+        if mask is None:
+            return ranges * self.cos, ranges * self.sin
+        return ranges * self.cos[mask], ranges * self.sin[mask]
+
+    # Global-frame points of the beams selected by mask, for a robot at
+    # (pose_x, pose_y) with heading yaw
+    def to_global(self, ranges, pose_x, pose_y, yaw, mask=None):
+        x_body, y_body = self.to_body(ranges, mask)
+        return rotate_points(x_body, y_body, pose_x, pose_y, yaw)
+
+# Rotate body-frame points by yaw and shift them to (pose_x, pose_y)
+def rotate_points(x_body, y_body, pose_x, pose_y, yaw):
+    c = math.cos(yaw)
+    s = math.sin(yaw)
+    return pose_x + c * x_body - s * y_body, pose_y + s * x_body + c * y_body
+
+_geometry_cache = {}
+
+# Cached ScanGeometry for a beam layout
+def scan_geometry(angle_min, angle_max, n):
+    key = (angle_min, angle_max, n)
+    geometry = _geometry_cache.get(key)
+    if geometry is None:
+        if len(_geometry_cache) >= 8:
+            _geometry_cache.clear()
+        geometry = ScanGeometry(angle_min, angle_max, n)
+        _geometry_cache[key] = geometry
+    return geometry
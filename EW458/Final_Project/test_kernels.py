@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from kernels import HAVE_NUMBA, NumbaCollisionChecker, NumbaLinearIndex, NumbaKDTreeIndex
+from collision import GridCollisionChecker
+from nearest_neighbor import LinearIndex, KDTreeIndex
+from RRT import RRT
+from benchmark_rrt import SAVED_MAP_DIRS, load_saved_map, random_free_segments, pick_free_points
+
+# The kernels must give the same answers as the NumPy backend. Without Numba
+# they run interpreted, which still checks the kernel code; with Numba the
+# compiled kernels and whole RRT plans are compared too.
+# Run with: python -m pytest -q test_kernels.py
+
+SEGMENT_LENGTHS = [0.3, 1.0, 4.0]
+
+@pytest.fixture(scope='module', params=SAVED_MAP_DIRS)
+def saved_map(request):
+    occupancy_grid, map_params = load_saved_map(request.param)
+    return occupancy_grid, map_params, GridCollisionChecker(occupancy_grid, map_params), NumbaCollisionChecker(occupancy_grid, map_params)
+
+@pytest.mark.parametrize('length', SEGMENT_LENGTHS)
+def test_segments_free(saved_map, length):
+    occupancy_grid, map_params, reference, compiled = saved_map
+    starts, ends = random_free_segments(occupancy_grid, map_params, 2000, length, seed=int(10 * length))
+    mismatches = np.flatnonzero(compiled.segments_free(starts, ends) != reference.segments_free(starts, ends))
+    assert mismatches.size == 0, f"segments_free differs for {mismatches.size} segments, first {starts[mismatches[0]]} -> {ends[mismatches[0]]}"
+
+@pytest.mark.parametrize('length', SEGMENT_LENGTHS)
+def test_is_segment_free(saved_map, length):
+    occupancy_grid, map_params, reference, compiled = saved_map
+    starts, ends = random_free_segments(occupancy_grid, map_params, 300, length, seed=int(10 * length) + 1)
+    expected = reference.segments_free(starts, ends)
+    mismatches = [k for k in range(len(starts)) if compiled.is_segment_free(starts[k], ends[k]) != expected[k]]
+    assert mismatches == [], f"is_segment_free differs for {len(mismatches)} segments"
+
+def test_is_point_free(saved_map):
+    occupancy_grid, map_params, reference, compiled = saved_map
+    rng = np.random.default_rng(0)
+    starts, _ = random_free_segments(occupancy_grid, map_params, 3000, 0.0, seed=2)
+    # Points around free cells, so both free and blocked cells are covered
+    points = starts + rng.uniform(-1.0, 1.0, starts.shape)
+    compiled_free = np.array([compiled.is_point_free(p) for p in points])
+    assert np.array_equal(compiled_free, reference.points_free(points))
+
+@pytest.mark.parametrize('index_types', [(LinearIndex, NumbaLinearIndex), (KDTreeIndex, NumbaKDTreeIndex)],
+                         ids=['linear', 'kdtree'])
+def test_nearest_and_within(index_types):
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-10, 10, (3000, 2))
+    reference, compiled = index_types[0](len(points)), index_types[1](len(points))
+    for p in points:
+        reference.add(p)
+        compiled.add(p)
+    for q in rng.uniform(-10, 10, (200, 2)):
+        assert reference.nearest(q) == compiled.nearest(q)
+        assert np.array_equal(np.sort(reference.within(q, 1.5)), np.sort(compiled.within(q, 1.5)))
+
+@pytest.mark.skipif(not HAVE_NUMBA, reason="Numba not installed: the planner always runs the NumPy backend")
+@pytest.mark.parametrize('seed', range(5))
+def test_rrt_paths_match(saved_map, seed):
+    occupancy_grid, map_params, _, _ = saved_map
+    start, goal = pick_free_points(occupancy_grid, map_params, min_dist=4.0, max_dist=10.0, seed=seed)
+    paths = [RRT(start, goal, occupancy_grid, map_params, max_iter=5000, sampler='free', seed=seed, backend=backend).plan()
+             for backend in ['numpy', 'numba']]
+    assert (paths[0] is None) == (paths[1] is None)
+    if paths[0] is not None:
+        assert np.allclose(paths[0], paths[1])
@@ -0,0 +1,160 @@
+import math
+import numpy as np
+from raytrace import traverse_rays, traverse_rays_layered
+
+# Growable occupancy map stored as fixed-size square tiles in a dict keyed by
+# tile coordinates, so growing the map only allocates the tiles a scan
+# touches instead of reallocating and copying the whole grid. Cells are
+# indexed in a global frame where cell (0, 0) has its lower-left corner at
+# world (0, 0), so tiles never move when the map grows. Tiles come from
+# model.new_grid() and unallocated cells read as model.unknown, so the store
+# works with any occupancy model (float overwrite or int8/int16 log-odds).
+# bounds tracks the cell range that has been written or reserved; dense()
+# crops to it, so published maps are not padded out to tile edges.
+class TiledGrid:
+    def __init__(self, res, model, tile_size=64, bounds=None):
+        self.res = res
+        self.model = model
+        self.tile_size = tile_size
+        self.tiles = {} # (tile_x, tile_y) -> (tile_size, tile_size) array, row = y
+        self.bounds = None # [cx_min, cy_min, cx_max, cy_max], max exclusive
+        if bounds is not None:
+            self.ensure_region(*bounds)
+
+    # Cell range [cx0, cx1) x [cy0, cy1) covering a world box; a box edge on a
+    # cell boundary does not pull in the next cell, a point still gets its cell
+    def cell_range(self, x_min, x_max, y_min, y_max):
+        cx0 = math.floor(x_min / self.res + 1e-9)
+        cy0 = math.floor(y_min / self.res + 1e-9)
+        return (cx0, cy0, max(cx0 + 1, math.ceil(x_max / self.res - 1e-9)),
+                max(cy0 + 1, math.ceil(y_max / self.res - 1e-9)))
+
+    # Make a world box part of the map (read as unknown until observed)
+    def ensure_region(self, x_min, x_max, y_min, y_max):
+        self.reserve(*self.cell_range(x_min, x_max, y_min, y_max))
+
+    # Grow bounds to include a cell range without allocating any tiles
+    def reserve(self, cx0, cy0, cx1, cy1):
+        if self.bounds is None:
+            self.bounds = [cx0, cy0, cx1, cy1]
+        else:
+            self.bounds = [min(self.bounds[0], cx0), min(self.bounds[1], cy0),
+                           max(self.bounds[2], cx1), max(self.bounds[3], cy1)]
+
+    # Tiles overlapping a cell range, with the overlap in both frames:
+    # yields (key, tile slices, window slices)
+    def overlaps(self, cx0, cy0, cx1, cy1):
+        t = self.tile_size
+        for ty in range(cy0 // t, (cy1 - 1) // t + 1):
+            y0 = max(cy0, ty * t)
+            y1 = min(cy1, (ty + 1) * t)
+            for tx in range(cx0 // t, (cx1 - 1) // t + 1):
+                x0 = max(cx0, tx * t)
+                x1 = min(cx1, (tx + 1) * t)
+                yield ((tx, ty), (slice(y0 - ty * t, y1 - ty * t), slice(x0 - tx * t, x1 - tx * t)),
+                       (slice(y0 - cy0, y1 - cy0), slice(x0 - cx0, x1 - cx0)))
+
+    # Dense copy of a cell range; missing tiles read as unknown
+    def read(self, cx0, cy0, cx1, cy1):
+        window = self.model.new_grid((cy1 - cy0, cx1 - cx0))
+        for key, tile_slices, window_slices in self.overlaps(cx0, cy0, cx1, cy1):
+            tile = self.tiles.get(key)
+            if tile is not None:
+                window[window_slices] = tile[tile_slices]
+        return window
+
+    # Copy a dense window with lower-left cell (cx0, cy0) back into the tiles.
+    # Tiles are only allocated where the window holds something other than unknown.
+    def write(self, cx0, cy0, window):
+        cy1, cx1 = cy0 + window.shape[0], cx0 + window.shape[1]
+        for key, tile_slices, window_slices in self.overlaps(cx0, cy0, cx1, cy1):
+            block = window[window_slices]
+            tile = self.tiles.get(key)
+            if tile is None:
+                if np.all(block == self.model.unknown):
+                    continue
+                tile = self.model.new_grid((self.tile_size, self.tile_size))
+                self.tiles[key] = tile
+            tile[tile_slices] = block
+        self.reserve(cx0, cy0, cx1, cy1)
+
+    # Integrate one scan: rays from the pose to the (range-limited) end points
+    # clear the cells they cross and the hit points mark theirs occupied,
+    # through the occupancy model. Only the window around the scan is read
+    # and written back.
+    def integrate_scan(self, pose_x, pose_y, x_end, y_end, x_hit, y_hit):
+        if len(x_end) == 0:
+            return
+        xs = np.concatenate(([pose_x], x_end, x_hit))
+        ys = np.concatenate(([pose_y], y_end, y_hit))
+        cx0, cy0, cx1, cy1 = self.cell_range(xs.min(), xs.max(), ys.min(), ys.max())
+        cx1 += 1 # points exactly on the max edge fall in the next cell
+        cy1 += 1
+        window = self.read(cx0, cy0, cx1, cy1)
+        x_min, y_min = cx0 * self.res, cy0 * self.res
+
+        free_cells = traverse_rays(pose_x, pose_y, x_end, y_end, x_min, y_min, self.res, window.shape)
+        self.model.apply_misses(window, free_cells)
+        if len(x_hit) > 0:
+            i = np.floor((np.asarray(x_hit) - x_min) / self.res).astype(np.intp)
+            j = np.floor((np.asarray(y_hit) - y_min) / self.res).astype(np.intp)
+            valid_idx = (i >= 0) & (i < window.shape[1]) & (j >= 0) & (j < window.shape[0])
+            self.model.apply_hits(window, j[valid_idx] * window.shape[1] + i[valid_idx])
+        self.write(cx0, cy0, window)
+
+    # Dense grid over bounds for publishing and plotting:
+    # (grid, x_min, x_max, y_min, y_max)
+    def dense(self):
+        cx0, cy0, cx1, cy1 = self.bounds
+        return self.read(cx0, cy0, cx1, cy1), cx0 * self.res, cx1 * self.res, cy0 * self.res, cy1 * self.res
+
+    @property
+    def nbytes(self):
+        return sum(tile.nbytes for tile in self.tiles.values())
+
+# Integrate one scan into several maps in one pass, e.g. the full map and a
+# camera-FOV layer. The maps must share res, so they share the global cell
+# frame and each ray is traced once in a window covering the whole scan.
+# layers is a list of (tiled_map, limit, x_hit, y_hit): the map clears the
+# first limit[i] fraction of ray i (0 leaves it out) and marks its hit points.
+# Each map still reads and writes only the window around its own rays and
+# hits, so its bounds grow as if the scan was integrated into it alone.
+def integrate_scan_layers(pose_x, pose_y, x_end, y_end, layers):
+    res = layers[0][0].res
+    if any(tiled_map.res != res for tiled_map, _, _, _ in layers):
+        raise ValueError("Fused map layers must share the same resolution.")
+    if len(x_end) == 0:
+        return
+    x_end = np.asarray(x_end, dtype=float)
+    y_end = np.asarray(y_end, dtype=float)
+    xs = np.concatenate([[pose_x], x_end] + [x_hit for _, _, x_hit, _ in layers])
+    ys = np.concatenate([[pose_y], y_end] + [y_hit for _, _, _, y_hit in layers])
+    cx0, cy0, cx1, cy1 = layers[0][0].cell_range(xs.min(), xs.max(), ys.min(), ys.max())
+    cx1 += 1 # points exactly on the max edge fall in the next cell
+    cy1 += 1
+    width = cx1 - cx0
+    free_cells = traverse_rays_layered(pose_x, pose_y, x_end, y_end, [limit for _, limit, _, _ in layers],
+                                       cx0 * res, cy0 * res, res, (cy1 - cy0, width))
+
+    for (tiled_map, limit, x_hit, y_hit), cells in zip(layers, free_cells):
+        used = limit > 0
+        lxs = np.concatenate(([pose_x], pose_x + limit[used] * (x_end[used] - pose_x), x_hit))
+        lys = np.concatenate(([pose_y], pose_y + limit[used] * (y_end[used] - pose_y), y_hit))
+        lx0, ly0, lx1, ly1 = tiled_map.cell_range(lxs.min(), lxs.max(), lys.min(), lys.max())
+        lx1 += 1
+        ly1 += 1
+        window = tiled_map.read(lx0, ly0, lx1, ly1)
+
+        # Shared-window cells to this map's window
+        if (lx0, ly0, lx1, ly1) != (cx0, cy0, cx1, cy1):
+            i = cells % width + (cx0 - lx0)
+            j = cells // width + (cy0 - ly0)
+            valid_idx = (i >= 0) & (i < window.shape[1]) & (j >= 0) & (j < window.shape[0])
+            cells = j[valid_idx] * window.shape[1] + i[valid_idx]
+        tiled_map.model.apply_misses(window, cells)
+        if len(x_hit) > 0:
+            i = np.floor((np.asarray(x_hit) - lx0 * res) / res).astype(np.intp)
+            j = np.floor((np.asarray(y_hit) - ly0 * res) / res).astype(np.intp)
+            valid_idx = (i >= 0) & (i < window.shape[1]) & (j >= 0) & (j < window.shape[0])
+            tiled_map.model.apply_hits(window, j[valid_idx] * window.shape[1] + i[valid_idx])
+        tiled_map.write(lx0, ly0, window)
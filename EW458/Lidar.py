@@ -1,3 +1,5 @@
+import os
+import sys
 import math
 import time
 import pygame
@@ -7,6 +9,9 @@ import numpy as np
 import matplotlib.pyplot as plt
 from PIL import Image
 from scipy.spatial.transform import Rotation as R
+# Cached beam geometry from the final project
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Final_Project'))
+from scan_geometry import scan_geometry, rotate_points
 
 class CreateClass():
     def __init__(self, id=86):
@@ -194,31 +199,25 @@ class CreateClass():
     def lidar_callback(self, msg):
         ranges = np.array(msg['ranges'])
 
-        # Calculate angles for valid ranges only
-        angles = np.linspace(msg['angle_min'], msg['angle_max'], len(msg['ranges']))
+        # Beam cos/sin are cached per scan layout
+        geometry = scan_geometry(msg['angle_min'], msg['angle_max'], len(msg['ranges']))
 
         valid_ranges = np.isfinite(ranges)
         valid_ranges &= (ranges >= msg['range_min'])
         valid_ranges &= (ranges <= msg['range_max'])
         ranges = ranges[valid_ranges]
-        angles = angles[valid_ranges]
 
         if ranges.size == 0:
             return
 
         # Convert to Cartesian coordinates in Body Frame
-        self.x_scan = ranges * np.cos(angles)
-        self.y_scan = ranges * np.sin(angles)
+        self.x_scan, self.y_scan = geometry.to_body(ranges, valid_ranges)
 
         # Check if pose has been initialized
         if self.x is None or self.y is None or self.yaw is None:
             return
 
-        self.R_BG = np.array([[math.cos(self.yaw), -math.sin(self.yaw)], [math.sin(self.yaw), math.cos(self.yaw)]])
-        P_G = self.R_BG @ np.array([self.x_scan, self.y_scan]) + np.array([[self.x], [self.y]])
-
-        self.x_scan_global = P_G[0, :]
-        self.y_scan_global = P_G[1, :]
+        self.x_scan_global, self.y_scan_global = rotate_points(self.x_scan, self.y_scan, self.x, self.y, self.yaw)
 
         # Clear all cells the laser passes through (ray tracing)
         dx = self.x_scan_global - self.x
@@ -1,7 +1,13 @@
+import os
+import sys
 import time
 import math
 import numpy as np
 from RRT import RRT
+# Shared grid collision checker from the final project
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Final_Project'))
+from collision import GridCollisionChecker
+from scan_geometry import scan_geometry
 import matplotlib.pyplot as plt
 from create3_sim import CreateSim
 
@@ -73,17 +79,11 @@ if __name__ == '__main__':
             
             angle_min = -120.0*math.pi/180.0
             angle_max = 120.0*math.pi/180.0
-            angles = np.linspace(angle_min, angle_max, n)
+            geometry = scan_geometry(angle_min, angle_max, n) # cached beam cos/sin
 
             ind = scan_data < 5.0
             scan_data = scan_data[ind]
-            x_B = scan_data * np.cos(angles[ind])
-            y_B = scan_data * np.sin(angles[ind])
-
-            R_BG = np.array([[np.cos(create.pose[2]), -np.sin(create.pose[2])],
-                            [np.sin(create.pose[2]),  np.cos(create.pose[2])]])
-            
-            P_G = R_BG @ np.array([x_B, y_B]) + np.array([[create.pose[0]], [create.pose[1]]])
+            P_G = np.array(geometry.to_global(scan_data, create.pose[0], create.pose[1], create.pose[2], ind))
 
             # Fill Occupancy Grid
             for i in range(P_G.shape[1]):
@@ -96,23 +96,12 @@ if __name__ == '__main__':
         
         # Check if current path is blocked by new obstacles
         if active_path is not None and wp_index < len(active_path):
-            # Create a temporary planner just for collision checking utils
-            # (We use current pose as start, though strictly we only need map params)
-            temp_planner = RRT(start=[0,0], goal=[0,0], map_grid=occupancy_grid, map_params=map_params_config)
-            
-            # Check segments from current position to next few waypoints
-            # precise checking: check segment from robot to current target, and subsequent segments
-            path_valid = True
-            
-            # Check robot to current target
-            if not temp_planner._is_segment_collision_free(np.array([create.pose[0], create.pose[1]]), active_path[wp_index]):
-                path_valid = False
-            else:
-                # Check remaining path segments
-                for i in range(wp_index, len(active_path)-1):
-                    if not temp_planner._is_segment_collision_free(active_path[i], active_path[i+1]):
-                        path_valid = False
-                        break
+            # One checker per loop over the updated grid (1.0 = occupied here, so free is <= 0.5)
+            checker = GridCollisionChecker(occupancy_grid, map_params_config, free_mask=occupancy_grid <= 0.5)
+
+            # Check the segment from the robot to the current target and every remaining segment in one batch
+            remaining_path = np.vstack(([create.pose[0], create.pose[1]], active_path[wp_index:]))
+            path_valid = checker.first_blocked_segment(remaining_path) < 0
             
             if not path_valid:
                 print("Obstacle detected on path! Replanning...")